@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Benchmark image handling and automations."""
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+import resource
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Annotated, Any
+
+import numpy as np
+import tifffile
+import typer
+
+from camacq import image
+from camacq.control import Center
+from camacq.helper.template import (
+    make_condition,
+    make_template,
+    render_cache,
+    render_template,
+)
+from camacq.plugins import sample as sample_mod
+from camacq.plugins.api import ImageEvent, validate_commands
+from camacq.plugins.leica import sample as leica_sample_mod
+
+cli = typer.Typer()
+
+
+@cli.callback()
+def main() -> None:
+    """Benchmark image handling and automations."""
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Print the time and peak traced memory of the block."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name}: {elapsed:.3f} s, peak memory {peak / 2**20:.1f} MiB")
+
+
+def make_stack(
+    root_dir: Path,
+    planes: int,
+    channels: int,
+    size: int,
+    compression: str | None = None,
+) -> dict[str, int]:
+    """Write a stack of random images and return the paths and channels."""
+    rng = np.random.default_rng(0)
+    images = {}
+    for channel in range(channels):
+        for plane in range(planes):
+            path = root_dir / f"image--Z{plane:02}--C{channel:02}.ome.tif"
+            data = rng.integers(0, 4096, (size, size), dtype=np.uint16)
+            tifffile.imwrite(path, data, compression=compression)
+            images[path.as_posix()] = channel
+    return images
+
+
+@cli.command()
+def projection(
+    planes: Annotated[int, typer.Option(help="Number of z planes.")] = 50,
+    channels: Annotated[int, typer.Option(help="Number of channels.")] = 2,
+    size: Annotated[int, typer.Option(help="Image side in pixels.")] = 1024,
+) -> None:
+    """Benchmark max projections of z stacks."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        images = make_stack(Path(temp_dir), planes, channels, size)
+        with measure(f"make_proj {channels} x {planes} planes of {size} px"):
+            image.make_proj(images)
+
+
+@cli.command()
+def read(
+    images: Annotated[int, typer.Option(help="Number of images to read.")] = 10000,
+    files: Annotated[int, typer.Option(help="Number of image files.")] = 100,
+    size: Annotated[int, typer.Option(help="Image side in pixels.")] = 512,
+    memmap: Annotated[bool, typer.Option(help="Memory map the images.")] = False,
+) -> None:
+    """Benchmark reading images and reducing the pixels of each image.
+
+    Run once per read mode, since the peak RSS is for the whole process.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = list(make_stack(Path(temp_dir), files, 1, size))
+        start = time.perf_counter()
+        total = 0
+        for idx in range(images):
+            img = image.ImageData(paths[idx % files], memmap=memmap)
+            total += int(img.data.max())
+        elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(
+        f"read {images} images of {size} px (memmap={memmap}): "
+        f"{elapsed:.3f} s, peak RSS {peak_rss:.1f} MiB"
+    )
+
+
+@cli.command()
+def load(
+    images: Annotated[int, typer.Option(help="Number of images.")] = 1000,
+    size: Annotated[int, typer.Option(help="Image side in pixels.")] = 512,
+    workers: Annotated[
+        list[int] | None, typer.Option(help="Number of workers to compare.")
+    ] = None,
+    compression: Annotated[
+        str | None, typer.Option(help="Compression of the images, eg zlib.")
+    ] = None,
+) -> None:
+    """Benchmark loading images in a thread pool with different workers."""
+    image.IMAGE_CACHE.resize(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = list(make_stack(Path(temp_dir), images, 1, size, compression))
+        for num_workers in workers or [1, 2, 4, 8]:
+            start = time.perf_counter()
+            for _ in image.load_images(paths, workers=num_workers):
+                pass
+            elapsed = time.perf_counter() - start
+            print(
+                f"load {images} images of {size} px with {num_workers} workers: "
+                f"{elapsed:.3f} s, {images / elapsed:.0f} images/s"
+            )
+
+
+CONDITIONS = [
+    "{% if trigger.event.job_id in [2, 3, 4]\n"
+    "and trigger.event.channel_id != 31 %}true{% endif %}\n",
+    "{% if trigger.event.channel_name == 'red' %}true{% endif %}\n",
+    "{{ not trigger.event.images }}",
+]
+
+
+def record_events(wells: int, fields: int, channels: int) -> list[SimpleNamespace]:
+    """Return the image events of imaging a plate with the gain and exp jobs."""
+    return [
+        SimpleNamespace(
+            plate_name="00",
+            well_x=well % 12,
+            well_y=well // 12,
+            field_x=field,
+            field_y=0,
+            job_id=job_id,
+            channel_id=channel_id,
+            channel_name="red" if channel_id == channels - 1 else None,
+            images={},
+        )
+        for well in range(wells)
+        for job_id in (2, 3, 4)
+        for field in range(fields)
+        for channel_id in range(channels)
+    ]
+
+
+@cli.command()
+def condition(
+    wells: Annotated[int, typer.Option(help="Number of wells.")] = 96,
+    fields: Annotated[int, typer.Option(help="Number of fields per well.")] = 4,
+    channels: Annotated[int, typer.Option(help="Number of channels.")] = 32,
+) -> None:
+    """Benchmark automation conditions over the events of a plate."""
+    events = record_events(wells, fields, channels)
+
+    async def run() -> None:
+        """Evaluate the conditions rendered and compiled."""
+        center = Center(loop=asyncio.get_running_loop())
+        rendered = [
+            partial(render_template, make_template(center, cond)) for cond in CONDITIONS
+        ]
+        compiled = [make_condition(center, cond) for cond in CONDITIONS]
+        for name, checks in (("jinja", rendered), ("compiled", compiled)):
+            start = time.perf_counter()
+            for event in events:
+                variables: dict[str, Any] = {"trigger": {"event": event}}
+                for check in checks:
+                    check(variables)
+            elapsed = time.perf_counter() - start
+            count = len(events) * len(checks)
+            print(
+                f"{name}: {count} conditions in {elapsed:.3f} s, "
+                f"{count / elapsed:.0f} conditions/s"
+            )
+
+    asyncio.run(run())
+
+
+JSON_CAMLIST = (
+    "[{% for x_number in range(1, fields_x + 1) %}"
+    "{% set outer = loop %}"
+    "{% for y_number in range(1, fields_y + 1) %}"
+    '"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 '
+    "/wellx:{{ trigger.event.well_x + 1 }} /welly:{{ trigger.event.well_y + 1 }} "
+    '/fieldx:{{ x_number }} /fieldy:{{ y_number }} /dxpos:0 /dypos:0"'
+    "{% if not (outer.last and loop.last) %}, {% endif %}"
+    "{% endfor %}{% endfor %}]"
+)
+NATIVE_CAMLIST = (
+    '{{ camlist("p10xexp", [[trigger.event.well_x, trigger.event.well_y]], '
+    "field_grid(fields_x, fields_y)) }}"
+)
+
+
+@cli.command()
+def camlist(
+    wells: Annotated[int, typer.Option(help="Number of wells.")] = 96,
+    fields_x: Annotated[int, typer.Option(help="Number of fields in x.")] = 10,
+    fields_y: Annotated[int, typer.Option(help="Number of fields in y.")] = 10,
+) -> None:
+    """Benchmark rendering and validating the cam list commands of wells."""
+
+    async def run() -> None:
+        """Render the commands with a JSON template and a native template."""
+        center = Center(loop=asyncio.get_running_loop())
+        for name, source in (("json", JSON_CAMLIST), ("native", NATIVE_CAMLIST)):
+            template = make_template(center, source)
+            start = time.perf_counter()
+            for well in range(wells):
+                event = SimpleNamespace(well_x=well % 12, well_y=well // 12)
+                variables = {
+                    "trigger": {"event": event},
+                    "fields_x": fields_x,
+                    "fields_y": fields_y,
+                }
+                validate_commands(render_template(template, variables))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name}: {wells} wells of {fields_x * fields_y} fields "
+                f"in {elapsed:.3f} s, {elapsed / wells * 1000:.2f} ms/well"
+            )
+
+    asyncio.run(run())
+
+
+GLOBAL_TEMPLATES = [
+    "{{ next_well_x(samples.leica, trigger.event.plate_name) }}",
+    "{{ next_well_y(samples.leica, trigger.event.plate_name) }}",
+    "{{ matched_samples(samples.leica, 'well', "
+    "{'plate_name': trigger.event.plate_name}) | length }}",
+]
+
+
+@cli.command()
+def globals_cache(
+    wells: Annotated[int, typer.Option(help="Number of wells.")] = 96,
+    automations: Annotated[
+        int, typer.Option(help="Number of automations per event.")
+    ] = 4,
+    events: Annotated[int, typer.Option(help="Number of events.")] = 200,
+) -> None:
+    """Benchmark template globals of automations triggered by the same events."""
+
+    async def run() -> None:
+        """Render the templates of the automations with and without cache."""
+        center = Center(loop=asyncio.get_running_loop())
+        await sample_mod.setup_module(center, {})
+        await leica_sample_mod.setup_module(center, {})
+        for well in range(wells):
+            await center.samples.leica.set_sample(
+                "well", plate_name="00", well_x=well % 12, well_y=well // 12
+            )
+        templates = [
+            make_template(center, source)
+            for _ in range(automations)
+            for source in GLOBAL_TEMPLATES
+        ]
+        for cache in (False, True):
+            start = time.perf_counter()
+            for idx in range(events):
+                event = ImageEvent({"plate_name": "00", "well_x": idx % 12})
+                variables = {"samples": center.samples, "trigger": {"event": event}}
+                if not cache:
+                    for template in templates:
+                        render_template(template, variables)
+                    continue
+                with render_cache(center, event):
+                    for template in templates:
+                        render_template(template, variables)
+            elapsed = time.perf_counter() - start
+            print(
+                f"cache {cache}: {events} events in {elapsed:.3f} s, "
+                f"{elapsed / events * 1000:.2f} ms/event"
+            )
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    cli()
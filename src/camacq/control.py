@@ -15,6 +15,7 @@ from camacq.event import Event, EventBus
 from camacq.exceptions import CamAcqError, MissingActionError, MissingActionTypeError
 from camacq.helper import register_signals
 from camacq.plugins.sample import Samples
+from camacq.scheduler import Scheduler
 from camacq.util import dotdict
 
 _LOGGER = logging.getLogger(__name__)
@@ -41,6 +42,8 @@ class Center:
         Return the Samples instance that holds all the Sample instances.
     actions : ActionsRegistry instance
         Return the ActionsRegistry instance.
+    scheduler : Scheduler instance
+        Return the Scheduler instance for delayed and periodic calls.
     data : dict
         Return dict that stores data from other modules than control.
 
@@ -53,6 +56,7 @@ class Center:
         self.bus = EventBus(self)
         self.actions: ActionsRegistry = ActionsRegistry(self)
         self.samples: Samples = Samples()
+        self.scheduler = Scheduler(self.loop)
         self.data: dict[str, Any] = {}
         self._exit_code = 0
         self._stopped: asyncio.Event | None = None
@@ -75,6 +79,7 @@ class Center:
         _LOGGER.info("Stopping camacq")
         self._track_tasks = True
         await self.bus.notify(CamAcqStopEvent({"exit_code": code}))
+        self.scheduler.stop()
         self._exit_code = code
         await self.wait_for()
         if self._stopped is not None:
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Hashable
+from contextvars import ContextVar
 import logging
 from typing import TYPE_CHECKING, Any, ClassVar
 
@@ -15,6 +16,11 @@ _LOGGER = logging.getLogger(__name__)
 
 EventHandler = Callable[["Center", "Event"], Any]
 
+_EVENT_TYPES: dict[type[Event], tuple[str, ...]] = {}
+_dispatch: ContextVar[tuple[Event, dict[Hashable, Any]] | None] = ContextVar(
+    "dispatch", default=None
+)
+
 
 class Event:
     """A base event.
@@ -107,18 +113,31 @@ class EventBus:
             An instance of Event or an instance of subclass of Event.
 
         """
-        _LOGGER.debug("Notifying event %s", event)
-        # Inspired by https://goo.gl/VEPG3n
         registry = self._registry
-        for event_class in event.__class__.__mro__:
-            # Handle base objects for Python 3.
-            if event_class.__name__ == "object":
-                continue
-            event_type = getattr(event_class, "event_type", None)
-            if event_type is None:
-                continue
-            for handler in registry.get(event_type, []):
-                await handler(self._center, event)  # await in sequential order
+        event_types = get_event_types(type(event))
+        if not any(registry.get(event_type) for event_type in event_types):
+            # Skip events that no handler listens to.
+            return
+        _LOGGER.debug("Notifying event %s", event)
+        token = _dispatch.set((event, {}))
+        try:
+            for event_type in event_types:
+                for handler in registry.get(event_type, []):
+                    await handler(self._center, event)  # await in sequential order
+        finally:
+            _dispatch.reset(token)
+
+
+def get_dispatch_data(event: Event) -> dict[Hashable, Any] | None:
+    """Return the data shared by the handlers of an event.
+
+    The data is only kept while the event is dispatched. Return None if
+    the event isn't being dispatched.
+    """
+    dispatch = _dispatch.get()
+    if dispatch is None or dispatch[0] is not event:
+        return None
+    return dispatch[1]
 
 
 def match_event(event: Event, **event_data: Any) -> bool:
@@ -129,3 +148,19 @@ def match_event(event: Event, **event_data: Any) -> bool:
         return True
 
     return False
+
+
+def get_event_types(event_class: type[Event]) -> tuple[str, ...]:
+    """Return the event types of an event class and its base classes.
+
+    The handlers of each event type are notified of an event of the class.
+    """
+    if (event_types := _EVENT_TYPES.get(event_class)) is None:
+        # Inspired by https://goo.gl/VEPG3n
+        event_types = _EVENT_TYPES[event_class] = tuple(
+            event_type
+            for cls in event_class.__mro__
+            if cls is not object
+            and (event_type := getattr(cls, "event_type", None)) is not None
+        )
+    return event_types
@@ -115,6 +115,13 @@ def ensure_dict(value: dict[str, Any] | None) -> dict[str, Any]:
     return value
 
 
+def ensure_list(value: Any) -> list[Any]:
+    """Wrap value in a list if it is not a list."""
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
 def register_signals(center: Center) -> None:
     """Register signal handlers."""
     if sys.platform != "win32":
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+import operator
 from typing import TYPE_CHECKING, Any
 
 import jinja2
+from jinja2 import nodes
 from jinja2.sandbox import ImmutableSandboxedEnvironment
 
+from camacq.event import Event, get_dispatch_data
 from camacq.exceptions import TemplateError
+from camacq.plugins.leica.command import camlist_com, field_grid
 from camacq.plugins.leica.sample import LeicaSample, next_well_xy
 from camacq.plugins.sample import get_matched_samples
 
@@ -15,31 +23,198 @@ if TYPE_CHECKING:
     from camacq.control import Center
     from camacq.plugins.sample import Sample
 
+RENDER_CACHE_DATA = "render_cache"
 TEMPLATE_ENV_DATA = "template_env"
+COMPARE_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gteq": operator.ge,
+    "lt": operator.lt,
+    "lteq": operator.le,
+    "in": lambda value, container: value in container,
+    "notin": lambda value, container: value not in container,
+}
 
+# Template globals that return lists, eg of commands for send_many.
+NATIVE_GLOBALS = ("camlist", "field_grid")
 
-def get_env(center: Center) -> ImmutableSandboxedEnvironment:
+Compiled = Callable[[dict[str, Any]], Any]
+
+_render_cache: ContextVar[dict[Hashable, Any] | None] = ContextVar(
+    "render_cache", default=None
+)
+
+
+class TemplateEnvironment(ImmutableSandboxedEnvironment):
+    """Represent the sandboxed template environment.
+
+    Event attributes are cached while a render cache is active.
+    """
+
+    def __init__(self, center: Center) -> None:
+        """Set up instance."""
+        super().__init__()
+        self.center = center
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        """Return an attribute of an object."""
+        cache = _render_cache.get()
+        if cache is None or not isinstance(obj, Event):
+            return super().getattr(obj, attribute)
+        return _get_cached(
+            cache,
+            (id(obj), attribute),
+            state_version(self.center),
+            super().getattr,
+            obj,
+            attribute,
+        )
+
+
+def get_env(center: Center) -> TemplateEnvironment:
     """Get the template environment."""
     if TEMPLATE_ENV_DATA not in center.data:
-        env = ImmutableSandboxedEnvironment()
-        env = _set_global(env, "next_well_xy", template_next_well_xy)
-        env = _set_global(env, "next_well_x", template_next_well_x)
-        env = _set_global(env, "next_well_y", template_next_well_y)
-        env = _set_global(env, "matched_samples", get_matched_samples)
+        env = TemplateEnvironment(center)
+        env = _set_global(env, "next_well_xy", cache_global(template_next_well_xy))
+        env = _set_global(env, "next_well_x", cache_global(template_next_well_x))
+        env = _set_global(env, "next_well_y", cache_global(template_next_well_y))
+        env = _set_global(env, "matched_samples", cache_global(get_matched_samples))
+        env = _set_global(env, "field_grid", template_field_grid)
+        env = _set_global(env, "camlist", camlist_com)
         center.data[TEMPLATE_ENV_DATA] = env
     return center.data[TEMPLATE_ENV_DATA]
 
 
 def _set_global(
-    env: ImmutableSandboxedEnvironment, func_name: str, func: Any
-) -> ImmutableSandboxedEnvironment:
+    env: TemplateEnvironment, func_name: str, func: Any
+) -> TemplateEnvironment:
     """Set a template environment global function."""
     env.globals[func_name] = func
     return env
 
 
+@contextmanager
+def render_cache(event: Event) -> Iterator[None]:
+    """Cache template global results and event attributes while rendering.
+
+    The cache is shared by the renders for the same event during the
+    dispatch of the event, eg by the automations that are triggered by
+    the event, and dropped when the dispatch ends. A cached value is
+    invalidated when the sample state changes.
+
+    Parameters
+    ----------
+    event : Event instance
+        The event that is dispatched.
+
+    """
+    data = get_dispatch_data(event)
+    cache = {} if data is None else data.setdefault(RENDER_CACHE_DATA, {})
+    token = _render_cache.set(cache)
+    try:
+        yield
+    finally:
+        _render_cache.reset(token)
+
+
+@contextmanager
+def no_render_cache() -> Iterator[None]:
+    """Render without the render cache of the dispatched event.
+
+    Use this when scheduling work that runs after the event dispatch.
+    """
+    token = _render_cache.set(None)
+    try:
+        yield
+    finally:
+        _render_cache.reset(token)
+
+
+def state_version(center: Center) -> int:
+    """Return a number that changes when the sample state changes."""
+    return sum(sample.version for sample in center.samples.values())
+
+
+def cache_global(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Return a template global function that caches the results.
+
+    The function must only depend on the arguments and the state of the
+    sample that is passed as the first argument. Results are cached while
+    a render cache is active.
+    """
+
+    @wraps(func)
+    def cached(sample: Sample, *args: Any, **kwargs: Any) -> Any:
+        """Return the cached result of the function."""
+        cache = _render_cache.get()
+        if cache is None:
+            return func(sample, *args, **kwargs)
+        try:
+            key = (func, id(sample), _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            return func(sample, *args, **kwargs)
+        return _get_cached(
+            cache, key, sample.version, partial(func, **kwargs), sample, *args
+        )
+
+    return cached
+
+
+def _get_cached(
+    cache: dict[Hashable, Any],
+    key: Hashable,
+    version: int,
+    func: Callable[..., Any],
+    *args: Any,
+) -> Any:
+    """Return a cached value for the version or call func to get it."""
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    value = func(*args)
+    # Keep the arguments alive so the ids in the key aren't reused.
+    cache[key] = (version, value, args)
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    """Return a hashable version of a dict, list or tuple."""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(val)) for key, val in sorted(value.items()))
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+class NativeTemplate:
+    """Represent a template of a single call of a list template global.
+
+    The template renders the value of the expression without converting
+    it to a string, eg a list stays a list.
+    """
+
+    def __init__(self, expression: Callable[..., Any]) -> None:
+        """Set up instance."""
+        self._expression = expression
+
+    def render(self, variables: dict[str, Any]) -> Any:
+        """Render the template with the variables."""
+        value = self._expression(**variables)
+        if isinstance(value, jinja2.Undefined):
+            # Match the string rendering of an undefined value.
+            return str(value)
+        return value
+
+
 def make_template(center: Center, data: Any) -> Any:
-    """Make templated data."""
+    """Make templated data.
+
+    Leaves without template syntax are kept as constants with their type.
+    A leaf that is a single call of a template global that returns a list,
+    eg camlist, renders the list. Other templates render strings.
+    """
     if isinstance(data, dict):
         return {key: make_template(center, val) for key, val in data.items()}
 
@@ -47,9 +222,69 @@ def make_template(center: Center, data: Any) -> Any:
         return [make_template(center, val) for val in data]
 
     env = get_env(center)
+    if not is_template_string(env, data):
+        if (
+            isinstance(data, str)
+            and data.endswith("\n")
+            and not env.keep_trailing_newline
+        ):
+            # Rendering strips a single trailing newline.
+            return data[:-1]
+        return data
+    if (expression := _single_expression(env, data)) is not None:
+        try:
+            return NativeTemplate(
+                env.compile_expression(expression, undefined_to_none=False)
+            )
+        except jinja2.TemplateSyntaxError:
+            pass
     return env.from_string(str(data))
 
 
+def _single_expression(env: jinja2.Environment, source: str) -> str | None:
+    """Return the expression of a template with a single list global call."""
+    try:
+        body = env.parse(source).body
+    except jinja2.TemplateSyntaxError:
+        return None
+    if (
+        len(body) != 1
+        or not isinstance(body[0], nodes.Output)
+        or len(body[0].nodes) != 1
+        or not _is_native_call(body[0].nodes[0])
+    ):
+        return None
+    source = source.strip()
+    start = env.variable_start_string
+    end = env.variable_end_string
+    if not source.startswith(start) or not source.endswith(end):
+        return None
+    return source[len(start) : -len(end)]
+
+
+def _is_native_call(node: nodes.Node) -> bool:
+    """Return True if a node is a call of a template global that returns a list."""
+    return (
+        isinstance(node, nodes.Call)
+        and isinstance(node.node, nodes.Name)
+        and node.node.name in NATIVE_GLOBALS
+    )
+
+
+def is_template_string(env: jinja2.Environment, data: Any) -> bool:
+    """Return True if data is a string with template syntax."""
+    if not isinstance(data, str):
+        return False
+    start_strings = (
+        env.block_start_string,
+        env.variable_start_string,
+        env.comment_start_string,
+        env.line_statement_prefix,
+        env.line_comment_prefix,
+    )
+    return any(start and start in data for start in start_strings)
+
+
 def render_template(data: Any, variables: dict[str, Any]) -> Any:
     """Render templated data."""
     if isinstance(data, dict):
@@ -58,6 +293,9 @@ def render_template(data: Any, variables: dict[str, Any]) -> Any:
     if isinstance(data, list):
         return [render_template(val, variables) for val in data]
 
+    if not isinstance(data, (jinja2.Template, NativeTemplate)):
+        return data
+
     try:
         rendered = data.render(variables)
     except jinja2.TemplateError as exc:
@@ -65,6 +303,178 @@ def render_template(data: Any, variables: dict[str, Any]) -> Any:
     return rendered
 
 
+def make_condition(center: Center, data: Any) -> Compiled:
+    """Make a function that renders condition data with template variables.
+
+    A condition that only uses comparisons, membership tests, boolean
+    operators, if statements, attribute and item lookups and literals is
+    compiled to a Python function. The function returns the same value
+    as the rendered template. Other conditions are rendered with Jinja,
+    as is a compiled condition that looks up an undefined value.
+    """
+    env = get_env(center)
+    template = make_template(center, data)
+    if not is_template_string(env, data):
+        return partial(render_template, template)
+    try:
+        body = env.parse(data).body
+        if isinstance(template, NativeTemplate):
+            # Return the value of a single expression with its type.
+            compiled = _compile_expr(env, body[0].nodes[0])  # type: ignore[attr-defined]
+        else:
+            compiled = _compile_body(env, body)
+    except _NotCompilableError:
+        return partial(render_template, template)
+
+    def render_condition(variables: dict[str, Any]) -> Any:
+        """Render the condition with the variables."""
+        try:
+            return compiled(variables)
+        except _UndefinedValueError:
+            return render_template(template, variables)
+
+    return render_condition
+
+
+class _NotCompilableError(Exception):
+    """Represent a template node that can't be compiled."""
+
+
+class _UndefinedValueError(Exception):
+    """Represent a lookup of an undefined value in a compiled condition."""
+
+
+def _compile_body(env: jinja2.Environment, body: list[nodes.Node]) -> Compiled:
+    """Compile template nodes to a function that returns the output."""
+    funcs = [_compile_node(env, node) for node in body]
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def render_body(variables: dict[str, Any]) -> str:
+        """Return the joined output of the nodes."""
+        return "".join(func(variables) for func in funcs)
+
+    return render_body
+
+
+def _compile_node(env: jinja2.Environment, node: nodes.Node) -> Compiled:
+    """Compile a template statement to a function that returns the output."""
+    if isinstance(node, nodes.Output):
+        funcs = [_compile_output(env, child) for child in node.nodes]
+        return lambda variables: "".join(func(variables) for func in funcs)
+
+    if isinstance(node, nodes.If):
+        test = _compile_expr(env, node.test)
+        body = _compile_body(env, node.body)
+        if node.elif_:
+            elif_node = nodes.If(
+                node.elif_[0].test, node.elif_[0].body, node.elif_[1:], node.else_
+            )
+            else_ = _compile_node(env, elif_node)
+        else:
+            else_ = _compile_body(env, node.else_)
+        return lambda variables: (
+            body(variables) if test(variables) else else_(variables)
+        )
+
+    raise _NotCompilableError(node)
+
+
+def _compile_output(env: jinja2.Environment, node: nodes.Node) -> Compiled:
+    """Compile a child of an output node to a function that returns a string."""
+    if isinstance(node, nodes.TemplateData):
+        data: str = node.data
+        return lambda variables: data
+    expr = _compile_expr(env, node)
+    return lambda variables: str(expr(variables))
+
+
+def _compile_expr(env: jinja2.Environment, node: nodes.Node) -> Compiled:
+    """Compile a template expression to a function that returns the value."""
+    if isinstance(node, nodes.Const):
+        value = node.value
+        return lambda variables: value
+
+    if isinstance(node, nodes.Name) and node.ctx == "load":
+        return partial(_lookup_name, env, node.name)
+
+    if isinstance(node, nodes.Getattr):
+        obj = _compile_expr(env, node.node)
+        attr: str = node.attr
+        return lambda variables: _defined(env.getattr(obj(variables), attr))
+
+    if isinstance(node, nodes.Getitem) and not isinstance(node.arg, nodes.Slice):
+        obj = _compile_expr(env, node.node)
+        arg = _compile_expr(env, node.arg)
+        return lambda variables: _defined(env.getitem(obj(variables), arg(variables)))
+
+    if isinstance(node, (nodes.List, nodes.Tuple)):
+        items = [_compile_expr(env, item) for item in node.items]
+        container = list if isinstance(node, nodes.List) else tuple
+        return lambda variables: container(item(variables) for item in items)
+
+    if isinstance(node, nodes.Not):
+        operand = _compile_expr(env, node.node)
+        return lambda variables: not operand(variables)
+
+    if isinstance(node, nodes.And):
+        left = _compile_expr(env, node.left)
+        right = _compile_expr(env, node.right)
+        return lambda variables: left(variables) and right(variables)
+
+    if isinstance(node, nodes.Or):
+        left = _compile_expr(env, node.left)
+        right = _compile_expr(env, node.right)
+        return lambda variables: left(variables) or right(variables)
+
+    if isinstance(node, nodes.Compare):
+        return _compile_compare(env, node)
+
+    raise _NotCompilableError(node)
+
+
+def _compile_compare(env: jinja2.Environment, node: nodes.Compare) -> Compiled:
+    """Compile a possibly chained comparison."""
+    first = _compile_expr(env, node.expr)
+    operands: list[tuple[Callable[[Any, Any], Any], Compiled]] = []
+    for operand in node.ops:
+        if operand.op not in COMPARE_OPERATORS:
+            raise _NotCompilableError(node)
+        operands.append(
+            (COMPARE_OPERATORS[operand.op], _compile_expr(env, operand.expr))
+        )
+
+    def compare(variables: dict[str, Any]) -> Any:
+        """Return the result of the comparison."""
+        left = first(variables)
+        result: Any = True
+        for compare_op, expr in operands:
+            right = expr(variables)
+            result = compare_op(left, right)
+            if not result:
+                return result
+            left = right
+        return result
+
+    return compare
+
+
+def _lookup_name(env: jinja2.Environment, name: str, variables: dict[str, Any]) -> Any:
+    """Return the value of a template variable or global."""
+    if name in variables:
+        return variables[name]
+    if name in env.globals:
+        return env.globals[name]
+    raise _UndefinedValueError(name)
+
+
+def _defined(value: Any) -> Any:
+    """Return value if it's defined."""
+    if isinstance(value, jinja2.Undefined):
+        raise _UndefinedValueError(value)
+    return value
+
+
 def template_next_well_xy(
     sample: Sample, plate_name: str, x_wells: int = 12, y_wells: int = 8
 ) -> tuple[int | None, int | None]:
@@ -96,3 +506,8 @@ def template_next_well_y(
         y_wells=y_wells,
     )
     return y_well
+
+
+def template_field_grid(fields_x: int, fields_y: int) -> list[list[int]]:
+    """Return the x and y coordinates, starting from 0, of the fields in a grid."""
+    return field_grid(fields_x, fields_y).tolist()
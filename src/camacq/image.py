@@ -2,25 +2,243 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import suppress
+from functools import cache
 import logging
-from typing import Any
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple
 
 import numpy as np
 from numpy import typing as npt
 import tifffile
 import xmltodict
 
+from camacq.event import Event
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_CACHE_BYTES = 256 * 2**20
+IMAGE_SAVED_EVENT = "image_saved_event"
+WRITER_RATE_WINDOW = 10.0
+
+
+class CacheEntry(NamedTuple):
+    """Represent the decoded data of an image file in the image cache."""
+
+    key: tuple[str, int, int]
+    data: npt.NDArray[Any]
+    description: str
+
+
+class ImageCache:
+    """Cache decoded image data with a byte budget and LRU eviction.
+
+    Entries are keyed by path, modification time and size of the image
+    file, so a changed file is read again. Cached arrays are read only.
+    The byte budget is set by the image_cache_bytes option of the sample
+    config.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum number of bytes of image data to keep in the cache.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The maximum number of bytes of image data to keep in the cache.
+    hits : int
+        The number of cache hits.
+    misses : int
+        The number of cache misses.
+
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        """Set up instance."""
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached images."""
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return (
+            f"ImageCache(max_bytes={self.max_bytes}, nbytes={self.nbytes}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """:int: Return the number of bytes of cached image data."""
+        return self._nbytes
+
+    def get(self, key: tuple[str, int, int]) -> CacheEntry | None:
+        """Return the cache entry for a key or None if missing."""
+        with self._lock:
+            entry = self._entries.get(key[0])
+            if entry is None or entry.key != key:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key[0])
+            self.hits += 1
+            return entry
+
+    def put(
+        self, key: tuple[str, int, int], data: npt.NDArray[Any], description: str
+    ) -> None:
+        """Add the decoded data of an image file to the cache."""
+        if data.nbytes > self.max_bytes:
+            return
+        data.flags.writeable = False
+        with self._lock:
+            self._pop(key[0])
+            self._entries[key[0]] = CacheEntry(key, data, description)
+            self._nbytes += data.nbytes
+            self._evict(self.max_bytes)
+
+    def invalidate(self, path: str | os.PathLike[str]) -> None:
+        """Remove the cache entry of an image path."""
+        with self._lock:
+            self._pop(os.fspath(path))
+
+    def resize(self, max_bytes: int) -> None:
+        """Set the byte budget of the cache and evict entries over budget."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict(max_bytes)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self, max_bytes: int) -> None:
+        """Remove the least recently used entries until within budget."""
+        while self._nbytes > max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self._nbytes -= entry.data.nbytes
+
+    def _pop(self, path: str) -> None:
+        """Remove the entry of a path if present."""
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._nbytes -= entry.data.nbytes
+
+
+IMAGE_CACHE = ImageCache()
+
+
+def file_key(path: str | os.PathLike[str]) -> tuple[str, int, int]:
+    """Return the cache key of an image file.
 
-def read_image(path: str) -> npt.NDArray[Any] | None:
+    The key is the path, the modification time in ns and the size of the
+    file. Raise OSError if the file can't be accessed.
+    """
+    stat = os.stat(path)
+    return os.fspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def load_image(path: str, memmap: bool = False) -> tuple[npt.NDArray[Any], str]:
+    """Return the data and description of the first page of a tif image.
+
+    Decoded image data is read from and added to the image cache.
+    Memory mapped image data is not cached. Unless memmap is True, the
+    returned data is writable and never shared with the cache: freshly
+    decoded data is returned as is and a copy is cached if it fits the
+    cache budget, while cached data is copied.
+
+    Parameters
+    ----------
+    path : str
+        The path to the image.
+    memmap : bool
+        If True, memory map the image data if the file layout allows it
+        and the data is not already cached. The data is read only and
+        may be shared with the image cache.
+
+    Returns
+    -------
+    tuple
+        Return a tuple of a numpy array with image data and the
+        description string of the image.
+
+    """
+    key = file_key(path)
+    entry = IMAGE_CACHE.get(key)
+    if entry is not None:
+        if memmap:
+            return entry.data, entry.description
+        # Don't share the cached data with readers that may edit it.
+        return entry.data.copy(), entry.description
+    with tifffile.TiffFile(path) as tif:
+        data = read_page(tif, memmap)
+        description = getattr(tif.pages.first, "description", "")
+    if not isinstance(data, np.memmap) and data.nbytes <= IMAGE_CACHE.max_bytes:
+        # The decoded data is returned, so cache a separate copy.
+        IMAGE_CACHE.put(key, data.copy(), description)
+    return data, description
+
+
+def read_description(path: str) -> str:
+    """Return the description of the first page of a tif image.
+
+    Only the tags of the first page are read, not the image data.
+
+    Parameters
+    ----------
+    path : str
+        The path to the image.
+
+    Returns
+    -------
+    str
+        Return the description string of the image.
+
+    """
+    entry = IMAGE_CACHE.get(file_key(path))
+    if entry is not None:
+        return entry.description
+    with tifffile.TiffFile(path) as tif:
+        return getattr(tif.pages.first, "description", "")
+
+
+def read_image(path: str, memmap: bool = False) -> npt.NDArray[Any] | None:
     """Read a tif image and return the data.
 
     Parameters
     ----------
     path : str
         The path to the image.
+    memmap : bool
+        If True, memory map the image data if the file layout allows it,
+        otherwise read the image data into memory.
 
     Returns
     -------
@@ -29,12 +247,42 @@ def read_image(path: str) -> npt.NDArray[Any] | None:
 
     """
     try:
-        return tifffile.imread(path, key=0)
+        return load_image(path, memmap)[0]
     except OSError as exception:
         _LOGGER.error("Bad path to image: %s", exception)
         return None
 
 
+def read_page(tif: tifffile.TiffFile, memmap: bool = False) -> npt.NDArray[Any]:
+    """Return the data of the first page of an open tif file.
+
+    Parameters
+    ----------
+    tif : tifffile.TiffFile instance
+        The open tif file.
+    memmap : bool
+        If True, return a read only memory map of the page data if the
+        page data is uncompressed and contiguous in the file, otherwise
+        read the page data into memory.
+
+    Returns
+    -------
+    numpy array
+        Return a numpy array with image data.
+
+    """
+    page = tif.pages.first
+    if memmap and page.is_memmappable and page.dtype is not None:
+        return np.memmap(
+            tif.filehandle.path,
+            dtype=np.dtype(tif.byteorder + page.dtype.char),
+            mode="r",
+            offset=page.dataoffsets[0],
+            shape=tuple(page.shape),
+        )
+    return page.asarray()
+
+
 def save_image(
     path: str, data: npt.NDArray[Any], description: str | None = None
 ) -> None:
@@ -51,12 +299,391 @@ def save_image(
 
     """
     tifffile.imwrite(path, data, description=description)
+    IMAGE_CACHE.invalidate(path)
+
+
+def save_image_atomic(
+    path: str, data: npt.NDArray[Any], description: str | None = None
+) -> None:
+    """Save a tif image via a temporary file that replaces path when written.
+
+    Readers of path never see a partly written image.
+
+    Parameters
+    ----------
+    path : str
+        The path to the image.
+    data : numpy array
+        A numpy array with the image data.
+    description : str
+        The description string of the image.
+
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", prefix=f".{name}.", dir=directory)
+    os.close(fd)
+    try:
+        tifffile.imwrite(temp_path, data, description=description)
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(temp_path)
+        raise
+    IMAGE_CACHE.invalidate(path)
+
+
+HISTOGRAM_BINS = 256
+# Count pixel values in chunks to keep the cast to intp in the cpu cache.
+HISTOGRAM_CHUNK_SIZE = 2**18
+
+
+@cache
+def _histogram_lut(dtype: np.dtype[Any]) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """Return a lookup table from pixel value to bin and the bin edges."""
+    max_int = 65535 if dtype.name == "uint16" else 255
+    bin_edges = np.linspace(0, max_int, HISTOGRAM_BINS + 1)
+    values = np.arange(np.iinfo(dtype).max + 1)
+    # Use the same half open bins as numpy histogram, with the last bin closed.
+    lut = np.searchsorted(bin_edges, values, side="right") - 1
+    lut[values >= max_int] = HISTOGRAM_BINS - 1
+    lut.flags.writeable = False
+    bin_edges.flags.writeable = False
+    return lut, bin_edges
+
+
+def histogram(data: npt.NDArray[Any]) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """Return the histogram of image data with 256 bins.
+
+    The range is 0 to 65535 for uint16 data and 0 to 255 otherwise. The
+    result is the same as with numpy histogram. For uint8 and uint16
+    data the pixel values are counted with bincount and the counts are
+    summed into the bins, which is much faster.
+
+    Parameters
+    ----------
+    data : numpy array
+        A numpy array with the image data.
+
+    Returns
+    -------
+    tuple
+        Return a tuple of a numpy array with the counts of the bins and a
+        numpy array with the bin edges.
+
+    """
+    if data.dtype.name not in ("uint8", "uint16"):
+        max_int = 65535 if data.dtype.name == "uint16" else 255
+        return np.histogram(data, bins=HISTOGRAM_BINS, range=(0, max_int))
+    lut, bin_edges = _histogram_lut(data.dtype)
+    pixels = data.ravel()
+    counts = np.zeros(len(lut), dtype=np.int64)
+    for start in range(0, len(pixels), HISTOGRAM_CHUNK_SIZE):
+        chunk = pixels[start : start + HISTOGRAM_CHUNK_SIZE]
+        counts += np.bincount(chunk, minlength=len(lut))
+    if data.dtype.name == "uint8":
+        # Each uint8 value has its own bin.
+        return counts, bin_edges
+    hist = np.bincount(lut, weights=counts, minlength=HISTOGRAM_BINS)
+    return hist.astype(np.int64), bin_edges
+
+
+def histograms(
+    images: Iterable[npt.NDArray[Any]],
+) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """Return the histograms of a batch of images with 256 bins each.
+
+    Parameters
+    ----------
+    images : iterable of numpy arrays
+        The image data, eg a list of images or a stack of channels with
+        the images along the first axis. All images must have the same
+        dtype.
+
+    Returns
+    -------
+    tuple
+        Return a tuple of a numpy array with one row of bin counts per
+        image and a numpy array with the bin edges.
+
+    """
+    hists = []
+    bin_edges = None
+    for data in images:
+        hist, bin_edges = histogram(data)
+        hists.append(hist)
+    if bin_edges is None:
+        raise ValueError("No images to make histograms of")
+    return np.stack(hists), bin_edges
+
+
+def fit_gain(
+    gains: npt.ArrayLike,
+    hists: npt.ArrayLike,
+    target: float = 0.8,
+    quantile: float = 0.999,
+    max_saturation: float = 0.001,
+    min_bin: int = 8,
+) -> float:
+    """Fit the detector gain that puts the bright pixels at a target intensity.
+
+    The intensity at the quantile is found for each gain step from the
+    histograms. Steps with a gain of zero or less, with more saturated
+    pixels than allowed or with the intensity below min_bin are not used.
+    A power law of intensity and gain is fitted to the other steps and
+    solved for the target intensity.
+    With fewer than two usable steps, the gain of the usable step is used,
+    or the highest gain below the first step that saturates, or the lowest
+    gain if all steps saturate.
+
+    Parameters
+    ----------
+    gains : array_like
+        The detector gains of the gain steps.
+    hists : array_like
+        The 256 bin histograms of the gain steps, one row per step.
+    target : float
+        The target intensity at the quantile as a fraction of the range.
+    quantile : float
+        The quantile of the pixels that defines the bright pixels.
+    max_saturation : float
+        The maximum fraction of saturated pixels of a usable step.
+    min_bin : int
+        The minimum bin of the intensity at the quantile of a usable step.
+
+    Returns
+    -------
+    float
+        Return the fitted gain.
+
+    """
+    gains = np.asarray(gains, dtype=np.float64)
+    hists = np.asarray(hists)
+    order = np.argsort(gains)
+    gains = gains[order]
+    hists = hists[order]
+    totals = hists.sum(axis=1)
+    saturated = hists[:, -1] / np.maximum(totals, 1)
+    cumulative = hists.cumsum(axis=1)
+    # The first bin where the cumulative count reaches the quantile.
+    high_bins = np.argmax(cumulative >= quantile * totals[:, None], axis=1)
+    # The power law is fitted in log space, which needs positive gains.
+    usable = (gains > 0) & (saturated <= max_saturation) & (high_bins >= min_bin)
+    if usable.sum() < 2:
+        if usable.any():
+            return float(gains[usable][0])
+        saturating = saturated > max_saturation
+        if not saturating.any():
+            return float(gains[-1])
+        # Use the highest gain below the first step that saturates.
+        return float(gains[max(int(np.argmax(saturating)) - 1, 0)])
+    # The intensity is the center of the bin.
+    intensity = np.log(high_bins[usable] + 0.5)
+    slope, intercept = np.polyfit(np.log(gains[usable]), intensity, 1)
+    if slope <= 0:
+        return float(gains[usable][-1])
+    target_bin = target * hists.shape[1]
+    return float(np.exp((np.log(target_bin) - intercept) / slope))
+
+
+def calc_gains(
+    channels: Mapping[int, Mapping[str, float]],
+    min_gains: Mapping[int, float] | None = None,
+    max_gains: Mapping[int, float] | None = None,
+    **kwargs: Any,
+) -> dict[int, int]:
+    """Calculate the detector gain of channels from the images of a gain job.
+
+    The histograms of the images of each gain step are summed and the
+    gain is fitted with fit_gain. This function can run in a process pool.
+
+    Parameters
+    ----------
+    channels : dict
+        Dict of channel ids that map dicts of image paths and the
+        detector gains of the images.
+    min_gains : dict
+        Optional dict of channel ids and minimum gains.
+        The default is the lowest gain of the gain steps.
+    max_gains : dict
+        Optional dict of channel ids and maximum gains.
+        The default is the highest gain of the gain steps.
+    **kwargs
+        Keyword arguments passed to fit_gain.
+
+    Returns
+    -------
+    dict
+        Return a dict of channel ids and gains.
+
+    """
+    min_gains = min_gains or {}
+    max_gains = max_gains or {}
+    results = {}
+    for channel_id, images in channels.items():
+        step_hists: dict[float, npt.NDArray[Any]] = {}
+        for path, gain in images.items():
+            hist = histogram(ImageData(path=path, memmap=True).data)[0]
+            if gain in step_hists:
+                step_hists[gain] = step_hists[gain] + hist
+            else:
+                step_hists[gain] = hist
+        if not step_hists:
+            continue
+        gains = list(step_hists)
+        gain = fit_gain(gains, np.stack(list(step_hists.values())), **kwargs)
+        gain = min(
+            max(gain, min_gains.get(channel_id, min(gains))),
+            max_gains.get(channel_id, max(gains)),
+        )
+        _LOGGER.debug("Calculated gain %s for channel %s", gain, channel_id)
+        results[channel_id] = round(gain)
+    return results
+
+
+PROJECTION_ARGMAX = "argmax"
+PROJECTION_MAX = "max"
+PROJECTION_MEAN = "mean"
+PROJECTION_MIN = "min"
+PROJECTION_SUM = "sum"
+PROJECTION_MODES = (
+    PROJECTION_MAX,
+    PROJECTION_MEAN,
+    PROJECTION_SUM,
+    PROJECTION_MIN,
+    PROJECTION_ARGMAX,
+)
+
+
+class Projection:
+    """Accumulate a projection of image planes one plane at a time.
+
+    Parameters
+    ----------
+    mode : str
+        The projection mode, one of max, mean, sum, min or argmax.
+        The argmax mode gives the index of the plane with the highest
+        intensity for each pixel.
+    dtype : numpy dtype
+        The dtype of the accumulator and the result. The default is the
+        image dtype for max and min, the numpy default for sum, float64
+        for mean and uint16 for argmax.
+
+    """
+
+    def __init__(self, mode: str, dtype: npt.DTypeLike | None = None) -> None:
+        """Set up instance."""
+        if mode not in PROJECTION_MODES:
+            raise ValueError(f"Invalid projection mode: {mode}")
+        self.mode = mode
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.count = 0
+        self._acc: npt.NDArray[Any] | None = None
+        self._max: npt.NDArray[Any] | None = None
+
+    def add(self, data: npt.NDArray[Any]) -> None:
+        """Add an image plane to the projection."""
+        if self._acc is None:
+            self._start(data)
+        elif self.mode == PROJECTION_MAX:
+            np.maximum(self._acc, data, out=self._acc, casting="unsafe")
+        elif self.mode == PROJECTION_MIN:
+            np.minimum(self._acc, data, out=self._acc, casting="unsafe")
+        elif self.mode == PROJECTION_ARGMAX:
+            assert self._max is not None  # noqa: S101
+            np.copyto(self._acc, self.count, where=data > self._max)
+            np.maximum(self._max, data, out=self._max)
+        else:
+            np.add(self._acc, data, out=self._acc, casting="unsafe")
+        self.count += 1
+
+    def result(self) -> npt.NDArray[Any]:
+        """Return the projection of the added planes."""
+        if self._acc is None:
+            raise ValueError("No image planes added to the projection")
+        if self.mode == PROJECTION_MEAN:
+            return np.divide(
+                self._acc, self.count, out=self._acc.copy(), casting="unsafe"
+            )
+        return self._acc
+
+    def _start(self, data: npt.NDArray[Any]) -> None:
+        """Set up the accumulator from the first plane."""
+        dtype = self.dtype
+        if self.mode == PROJECTION_ARGMAX:
+            self._max = data.copy()
+            self._acc = np.zeros(data.shape, dtype=dtype or np.uint16)
+        elif self.mode == PROJECTION_SUM and dtype is None:
+            self._acc = np.array(data, dtype=np.sum(data[:0]).dtype)
+        elif self.mode == PROJECTION_MEAN and dtype is None:
+            self._acc = data.astype(np.float64)
+        else:
+            self._acc = data.astype(dtype or data.dtype)
+
+
+def make_projections(
+    images: dict[str, int],
+    modes: Iterable[str] = (PROJECTION_MAX,),
+    dtypes: Mapping[str, npt.DTypeLike] | None = None,
+) -> dict[int, dict[str, ImageData]]:
+    """Make projections of several modes from a dict of channels and paths.
+
+    All projections are made in one pass over the images. Each image is
+    read once and is not kept.
+
+    Parameters
+    ----------
+    images : dict
+        Dict of paths and channel ids. The order of the paths of a channel
+        is the order of the planes.
+    modes : iterable of str
+        The projection modes to make for each channel.
+    dtypes : dict
+        Optional dict of projection modes and accumulator dtypes.
+
+    Returns
+    -------
+    dict
+        Return a dict of channels that map dicts of modes and ImageData
+        objects. Each image object have a projection as data and the path
+        and metadata of the last image of the channel.
+
+    """
+    modes = tuple(modes)
+    _LOGGER.info("Making %s projections...", ", ".join(modes))
+    dtypes = dtypes or {}
+    projs: dict[int, dict[str, Projection]] = {}
+    last_images: dict[int, ImageData] = {}
+    for path, channel in images.items():
+        image = ImageData(path=path, memmap=True)
+        data = image.data
+        # Exclude images with 0, 16 or 256 pixel side.
+        if len(data) == 0 or len(data) == 16 or len(data) == 256:
+            continue
+        if channel not in projs:
+            projs[channel] = {
+                mode: Projection(mode, dtypes.get(mode)) for mode in modes
+            }
+        for proj in projs[channel].values():
+            proj.add(data)
+        # Only keep the path and metadata of the last image of the channel.
+        image.data = None  # type: ignore[assignment]
+        last_images[channel] = image
+    results: dict[int, dict[str, ImageData]] = {}
+    for channel, channel_projs in projs.items():
+        image = last_images[channel]
+        results[channel] = {}
+        for mode, proj in channel_projs.items():
+            proj_img = ImageData(path=image.path, data=proj.result())
+            proj_img.description = image.description
+            results[channel][mode] = proj_img
+    return results
 
 
 def make_proj(images: dict[str, int]) -> dict[int, ImageData]:
     """Make a dict of max projections from a dict of channels and paths.
 
-    Each channel will make one max projection.
+    Each channel will make one max projection. The projection is updated
+    in place with each image, so each image is read once and is not kept.
 
     Parameters
     ----------
@@ -70,18 +697,10 @@ def make_proj(images: dict[str, int]) -> dict[int, ImageData]:
         Each image object have a max projection as data.
 
     """
-    _LOGGER.info("Making max projections...")
-    sorted_images: dict[int, list[ImageData]] = defaultdict(list)
-    max_imgs: dict[int, ImageData] = {}
-    for path, channel in images.items():
-        image = ImageData(path=path)
-        # Exclude images with 0, 16 or 256 pixel side.
-        if len(image.data) == 0 or len(image.data) == 16 or len(image.data) == 256:
-            continue
-        sorted_images[channel].append(image)
-        proj = np.max([img.data for img in sorted_images[channel]], axis=0)
-        max_imgs[channel] = ImageData(path=path, data=proj, metadata=image.metadata)
-    return max_imgs
+    return {
+        channel: projs[PROJECTION_MAX]
+        for channel, projs in make_projections(images).items()
+    }
 
 
 class ImageData:
@@ -95,11 +714,16 @@ class ImageData:
         A numpy array with the image data.
     metadata : dict
         The meta data of the image as a JSON dict.
+    memmap : bool
+        If True, memory map the image data when loaded from path if the
+        file layout allows it.
 
     Attributes
     ----------
     path : str
         The path to the image.
+    memmap : bool
+        True if the image data is memory mapped when loaded from path.
 
     """
 
@@ -108,11 +732,15 @@ class ImageData:
         path: str | None = None,
         data: npt.NDArray[Any] | None = None,
         metadata: dict[str, Any] | None = None,
+        memmap: bool = False,
     ) -> None:
         """Set up instance."""
         self.path = path
+        self.memmap = memmap
         self._data = data
-        self.description: str | None = None
+        self._description: str | None = None
+        self._metadata: dict[str, Any] | None = None
+        self._histogram: tuple[npt.NDArray[Any], npt.NDArray[Any]] | None = None
         if metadata is not None:
             self.metadata = metadata
 
@@ -131,19 +759,40 @@ class ImageData:
     def data(self, value: npt.NDArray[Any]) -> None:
         """Set the data of the image."""
         self._data = value
+        self._histogram = None
+
+    @property
+    def description(self) -> str | None:
+        """:str: Return the description string of the image.
+
+        :setter: Set the description string of the image.
+        """
+        return self._description
+
+    @description.setter
+    def description(self, value: str | None) -> None:
+        """Set the description string of the image."""
+        self._description = value
+        self._metadata = None
 
     @property
     def metadata(self) -> dict[str, Any]:
-        """:str: Return metadata of image.
+        """:dict: Return metadata of image.
+
+        Only the tags of the image are read if the image data is not loaded.
+        The parsed metadata is cached.
 
         :setter: Set the meta data of the image.
         """
-        if self.description is None:
-            self._load_image_data()
-        description = self.description
+        if self._metadata is not None:
+            return self._metadata
+        if self._description is None:
+            self._load_description()
+        description = self._description
         if description is None:
             return {}
-        return xmltodict.parse(description)
+        self._metadata = xmltodict.parse(description)
+        return self._metadata
 
     @metadata.setter
     def metadata(self, value: dict[str, Any]) -> None:
@@ -152,16 +801,23 @@ class ImageData:
 
     @property
     def histogram(self) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
-        """:numpy array: Calculate and return image histogram."""
-        if self._data is None:
-            self._load_image_data()
-        data = self._data
-        assert data is not None  # noqa: S101
-        if data.dtype.name == "uint16":
-            max_int = 65535
-        else:
-            max_int = 255
-        return np.histogram(data, bins=256, range=(0, max_int))
+        """:tuple: Calculate and return image histogram.
+
+        The histogram is cached until the image data is set.
+        """
+        if self._histogram is None:
+            self._histogram = histogram(self.data)
+        return self._histogram
+
+    def _load_description(self) -> None:
+        """Load the image description from path."""
+        if self.path is None:
+            _LOGGER.error("Cannot load image description: path is None")
+            return
+        try:
+            self.description = read_description(self.path)
+        except (OSError, ValueError) as exception:
+            _LOGGER.error("Bad path %s to image: %s", self.path, exception)
 
     def _load_image_data(self) -> None:
         """Load image data from path."""
@@ -169,19 +825,20 @@ class ImageData:
             _LOGGER.error("Cannot load image data: path is None")
             return
         try:
-            with tifffile.TiffFile(self.path) as tif:
-                self._data = tif.asarray(key=0)
-                page = tif.pages[0]
-                self.description = getattr(page, "description", "")
+            self._data, description = load_image(self.path, self.memmap)
         except (OSError, ValueError) as exception:
             _LOGGER.error("Bad path %s to image: %s", self.path, exception)
+            return
+        if self._description is None:
+            self._description = description
 
     def save(
         self,
         path: str | None = None,
         data: npt.NDArray[Any] | None = None,
         metadata: dict[str, Any] | None = None,
-    ) -> None:
+        writer: ImageWriter | None = None,
+    ) -> Future[str] | None:
         """Save image with image data and optional meta data.
 
         Parameters
@@ -192,6 +849,14 @@ class ImageData:
             A numpy array with the image data.
         metadata : dict
             The meta data of the image as a JSON dict.
+        writer : ImageWriter instance
+            Optional image writer to save the image in the background.
+
+        Returns
+        -------
+        concurrent.futures.Future instance
+            Return a future that is done when the image is written if a
+            writer is used, otherwise None.
 
         """
         if path is None:
@@ -201,8 +866,357 @@ class ImageData:
         if metadata is None:
             metadata = self.metadata
         description = xmltodict.unparse(metadata)
+        if writer is not None:
+            return writer.submit(path, data, description)  # type: ignore[arg-type]
         save_image(path, data, description)  # type: ignore[arg-type]
+        return None
 
     def __repr__(self) -> str:
         """Return the representation."""
         return f"ImageData(path={self.path})"
+
+
+def _load_image_data(path: str, memmap: bool) -> ImageData | None:
+    """Load the data of an image and return an ImageData object."""
+    try:
+        data, description = load_image(path, memmap)
+    except (OSError, ValueError) as exception:
+        _LOGGER.error("Bad path %s to image: %s", path, exception)
+        return None
+    image = ImageData(path=path, data=data, memmap=memmap)
+    image.description = description
+    return image
+
+
+def load_images(
+    paths: Iterable[str],
+    workers: int = 4,
+    ordered: bool = True,
+    prefetch: int | None = None,
+    memmap: bool = False,
+    executor: Executor | None = None,
+) -> Iterator[ImageData]:
+    """Load the data of many images in a thread pool.
+
+    Images that can't be read are logged and skipped.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        The paths to the images.
+    workers : int
+        The number of threads that load images. Not used if an executor
+        is passed.
+    ordered : bool
+        If True, yield the images in the order of the paths, otherwise
+        yield the images as they are loaded.
+    prefetch : int
+        The maximum number of images to load ahead of the consumer.
+        The default is twice the number of workers.
+    memmap : bool
+        If True, memory map the image data if the file layout allows it.
+    executor : concurrent.futures.Executor instance
+        Optional executor to load the images in.
+
+    Yields
+    ------
+    ImageData instance
+        An image with the image data loaded.
+
+    """
+    prefetch = max(1, prefetch or 2 * workers)
+    own_executor = executor is None
+    pool = executor or ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="load_images"
+    )
+    pending: deque[Future[ImageData | None]] = deque()
+    paths_iter = iter(paths)
+    try:
+        for path in paths_iter:
+            pending.append(pool.submit(_load_image_data, path, memmap))
+            if len(pending) < prefetch:
+                continue
+            yield from _pop_loaded(pending, ordered)
+        while pending:
+            yield from _pop_loaded(pending, ordered)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _pop_loaded(
+    pending: deque[Future[ImageData | None]], ordered: bool
+) -> Iterator[ImageData]:
+    """Wait for and yield the next loaded image, or all done if unordered."""
+    if ordered:
+        done = [pending.popleft()]
+    else:
+        done_set, _ = wait(pending, return_when=FIRST_COMPLETED)
+        done = [future for future in pending if future in done_set]
+        for future in done:
+            pending.remove(future)
+    for future in done:
+        image = future.result()
+        if image is not None:
+            yield image
+
+
+async def async_load_images(
+    center: Center,
+    paths: Iterable[str],
+    ordered: bool = True,
+    prefetch: int = 8,
+    memmap: bool = False,
+) -> AsyncIterator[ImageData]:
+    """Load the data of many images in the executor of the center.
+
+    Images that can't be read are logged and skipped.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    paths : iterable of str
+        The paths to the images.
+    ordered : bool
+        If True, yield the images in the order of the paths, otherwise
+        yield the images as they are loaded.
+    prefetch : int
+        The maximum number of images to load ahead of the consumer.
+    memmap : bool
+        If True, memory map the image data if the file layout allows it.
+
+    Yields
+    ------
+    ImageData instance
+        An image with the image data loaded.
+
+    """
+    pending: deque[asyncio.Future[ImageData | None]] = deque()
+    paths_iter = iter(paths)
+    try:
+        while True:
+            for path in paths_iter:
+                pending.append(center.add_executor_job(_load_image_data, path, memmap))
+                if len(pending) >= max(1, prefetch):
+                    break
+            if not pending:
+                return
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                future = next(future for future in pending if future in done)
+                pending.remove(future)
+            image = await future
+            if image is not None:
+                yield image
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class ImageWriter:
+    """Write images in background threads.
+
+    Images are written atomically via a temporary file. The queue of
+    images to write is bounded. Submitting an image blocks, or waits for
+    the async version, while the queue is full.
+
+    Parameters
+    ----------
+    center : Center instance
+        Optional Center instance. If set, an image saved event is fired
+        when an image is written or fails to write.
+    workers : int
+        The number of writer threads.
+    max_queue : int
+        The maximum number of images waiting to be written.
+
+    """
+
+    def __init__(
+        self, center: Center | None = None, workers: int = 2, max_queue: int = 16
+    ) -> None:
+        """Set up instance."""
+        self.center = center
+        self.workers = workers
+        self.max_queue = max_queue
+        self.bytes_written = 0
+        self.images_written = 0
+        self.errors = 0
+        self._queue: queue.Queue[
+            tuple[str, npt.NDArray[Any], str | None, Future[str]] | None
+        ] = queue.Queue(max_queue)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._writes: deque[tuple[float, int]] = deque()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return (
+            f"ImageWriter(workers={self.workers}, max_queue={self.max_queue}, "
+            f"queue_depth={self.queue_depth})"
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """:int: Return the number of images waiting to be written."""
+        return self._queue.qsize()
+
+    @property
+    def bytes_per_second(self) -> float:
+        """:float: Return the bytes written per second in the recent window."""
+        with self._lock:
+            self._trim_writes(time.monotonic())
+            return sum(nbytes for _, nbytes in self._writes) / WRITER_RATE_WINDOW
+
+    def start(self) -> None:
+        """Start the writer threads if not running."""
+        with self._lock:
+            if self._threads:
+                return
+            for idx in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"image_writer_{idx}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Write the queued images and stop the writer threads."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def submit(
+        self, path: str, data: npt.NDArray[Any], description: str | None = None
+    ) -> Future[str]:
+        """Queue an image to write and return a future for the written path.
+
+        Block while the queue is full. The image data must not be changed
+        until the image is written.
+
+        Parameters
+        ----------
+        path : str
+            The path to the image.
+        data : numpy array
+            A numpy array with the image data.
+        description : str
+            The description string of the image.
+
+        Returns
+        -------
+        concurrent.futures.Future instance
+            Return a future that is done when the image is written.
+
+        """
+        self.start()
+        future: Future[str] = Future()
+        self._queue.put((path, data, description, future))
+        return future
+
+    async def async_submit(
+        self, path: str, data: npt.NDArray[Any], description: str | None = None
+    ) -> asyncio.Future[str]:
+        """Queue an image to write and return a future for the written path.
+
+        Wait without blocking the event loop while the queue is full.
+        The image data must not be changed until the image is written.
+
+        Parameters
+        ----------
+        path : str
+            The path to the image.
+        data : numpy array
+            A numpy array with the image data.
+        description : str
+            The description string of the image.
+
+        Returns
+        -------
+        asyncio.Future instance
+            Return a future that is done when the image is written.
+
+        """
+        self.start()
+        future: Future[str] = Future()
+        item = (path, data, description, future)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._queue.put, item
+            )
+        return asyncio.wrap_future(future)
+
+    def _run(self) -> None:
+        """Write queued images until stopped."""
+        while (item := self._queue.get()) is not None:
+            path, data, description, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                save_image_atomic(path, data, description)
+            except Exception as exc:
+                _LOGGER.error("Failed to write image %s: %s", path, exc)
+                with self._lock:
+                    self.errors += 1
+                future.set_exception(exc)
+                self._notify(path, 0, str(exc))
+                continue
+            with self._lock:
+                now = time.monotonic()
+                self._writes.append((now, data.nbytes))
+                self._trim_writes(now)
+                self.bytes_written += data.nbytes
+                self.images_written += 1
+            future.set_result(path)
+            self._notify(path, data.nbytes, None)
+
+    def _trim_writes(self, now: float) -> None:
+        """Remove writes older than the rate window."""
+        while self._writes and self._writes[0][0] < now - WRITER_RATE_WINDOW:
+            self._writes.popleft()
+
+    def _notify(self, path: str, nbytes: int, error: str | None) -> None:
+        """Fire an image saved event on the event loop of the center."""
+        center = self.center
+        if center is None:
+            return
+        event = ImageSavedEvent({"path": path, "nbytes": nbytes, "error": error})
+        with suppress(RuntimeError):  # The event loop is closed.
+            center.loop.call_soon_threadsafe(
+                lambda: center.create_task(center.bus.notify(event))
+            )
+
+
+class ImageSavedEvent(Event):
+    """An event fired when an image writer has written an image."""
+
+    __slots__ = ()
+
+    event_type: ClassVar[str] = IMAGE_SAVED_EVENT
+
+    @property
+    def path(self) -> str:
+        """:str: Return the path of the image."""
+        return self.data["path"]
+
+    @property
+    def nbytes(self) -> int:
+        """:int: Return the number of bytes of image data written."""
+        return self.data.get("nbytes", 0)
+
+    @property
+    def error(self) -> str | None:
+        """:str: Return the error message if the image failed to write."""
+        return self.data.get("error")
@@ -0,0 +1,255 @@
+"""Store image data in chunked arrays, one appendable array per field.
+
+The store is a directory tree in the style of a Zarr group hierarchy::
+
+    root/
+      <plate_name>/
+        <well_x>.<well_y>/
+          <field_x>.<field_y>/
+            <array>/
+              index.json
+              data.bin
+
+Each array holds image planes of the same shape and dtype. New planes
+are appended to ``data.bin`` as they arrive and ``index.json`` maps the
+chunk key ``<channel_id>.<z_slice_id>`` of each plane to its position in
+``data.bin``. A plane that arrives again overwrites its position.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import suppress
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Any, NamedTuple
+
+import numpy as np
+from numpy import typing as npt
+
+DATA_FILE = "data.bin"
+INDEX_FILE = "index.json"
+
+
+class FieldKey(NamedTuple):
+    """Represent the coordinates of a field in the store."""
+
+    plate_name: str
+    well_x: int
+    well_y: int
+    field_x: int
+    field_y: int
+
+
+class ArrayStore:
+    """Store image planes in one appendable array per field and array name.
+
+    Parameters
+    ----------
+    root : str
+        The path to the root directory of the store.
+
+    """
+
+    def __init__(self, root: str | os.PathLike[str]) -> None:
+        """Set up instance."""
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._indexes: dict[Path, dict[str, Any]] = {}
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"ArrayStore(root={self.root})"
+
+    def array_dir(self, field: FieldKey, array: str) -> Path:
+        """Return the directory of an array of a field."""
+        return (
+            self.root
+            / str(field.plate_name)
+            / f"{field.well_x}.{field.well_y}"
+            / f"{field.field_x}.{field.field_y}"
+            / array
+        )
+
+    def append(
+        self,
+        field: FieldKey,
+        data: npt.NDArray[Any],
+        channel_id: int = 0,
+        z_slice_id: int = 0,
+        array: str = "image",
+    ) -> None:
+        """Append an image plane to an array of a field.
+
+        A plane with the same channel and z slice overwrites the previous
+        one in place, so the data file doesn't grow when a field is
+        acquired again.
+
+        Parameters
+        ----------
+        field : FieldKey
+            The coordinates of the field.
+        data : numpy array
+            A numpy array with the image data.
+        channel_id : int
+            The channel of the plane.
+        z_slice_id : int
+            The z slice of the plane.
+        array : str
+            The name of the array, eg a projection mode.
+
+        Raises
+        ------
+        ValueError
+            If the shape or dtype of data doesn't match the array.
+
+        """
+        array_dir = self.array_dir(field, array)
+        data = np.ascontiguousarray(data)
+        with self._lock:
+            index = self._load_index(array_dir)
+            if index is None:
+                array_dir.mkdir(parents=True, exist_ok=True)
+                index = {
+                    "dtype": data.dtype.str,
+                    "shape": list(data.shape),
+                    "planes": {},
+                    "size": 0,
+                }
+            elif index["dtype"] != data.dtype.str or index["shape"] != list(data.shape):
+                raise ValueError(
+                    f"Plane {data.dtype.str} {list(data.shape)} does not match "
+                    f"array {array_dir} {index['dtype']} {index['shape']}"
+                )
+            key = f"{channel_id}.{z_slice_id}"
+            position: int | None = index["planes"].get(key)
+            if position is not None:
+                with open(array_dir / DATA_FILE, "r+b") as data_file:
+                    data_file.seek(position * data.nbytes)
+                    data_file.write(data.tobytes())
+                return
+            with open(array_dir / DATA_FILE, "ab") as data_file:
+                # Drop any partly written plane that is not in the index.
+                data_file.truncate(index["size"] * data.nbytes)
+                data_file.write(data.tobytes())
+            # Only the saved index replaces the cached index.
+            self._save_index(
+                array_dir,
+                {
+                    **index,
+                    "planes": {**index["planes"], key: index["size"]},
+                    "size": index["size"] + 1,
+                },
+            )
+
+    def planes(
+        self, field: FieldKey, array: str = "image"
+    ) -> dict[tuple[int, int], npt.NDArray[Any]]:
+        """Return the planes of an array of a field.
+
+        Parameters
+        ----------
+        field : FieldKey
+            The coordinates of the field.
+        array : str
+            The name of the array.
+
+        Returns
+        -------
+        dict
+            Return a dict of channel and z slice tuples that map read only
+            memory mapped planes. The dict is empty if the array is missing.
+
+        """
+        array_dir = self.array_dir(field, array)
+        with self._lock:
+            index = self._load_index(array_dir)
+            if index is None:
+                return {}
+            positions = dict(index["planes"])
+            size = index["size"]
+        data = np.memmap(
+            array_dir / DATA_FILE,
+            dtype=np.dtype(index["dtype"]),
+            mode="r",
+            shape=(size, *index["shape"]),
+        )
+        planes = {}
+        for key, position in positions.items():
+            channel_id, z_slice_id = key.split(".")
+            planes[int(channel_id), int(z_slice_id)] = data[position]
+        return planes
+
+    def read_stack(self, field: FieldKey, array: str = "image") -> npt.NDArray[Any]:
+        """Return an array of a field as a stack of channels and z slices.
+
+        Parameters
+        ----------
+        field : FieldKey
+            The coordinates of the field.
+        array : str
+            The name of the array.
+
+        Returns
+        -------
+        numpy array
+            Return a numpy array with the dimensions channel, z, y and x,
+            ordered by channel and z slice id. Missing planes are zero.
+
+        """
+        planes = self.planes(field, array)
+        if not planes:
+            raise KeyError(f"No array {array} for field {field}")
+        channels = sorted({channel_id for channel_id, _ in planes})
+        z_slices = sorted({z_slice_id for _, z_slice_id in planes})
+        first = next(iter(planes.values()))
+        stack = np.zeros((len(channels), len(z_slices), *first.shape), first.dtype)
+        for (channel_id, z_slice_id), plane in planes.items():
+            stack[channels.index(channel_id), z_slices.index(z_slice_id)] = plane
+        return stack
+
+    def fields(self) -> dict[FieldKey, list[str]]:
+        """Return the fields in the store and the names of their arrays."""
+        fields: defaultdict[FieldKey, list[str]] = defaultdict(list)
+        for index_path in sorted(self.root.glob(f"*/*/*/*/{INDEX_FILE}")):
+            field_dir = index_path.parent.parent
+            well_x, well_y = field_dir.parent.name.split(".")
+            field_x, field_y = field_dir.name.split(".")
+            field = FieldKey(
+                field_dir.parent.parent.name,
+                int(well_x),
+                int(well_y),
+                int(field_x),
+                int(field_y),
+            )
+            fields[field].append(index_path.parent.name)
+        return dict(fields)
+
+    def _load_index(self, array_dir: Path) -> dict[str, Any] | None:
+        """Return the index of an array or None if missing."""
+        index = self._indexes.get(array_dir)
+        if index is not None:
+            return index
+        try:
+            with open(array_dir / INDEX_FILE, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            return None
+        self._indexes[array_dir] = index
+        return index
+
+    def _save_index(self, array_dir: Path, index: dict[str, Any]) -> None:
+        """Save the index of an array atomically."""
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=array_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as index_file:
+                json.dump(index, index_file)
+            os.replace(temp_path, array_dir / INDEX_FILE)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(temp_path)
+            raise
+        self._indexes[array_dir] = index
@@ -23,35 +23,54 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
-COMMAND_VALIDATOR = vol.Any([(str, str)], vol.Coerce(str))
+COMMAND_VALIDATOR = vol.Any([(str, str)], bytes, vol.Coerce(str))
+COMMANDS_SCHEMA = vol.Schema([COMMAND_VALIDATOR])
 
 
 def validate_commands(value: Any) -> list[Any]:
-    """Validate a template string via JSON."""
+    """Validate a list of commands or a JSON string of a list of commands.
+
+    A list, eg rendered by a template with a single expression, is
+    validated as is without a JSON round trip.
+    """
     if isinstance(value, str):
         try:
-            return json.loads(value)
+            value = json.loads(value)
         except ValueError as exc:
             raise vol.Invalid(f"Invalid commands: {value}") from exc
-    else:
-        schema = vol.Schema([COMMAND_VALIDATOR])
-        return schema(value)
+    if not isinstance(value, list):
+        return COMMANDS_SCHEMA(value)
+    if all(isinstance(command, (bytes, str)) for command in value):
+        # Encoded commands are valid as is.
+        return value
+    return COMMANDS_SCHEMA([_to_tuple_pairs(command) for command in value])
+
+
+def _to_tuple_pairs(command: Any) -> Any:
+    """Return the key value pairs of a command as tuples.
+
+    JSON and templates give the pairs as lists.
+    """
+    if not isinstance(command, list):
+        return command
+    return [tuple(pair) if isinstance(pair, list) else pair for pair in command]
 
 
 ACTION_SEND = "send"
 ACTION_SEND_MANY = "send_many"
 ACTION_START_IMAGING = "start_imaging"
 ACTION_STOP_IMAGING = "stop_imaging"
+API_NAME = "api_name"
 CONF_API = "api"
 DATA_API = "api"
 
-SEND_ACTION_SCHEMA = BASE_ACTION_SCHEMA.extend(
-    {"api_name": vol.Coerce(str), "command": COMMAND_VALIDATOR}
-)
+API_ACTION_SCHEMA = BASE_ACTION_SCHEMA.extend({API_NAME: vol.Coerce(str)})
 
-SEND_MANY_ACTION_SCHEMA = BASE_ACTION_SCHEMA.extend({"commands": validate_commands})
+SEND_ACTION_SCHEMA = API_ACTION_SCHEMA.extend({"command": COMMAND_VALIDATOR})
 
-START_IMAGING_ACTION_SCHEMA = STOP_IMAGING_ACTION_SCHEMA = BASE_ACTION_SCHEMA
+SEND_MANY_ACTION_SCHEMA = API_ACTION_SCHEMA.extend({"commands": validate_commands})
+
+START_IMAGING_ACTION_SCHEMA = STOP_IMAGING_ACTION_SCHEMA = API_ACTION_SCHEMA
 
 ACTION_TO_METHOD: dict[str, dict[str, Any]] = {
     ACTION_SEND: {"method": "send", "schema": SEND_ACTION_SCHEMA},
@@ -98,13 +117,17 @@ async def setup_module(center: Center, config: dict[str, Any]) -> None:
         """
         action_id = kwargs.pop("action_id")
         method = ACTION_TO_METHOD[action_id]["method"]
-        api_name = kwargs.pop("api_name", None)
+        api_name = kwargs.pop(API_NAME, None)
         if api_name:
-            apis = [api_store[api_name]]
-        else:
-            apis = list(api_store.values())
+            # Only call the named api and leave the other apis alone.
+            if (api := api_store.get(api_name)) is None:
+                _LOGGER.error("No api registered with name %s", api_name)
+                return
+            _LOGGER.debug("Handle API %s action %s: %s", api.name, action_id, kwargs)
+            await getattr(api, method)(**kwargs)
+            return
         tasks: list[asyncio.Task[Any]] = []
-        for api in apis:
+        for api in api_store.values():
             _LOGGER.debug("Handle API %s action %s: %s", api.name, action_id, kwargs)
             tasks.append(center.create_task(getattr(api, method)(**kwargs)))
         if tasks:
@@ -166,6 +189,11 @@ class CommandEvent(Event):
 
     event_type: ClassVar[str] = COMMAND_EVENT
 
+    @property
+    def api_name(self) -> str | None:
+        """:str: Return the name of the api that received the command."""
+        return self.data.get(API_NAME)
+
     @property
     def command(self) -> str | None:
         """:str: Return the command string."""
@@ -204,6 +232,11 @@ class ImageEvent(Event):
 
     event_type: ClassVar[str] = IMAGE_EVENT
 
+    @property
+    def api_name(self) -> str | None:
+        """:str: Return the name of the api that saved the image."""
+        return self.data.get(API_NAME)
+
     @property
     def path(self) -> str:
         """:str: Return absolute path to the image."""
@@ -5,50 +5,134 @@
 # This file was modified by The Camacq Authors.
 from __future__ import annotations
 
+import asyncio
 from collections import deque
 from collections.abc import Callable, Generator
 from functools import partial
+import json
 import logging
 from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
 
-from camacq.const import CAMACQ_STOP_EVENT, CONF_DATA, CONF_ID
+from camacq.const import CAMACQ_START_EVENT, CAMACQ_STOP_EVENT, CONF_DATA, CONF_ID
+from camacq.event import Event, get_event_types
 from camacq.exceptions import TemplateError
 from camacq.helper import BASE_ACTION_SCHEMA, get_module, has_at_least_one_key
-from camacq.helper.template import make_template, render_template
+from camacq.helper.template import (
+    get_env,
+    is_template_string,
+    make_condition,
+    make_template,
+    no_render_cache,
+    render_cache,
+    render_template,
+)
+
+from .graph import AutomationGraph, get_defined_event_types
+from .trace import (
+    OUTCOME_CANCELLED,
+    OUTCOME_CONDITION_FAILED,
+    OUTCOME_DELAYED,
+    OUTCOME_DONE,
+    OUTCOME_DROPPED,
+    OUTCOME_TEMPLATE_ERROR,
+    Trace,
+    TraceStore,
+    get_outcome,
+    trace_action,
+)
 
 if TYPE_CHECKING:
     from jinja2 import Template
 
     from camacq.control import Center
-    from camacq.event import Event
 
 _LOGGER = logging.getLogger(__name__)
 
+ATTR_EVENT = "event"
 CONF_AUTOMATIONS = "automations"
 CONF_ACTION = "action"
+CONF_ACTIONS = "actions"
+CONF_CACHE = "cache"
 CONF_CONDITION = "condition"
 CONF_CONDITIONS = "conditions"
+CONF_MAX = "max"
+CONF_MODE = "mode"
 CONF_NAME = "name"
+CONF_PATH = "path"
+CONF_TIMEOUT = "timeout"
+CONF_TRACE = "trace"
+CONF_TRACE_PATH = "trace_path"
 CONF_TRIGGER = "trigger"
 CONF_TYPE = "type"
 ENABLED = "enabled"
 NAME = "name"
 ACTION_DELAY = "delay"
+ACTION_PARALLEL = "parallel"
 ACTION_TOGGLE = "toggle"
+ACTION_TRACES = "traces"
+DATA_AUTOMATION_CONFIG = "automation_config"
+DATA_AUTOMATION_GRAPH = "automation_graph"
 DATA_AUTOMATIONS = "automations"
+DEFAULT_MAX_QUEUED = 10
+MODE_PARALLEL = "parallel"
+MODE_QUEUED = "queued"
+MODE_RESTART = "restart"
+MODE_SINGLE = "single"
+RUN_MODES = (MODE_PARALLEL, MODE_QUEUED, MODE_RESTART, MODE_SINGLE)
+EVENT_TRIGGER_TYPES = ("event", "debounce", "throttle")
+
+TRIGGER_ACTION_ITEM_SCHEMA = {
+    vol.Required(CONF_TYPE): vol.Coerce(str),
+    vol.Required(CONF_ID): vol.Coerce(str),
+    vol.Optional(CONF_DATA, default={}): dict,
+}
+
+TRIGGER_ACTION_SCHEMA = vol.Schema([TRIGGER_ACTION_ITEM_SCHEMA])
+
+
+def no_delay(value: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Validate that a group of parallel actions has no delay action."""
+    for action_conf in value:
+        if (
+            action_conf[CONF_TYPE] == "automations"
+            and action_conf[CONF_ID] == ACTION_DELAY
+        ):
+            raise vol.Invalid("A delay action can't run in a parallel action")
+    return value
 
-TRIGGER_ACTION_SCHEMA = vol.Schema(
-    [
-        {
-            vol.Required(CONF_TYPE): vol.Coerce(str),
-            vol.Required(CONF_ID): vol.Coerce(str),
-            vol.Optional(CONF_DATA, default={}): dict,
-        }
-    ],
+
+PARALLEL_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_ACTIONS): vol.All(
+            vol.Length(min=1), lambda value: ACTION_SCHEMA(value), no_delay
+        ),
+        vol.Optional(CONF_MAX): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+    }
 )
 
+
+def valid_action(value: dict[str, Any]) -> dict[str, Any]:
+    """Validate the data of a parallel action."""
+    if is_parallel(value):
+        value[CONF_DATA] = PARALLEL_SCHEMA(value[CONF_DATA])
+    return value
+
+
+def is_parallel(action_conf: dict[str, Any]) -> bool:
+    """Return True if the action config is for a parallel action."""
+    return bool(
+        action_conf[CONF_TYPE] == "automations"
+        and action_conf[CONF_ID] == ACTION_PARALLEL
+    )
+
+
+ACTION_SCHEMA: Any = vol.Schema([vol.All(TRIGGER_ACTION_ITEM_SCHEMA, valid_action)])
+
 CONDITION_SCHEMA: Any = vol.All(
     has_at_least_one_key(CONF_TYPE, CONF_CONDITION),
     {
@@ -67,10 +151,15 @@ CONFIG_SCHEMA = vol.Schema(
         {
             vol.Required(CONF_NAME): vol.Coerce(str),
             vol.Required(CONF_TRIGGER): TRIGGER_ACTION_SCHEMA,
-            vol.Required(CONF_ACTION): TRIGGER_ACTION_SCHEMA,
+            vol.Required(CONF_ACTION): ACTION_SCHEMA,
             vol.Optional(
                 CONF_CONDITION, default={CONF_CONDITION: "true"}
             ): CONDITION_SCHEMA,
+            vol.Optional(CONF_MODE, default=MODE_PARALLEL): vol.In(RUN_MODES),
+            vol.Optional(CONF_MAX): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(CONF_TRACE, default=False): vol.Boolean(),
+            vol.Optional(CONF_TRACE_PATH): vol.Coerce(str),
+            vol.Optional(CONF_CACHE, default=False): vol.Boolean(),
         }
     ]
 )
@@ -112,11 +201,82 @@ async def setup_module(center: Center, config: dict[str, Any]) -> None:
         "automations", ACTION_TOGGLE, handle_action, toggle_action_schema
     )
 
+    def get_traces(name: str | None = None) -> dict[str, dict[str, Any]]:
+        """Return the stats and traces of the traced automations."""
+        return {
+            automation.name: automation.traces.as_dict()
+            for automation in automations.values()
+            if automation.traces is not None and name in (None, automation.name)
+        }
+
+    async def handle_traces(**kwargs: Any) -> None:
+        """Log the stats of traced automations or dump them to a file."""
+        traces = get_traces(kwargs.get(NAME))
+        path: str | None = kwargs.get(CONF_PATH)
+        if path is None:
+            for name, data in traces.items():
+                _LOGGER.info("Automation %s stats: %s", name, data["stats"])
+            return
+        await center.add_executor_job(_write_json, path, traces)
+
+    traces_action_schema = BASE_ACTION_SCHEMA.extend(
+        {
+            vol.Optional(NAME): vol.All(vol.Coerce(str), vol.In(automations)),
+            vol.Optional(CONF_PATH): vol.Coerce(str),
+        }
+    )
+
+    center.actions.register(
+        "automations", ACTION_TRACES, handle_traces, traces_action_schema
+    )
+
+    async def dump_traces(center: Center, event: Event) -> None:
+        """Dump the stats and traces of traced automations when camacq stops.
+
+        The traces are written to the trace path of the automation or
+        logged if the automation has no trace path.
+        """
+        trace_paths: dict[str, str | None] = {
+            block[CONF_NAME]: block.get(CONF_TRACE_PATH)
+            for block in center.data.get(DATA_AUTOMATION_CONFIG, [])
+        }
+        path_traces: dict[str, dict[str, dict[str, Any]]] = {}
+        for name, data in get_traces().items():
+            if (path := trace_paths.get(name)) is None:
+                _LOGGER.info("Automation %s traces: %s", name, data)
+                continue
+            path_traces.setdefault(path, {})[name] = data
+        for path, traces in path_traces.items():
+            await center.add_executor_job(_write_json, path, traces)
+
+    center.bus.register(CAMACQ_STOP_EVENT, dump_traces)
+
+    async def analyze_automations(center: Center, event: Event) -> None:
+        """Build the automation graph when all plugins are set up."""
+        graph = build_graph(center, center.data[DATA_AUTOMATION_CONFIG])
+        center.data[DATA_AUTOMATION_GRAPH] = graph
+        for cycle in graph.cycles:
+            _LOGGER.info("Automations can trigger each other in a cycle: %s", cycle)
+        for name in sorted(graph.unreachable):
+            _LOGGER.warning(
+                "Automation %s is only triggered by event types that no event has",
+                name,
+            )
+
+    center.bus.register(CAMACQ_START_EVENT, analyze_automations)
+
+
+def _write_json(path: str, data: Any) -> None:
+    """Write data as JSON to a file."""
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, indent=2)
+
 
 def _process_automations(center: Center, config: dict[str, Any]) -> None:
     """Process automations from config."""
     automations: dict[str, Automation] = center.data.setdefault(DATA_AUTOMATIONS, {})
     conf: list[dict[str, Any]] = config[CONF_AUTOMATIONS]
+    center.data.setdefault(DATA_AUTOMATION_CONFIG, []).extend(conf)
     for block in conf:
         name: str = block[CONF_NAME]
         _LOGGER.debug("Setting up automation %s", name)
@@ -124,15 +284,104 @@ def _process_automations(center: Center, config: dict[str, Any]) -> None:
         cond_func = _process_condition(center, block[CONF_CONDITION])
         # use partial to get a function with args to call later
         attach_triggers = partial(_process_trigger, center, block[CONF_TRIGGER])
+        mode: str = block.get(CONF_MODE, MODE_PARALLEL)
+        max_runs: int | None = block.get(CONF_MAX)
+        if max_runs is None and mode == MODE_QUEUED:
+            max_runs = DEFAULT_MAX_QUEUED
         automations[name] = Automation(
-            center, name, attach_triggers, cond_func, action_sequence
+            center,
+            name,
+            attach_triggers,
+            cond_func,
+            action_sequence,
+            mode=mode,
+            max_runs=max_runs,
+            trace=block.get(CONF_TRACE, False),
+            cache=block.get(CONF_CACHE, False),
         )
 
 
+def build_graph(center: Center, config: list[dict[str, Any]]) -> AutomationGraph:
+    """Return the graph of how automations trigger each other.
+
+    Only the sample set_sample action is known to fire events. Other
+    actions, eg commands to the microscope, are treated as event sources
+    outside the graph. A set_sample action with template data for the
+    sample or container name can fire any event type. An automation is
+    unreachable if it's only triggered by event types that no event has.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    config : list
+        The validated config blocks of the automations.
+
+    Returns
+    -------
+    AutomationGraph instance
+        Return the automation graph.
+
+    """
+    triggers: dict[str, set[str | None]] = {}
+    fires: dict[str, set[str] | None] = {}
+    for block in config:
+        name: str = block[CONF_NAME]
+        triggers[name] = {
+            trigger_conf[CONF_ID]
+            if trigger_conf[CONF_TYPE] in EVENT_TRIGGER_TYPES
+            else None
+            for trigger_conf in block[CONF_TRIGGER]
+        }
+        fires[name] = _get_fired_event_types(center, block[CONF_ACTION])
+    return AutomationGraph(triggers, fires, get_defined_event_types())
+
+
+def _get_fired_event_types(
+    center: Center, config_block: list[dict[str, Any]]
+) -> set[str] | None:
+    """Return the event types that actions can fire or None for any type."""
+    env = get_env(center)
+    fired: set[str] = set()
+    for action_conf in config_block:
+        data: dict[str, Any] = action_conf[CONF_DATA]
+        if is_parallel(action_conf):
+            parallel_fired = _get_fired_event_types(center, data[CONF_ACTIONS])
+            if parallel_fired is None:
+                return None
+            fired |= parallel_fired
+            continue
+        if action_conf[CONF_TYPE] != "sample" or action_conf[CONF_ID] != "set_sample":
+            continue
+        sample_name: str | None = data.get("sample_name")
+        container_name = str(data.get(CONF_NAME))
+        if is_template_string(env, sample_name) or is_template_string(
+            env, container_name
+        ):
+            return None
+        if sample_name is None:
+            # The action sets the container of all samples.
+            samples = list(center.samples.values())
+        elif (sample := center.samples.get(sample_name)) is not None:
+            samples = [sample]
+        else:
+            return None
+        for sample in samples:
+            event_classes = sample.change_events(container_name)
+            if event_classes is None:
+                return None
+            for event_class in event_classes:
+                fired.update(get_event_types(event_class))
+    return fired
+
+
 def _get_actions(center: Center, config_block: list[dict[str, Any]]) -> ActionSequence:
     """Return actions."""
     actions: Generator[TemplateAction, None, None] = (
-        TemplateAction(center, action_conf) for action_conf in config_block
+        ParallelAction(center, action_conf)
+        if is_parallel(action_conf)
+        else TemplateAction(center, action_conf)
+        for action_conf in config_block
     )
 
     return ActionSequence(center, actions)
@@ -152,8 +401,7 @@ def _process_condition(
         return make_checker(condition_type, checks)
 
     data: str = config_block[CONF_CONDITION]
-    template: Template = make_template(center, data)
-    return partial(render_template, template)
+    return make_condition(center, data)
 
 
 def make_checker(
@@ -217,7 +465,31 @@ def _process_trigger(
 
 
 class Automation:
-    """Automation class."""
+    """Automation class.
+
+    The run mode sets what happens when the automation is triggered while
+    it's running. In mode parallel a new run starts, with at most
+    max_runs runs at the same time. In mode single the new run is
+    dropped. In mode queued the new run waits for the previous runs to
+    finish, with at most max_runs runs waiting. In mode restart the
+    running runs are cancelled and the new run starts.
+
+    If trace is True, the timing and outcome of each run is recorded. If
+    cache is True, the templates of a run triggered by an event share a
+    render cache with the other automations with cache that are
+    triggered by the same event.
+
+    Attributes
+    ----------
+    dropped : int
+        Return the number of dropped runs.
+    queued : int
+        Return the number of runs that waited for a previous run.
+    traces : TraceStore instance or None
+        Return the recent traces and the stats of the runs if the
+        automation is traced.
+
+    """
 
     def __init__(
         self,
@@ -229,15 +501,28 @@ class Automation:
         cond_func: Callable[[dict[str, Any]], str | bool],
         action_sequence: ActionSequence,
         enabled: bool = True,
+        mode: str = MODE_PARALLEL,
+        max_runs: int | None = None,
+        trace: bool = False,
+        cache: bool = False,
     ) -> None:
         """Set up instance."""
         self._center = center
         self.name = name
         self.enabled = False
+        self.mode = mode
+        self.max_runs = max_runs
+        self.cache = cache
+        self.dropped = 0
+        self.queued = 0
+        self.traces: TraceStore | None = TraceStore() if trace else None
         self._action_sequence = action_sequence
         self._attach_triggers = attach_triggers
         self._detach_triggers: Callable[[], None] | None = None
         self._cond_func = cond_func
+        self._runs: set[asyncio.Task[None]] = set()
+        self._queue_lock = asyncio.Lock()
+        self._waiting = 0
         if enabled:
             self.enable()
 
@@ -246,9 +531,15 @@ class Automation:
         return (
             f"Automation(center={self._center}, name={self.name}, "
             f"attach_triggers={self._attach_triggers}, cond_func={self._cond_func}, "
-            f"action_sequence={self._action_sequence}, enabled={self.enabled})"
+            f"action_sequence={self._action_sequence}, enabled={self.enabled}, "
+            f"mode={self.mode}, max_runs={self.max_runs}, cache={self.cache})"
         )
 
+    @property
+    def running(self) -> int:
+        """:int: Return the number of running runs."""
+        return len(self._runs)
+
     def enable(self) -> None:
         """Enable automation."""
         if self.enabled:
@@ -267,16 +558,100 @@ class Automation:
 
     async def trigger(self, variables: dict[str, Any]) -> None:
         """Run actions of this automation."""
+        event = variables.get(CONF_TRIGGER, {}).get(ATTR_EVENT) if self.cache else None
+        if not isinstance(event, Event):
+            # Don't use the cache of a cached automation that fired the event.
+            with no_render_cache():
+                await self._trigger(variables)
+            return
+        with render_cache(event):
+            await self._trigger(variables)
+
+    async def _trigger(self, variables: dict[str, Any]) -> None:
+        """Check the condition and run the actions in the run mode."""
         variables["samples"] = self._center.samples
         _LOGGER.debug("Triggered automation %s", self.name)
+        trace = None if self.traces is None else Trace()
         try:
             cond = self._cond_func(variables)
         except TemplateError as exc:
             _LOGGER.error("Failed to render condition for %s: %s", self.name, exc)
+            self._finish(trace, OUTCOME_TEMPLATE_ERROR, exc)
+            return
+        if trace is not None:
+            trace.condition_rendered()
+        if not cond:
+            self._finish(trace, OUTCOME_CONDITION_FAILED)
+            return
+        _LOGGER.debug("Condition passed for %s", self.name)
+        if self.mode == MODE_QUEUED:
+            await self._run_queued(variables, trace)
+            return
+        if self._runs:
+            if self.mode == MODE_SINGLE or (
+                self.mode == MODE_PARALLEL
+                and self.max_runs is not None
+                and len(self._runs) >= self.max_runs
+            ):
+                self._drop(trace)
+                return
+            if self.mode == MODE_RESTART:
+                _LOGGER.debug("Restarting automation %s", self.name)
+                for task in self._runs:
+                    task.cancel()
+        await self._run(variables, trace)
+
+    async def _run_queued(
+        self, variables: dict[str, Any], trace: Trace | None = None
+    ) -> None:
+        """Run the actions after the running and waiting runs."""
+        if self._queue_lock.locked():
+            if self.max_runs is not None and self._waiting >= self.max_runs:
+                self._drop(trace)
+                return
+            self.queued += 1
+            _LOGGER.debug("Queued run of automation %s", self.name)
+        self._waiting += 1
+        try:
+            await self._queue_lock.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            await self._run(variables, trace)
+        finally:
+            self._queue_lock.release()
+
+    async def _run(self, variables: dict[str, Any], trace: Trace | None = None) -> None:
+        """Run the actions in a task and wait for it."""
+        task = self._center.create_task(self._action_sequence(variables, trace))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        await asyncio.wait([task])
+        if task.cancelled():
+            self._finish(trace, OUTCOME_CANCELLED)
             return
-        if cond:
-            _LOGGER.debug("Condition passed for %s", self.name)
-            await self._action_sequence(variables)
+        if (exc := task.exception()) is not None:
+            self._finish(trace, get_outcome(exc), exc)
+            raise exc
+        self._finish(trace, OUTCOME_DONE)
+
+    def _finish(self, trace: Trace | None, outcome: str, error: Any = None) -> None:
+        """Store the trace of a finished run."""
+        if trace is None or self.traces is None:
+            return
+        trace.finish(outcome, error)
+        self.traces.add(trace)
+
+    def _drop(self, trace: Trace | None = None) -> None:
+        """Drop a run."""
+        self._finish(trace, OUTCOME_DROPPED)
+        self.dropped += 1
+        _LOGGER.debug(
+            "Dropped run of automation %s in mode %s, %s dropped",
+            self.name,
+            self.mode,
+            self.dropped,
+        )
 
 
 class ActionSequence:
@@ -293,23 +668,35 @@ class ActionSequence:
             actions
         )  # copy to list to make sure it's a list
 
-    async def __call__(self, variables: dict[str, Any]) -> None:
-        """Start action sequence."""
+    async def __call__(
+        self, variables: dict[str, Any], trace: Trace | None = None
+    ) -> None:
+        """Start action sequence.
+
+        The actions after a delay aren't traced.
+        """
+        if trace is not None:
+            trace.actions_started()
         waiting: deque[TemplateAction] = deque(self.actions)
         while waiting:
             action = waiting.popleft()
 
             if action.action_type == "automations" and action.action_id == ACTION_DELAY:
-                rendered_kwargs = action.render(variables)
-                seconds = rendered_kwargs.get("seconds")
-                if seconds is not None:
-                    self.delay(float(seconds), variables, waiting)
+                with trace_action(
+                    trace, action.action_type, action.action_id
+                ) as action_trace:
+                    rendered_kwargs = action.render(variables)
+                    seconds = rendered_kwargs.get("seconds")
+                    if seconds is not None:
+                        self.delay(float(seconds), variables, waiting)
+                    if action_trace is not None:
+                        action_trace.finish(OUTCOME_DELAYED)
 
             else:
                 _LOGGER.debug(
                     "Calling action %s.%s", action.action_type, action.action_id
                 )
-                await action(variables)
+                await action(variables, trace)
 
     def delay(
         self,
@@ -328,16 +715,14 @@ class ActionSequence:
 
         """
         sequence = ActionSequence(self._center, list(waiting))
-        callback = partial(self._center.create_task, sequence(variables))
         waiting.clear()
         _LOGGER.info("Action delay for %s seconds", seconds)
-        handle = self._center.loop.call_later(seconds, callback)
-
-        async def cancel_pending_actions(center: Center, event: Event) -> None:
-            """Cancel pending actions."""
-            handle.cancel()
-
-        self._center.bus.register(CAMACQ_STOP_EVENT, cancel_pending_actions)
+        # The scheduler cancels the pending actions when camacq stops.
+        # The pending actions don't use the render cache of the trigger event.
+        with no_render_cache():
+            self._center.scheduler.call_later(
+                seconds, lambda: self._center.create_task(sequence(variables))
+            )
 
 
 class TemplateAction:
@@ -351,13 +736,22 @@ class TemplateAction:
         action_data: dict[str, Any] = action_conf[CONF_DATA]
         self.template: Template = make_template(center, action_data)
 
-    async def __call__(self, variables: dict[str, Any] | None = None) -> None:
+    async def __call__(
+        self, variables: dict[str, Any] | None = None, trace: Trace | None = None
+    ) -> None:
         """Execute action with optional template variables."""
-        try:
-            rendered = self.render(variables)
-        except TemplateError:
-            return
-        await self._center.actions.call(self.action_type, self.action_id, **rendered)
+        with trace_action(trace, self.action_type, self.action_id) as action_trace:
+            try:
+                rendered = self.render(variables)
+            except TemplateError as exc:
+                if action_trace is not None:
+                    action_trace.finish(OUTCOME_TEMPLATE_ERROR, exc)
+                return
+            if action_trace is not None:
+                action_trace.rendered()
+            await self._center.actions.call(
+                self.action_type, self.action_id, **rendered
+            )
 
     def render(self, variables: dict[str, Any] | None) -> dict[str, Any]:
         """Render the template with the kwargs for the action."""
@@ -373,3 +767,73 @@ class TemplateAction:
             )
             raise
         return rendered
+
+
+class ParallelAction(TemplateAction):
+    """Representation of a group of actions that run concurrently.
+
+    The sequence continues when all the actions have finished. An error
+    or timeout of an action doesn't stop the other actions.
+    """
+
+    def __init__(self, center: Center, action_conf: dict[str, Any]) -> None:
+        """Set up instance."""
+        super().__init__(center, {**action_conf, CONF_DATA: {}})
+        data: dict[str, Any] = action_conf[CONF_DATA]
+        self.actions = _get_actions(center, data[CONF_ACTIONS]).actions
+        self.max_runs: int | None = data.get(CONF_MAX)
+        self.timeout: float | None = data.get(CONF_TIMEOUT)
+
+    async def __call__(
+        self, variables: dict[str, Any] | None = None, trace: Trace | None = None
+    ) -> None:
+        """Execute the actions concurrently with optional template variables."""
+        with trace_action(trace, self.action_type, self.action_id) as action_trace:
+            if action_trace is not None:
+                action_trace.rendered()
+            errors = await self.run(variables, trace)
+            if action_trace is not None and (
+                error := next((error for error in errors if error), None)
+            ):
+                action_trace.finish(get_outcome(error), error)
+
+    async def run(
+        self, variables: dict[str, Any] | None = None, trace: Trace | None = None
+    ) -> list[BaseException | None]:
+        """Execute the actions concurrently and return the errors.
+
+        Returns
+        -------
+        list
+            Return a list with the error of each action or None if the
+            action succeeded.
+
+        """
+        semaphore = asyncio.Semaphore(self.max_runs or len(self.actions))
+
+        async def run_action(action: TemplateAction) -> None:
+            """Execute an action when there is room."""
+            async with semaphore, asyncio.timeout(self.timeout):
+                await action(variables, trace)
+
+        results = await asyncio.gather(
+            *(run_action(action) for action in self.actions), return_exceptions=True
+        )
+        errors: list[BaseException | None] = []
+        for action, result in zip(self.actions, results, strict=True):
+            if isinstance(result, TimeoutError):
+                _LOGGER.error(
+                    "Parallel action %s.%s timed out after %s seconds",
+                    action.action_type,
+                    action.action_id,
+                    self.timeout,
+                )
+            elif isinstance(result, BaseException):
+                _LOGGER.error(
+                    "Parallel action %s.%s failed: %s",
+                    action.action_type,
+                    action.action_id,
+                    result,
+                )
+            errors.append(result)
+        return errors
@@ -0,0 +1,126 @@
+"""Handle debounce trigger in automations.
+
+A debounce trigger waits for a burst of matching events to settle and
+then triggers once with the events of the burst.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Coroutine, Hashable
+import logging
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from camacq.const import CONF_DATA, CONF_ID, CONF_TRIGGER
+
+from . import CONF_TYPE
+from . import event as event_trigger
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+    from camacq.event import Event
+    from camacq.scheduler import ScheduledCall
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_EVENTS = "events"
+CONF_DEBOUNCE = "debounce"
+CONF_EVENT_DATA = "event_data"
+CONF_GROUP_BY = "group_by"
+CONF_SECONDS = "seconds"
+
+WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_SECONDS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_GROUP_BY, default=[]): [vol.Coerce(str)],
+        vol.Optional(CONF_EVENT_DATA, default={}): dict,
+    }
+)
+
+
+def handle_trigger(
+    center: Center,
+    config: dict[str, Any],
+    trigger_func: Callable[[dict[str, Any]], Coroutine[Any, Any, None]],
+) -> Callable[[], None] | None:
+    """Listen for events and trigger when a burst of events has settled."""
+    try:
+        data: dict[str, Any] = WINDOW_SCHEMA(config.get(CONF_DATA, {}))
+    except vol.Invalid as exc:
+        _LOGGER.error("Invalid debounce trigger data: %s", exc)
+        return None
+    seconds: float = data[CONF_SECONDS]
+    group_by: list[str] = data[CONF_GROUP_BY]
+    bursts: dict[Hashable, list[Event]] = {}
+    timers: dict[Hashable, ScheduledCall] = {}
+
+    def fire(key: Hashable) -> None:
+        """Trigger with the events of a settled burst."""
+        timers.pop(key, None)
+        events = bursts.pop(key)
+        center.create_task(trigger_func(make_variables(CONF_DEBOUNCE, events)))
+
+    async def handle_event(variables: dict[str, Any]) -> None:
+        """Collect a matched event and restart the timer of its burst."""
+        event: Event = variables[CONF_TRIGGER][event_trigger.ATTR_EVENT]
+        key = group_key(event, group_by)
+        bursts.setdefault(key, []).append(event)
+        if (timer := timers.get(key)) is not None:
+            timer.cancel()
+        timers[key] = center.scheduler.call_later(seconds, fire, key)
+
+    def cancel_timers() -> None:
+        """Cancel the pending triggers."""
+        for timer in timers.values():
+            timer.cancel()
+        timers.clear()
+        bursts.clear()
+
+    return attach_event_trigger(center, config, data, handle_event, cancel_timers)
+
+
+def attach_event_trigger(
+    center: Center,
+    config: dict[str, Any],
+    data: dict[str, Any],
+    handle_event: Callable[[dict[str, Any]], Awaitable[None]],
+    cancel_timers: Callable[[], None],
+) -> Callable[[], None]:
+    """Attach an event trigger and return a function to remove it.
+
+    The pending triggers are cancelled when the trigger is removed. The
+    scheduler cancels them when camacq stops.
+    """
+    remove_event = event_trigger.handle_trigger(
+        center,
+        {CONF_ID: config[CONF_ID], CONF_DATA: data[CONF_EVENT_DATA]},
+        handle_event,
+    )
+
+    def remove() -> None:
+        """Remove the trigger."""
+        remove_event()
+        cancel_timers()
+
+    return remove
+
+
+def group_key(event: Event, group_by: list[str]) -> Hashable:
+    """Return the values of the event attributes to group events by."""
+    return tuple(getattr(event, attr, None) for attr in group_by)
+
+
+def make_variables(trigger_type: str, events: list[Event]) -> dict[str, Any]:
+    """Return the template variables of a trigger for events.
+
+    The event variable is the last event and the events variable is the
+    list of all events.
+    """
+    return {
+        CONF_TRIGGER: {
+            CONF_TYPE: trigger_type,
+            event_trigger.ATTR_EVENT: events[-1],
+            ATTR_EVENTS: events,
+        }
+    }
@@ -0,0 +1,163 @@
+"""Analyze how automations trigger each other through events.
+
+The graph links each automation to the automations that are triggered by
+the event types that its actions can fire.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+
+from camacq.event import Event, get_event_types
+
+
+class AutomationGraph:
+    """Represent how automations trigger each other through events.
+
+    Parameters
+    ----------
+    triggers : dict
+        The trigger event types per automation name. An automation with a
+        trigger that isn't an event trigger also has None in its set.
+    fires : dict
+        The event types that the actions of an automation can fire per
+        automation name. None means any event type.
+    event_types : set
+        The event types that events can have.
+
+    Attributes
+    ----------
+    edges : dict
+        Return the names of the automations that each automation can
+        trigger.
+    cycles : list
+        Return the lists of automation names that can trigger each other
+        in a cycle.
+    unreachable : set
+        Return the names of the automations that are only triggered by
+        event types that no event has.
+
+    """
+
+    def __init__(
+        self,
+        triggers: dict[str, set[str | None]],
+        fires: dict[str, set[str] | None],
+        event_types: set[str],
+    ) -> None:
+        """Set up instance."""
+        self.triggers = triggers
+        self.fires = fires
+        self.event_types = event_types
+        self._listeners: dict[str, set[str]] = {}
+        for name, trigger_types in triggers.items():
+            for event_type in trigger_types:
+                if event_type is not None:
+                    self._listeners.setdefault(event_type, set()).add(name)
+        event_triggered = {
+            name
+            for name, event_types in triggers.items()
+            if any(event_type is not None for event_type in event_types)
+        }
+        self.edges: dict[str, set[str]] = {
+            name: set(event_triggered)
+            if event_types is None
+            else set().union(
+                *(self._listeners.get(event_type, ()) for event_type in event_types)
+            )
+            for name, event_types in fires.items()
+        }
+        self.cycles = _find_cycles(self.edges)
+        self.unreachable = set(triggers) - self._walk(self._roots())
+        self._reach: dict[str, frozenset[str]] = {
+            event_type: frozenset(self._walk(names))
+            for event_type, names in self._listeners.items()
+        }
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"AutomationGraph(edges={self.edges})"
+
+    def reach(self, event_type: str) -> frozenset[str]:
+        """Return the names of the automations that an event type can reach.
+
+        The automations are triggered by the event type or by the events
+        that those automations can fire, directly or in a chain.
+        """
+        return self._reach.get(event_type, frozenset())
+
+    def _roots(self) -> set[str]:
+        """Return the automations that can be triggered from outside the graph.
+
+        An automation is a root if it has a trigger that isn't an event
+        trigger or is triggered by an event type that an event has. An
+        automation can only fire events of those types.
+        """
+        return {
+            name
+            for name, event_types in self.triggers.items()
+            if any(
+                event_type is None or event_type in self.event_types
+                for event_type in event_types
+            )
+        }
+
+    def _walk(self, names: Iterable[str]) -> set[str]:
+        """Return the automations that can be triggered from some automations."""
+        seen = set(names)
+        queue = deque(seen)
+        while queue:
+            for target in self.edges.get(queue.popleft(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+
+
+def _find_cycles(edges: dict[str, set[str]]) -> list[list[str]]:
+    """Return the strongly connected components that form cycles."""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    cycles: list[list[str]] = []
+
+    def connect(node: str) -> None:
+        """Find the component of a node with Tarjan's algorithm."""
+        index[node] = low[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+        for target in edges.get(node, ()):
+            if target not in index:
+                connect(target)
+                low[node] = min(low[node], low[target])
+            elif target in on_stack:
+                low[node] = min(low[node], index[target])
+        if low[node] != index[node]:
+            return
+        component: list[str] = []
+        while True:
+            member = stack.pop()
+            on_stack.remove(member)
+            component.append(member)
+            if member == node:
+                break
+        if len(component) > 1 or node in edges.get(node, ()):
+            cycles.append(sorted(component))
+
+    for node in sorted(edges):
+        if node not in index:
+            connect(node)
+    return cycles
+
+
+def get_defined_event_types() -> set[str]:
+    """Return the event types of all event classes."""
+    event_types: set[str] = set()
+    classes: list[type[Event]] = [Event]
+    while classes:
+        event_class = classes.pop()
+        event_types.update(get_event_types(event_class))
+        classes.extend(event_class.__subclasses__())
+    return event_types
@@ -0,0 +1,67 @@
+"""Handle interval trigger in automations.
+
+An interval trigger triggers periodically, with the number of the
+trigger in the count template variable.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Coroutine
+from itertools import count
+import logging
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from camacq.const import CONF_DATA, CONF_ID, CONF_TRIGGER
+
+from . import CONF_TYPE
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_COUNT = "count"
+CONF_INTERVAL = "interval"
+CONF_SECONDS = "seconds"
+
+INTERVAL_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+    }
+)
+
+
+def handle_trigger(
+    center: Center,
+    config: dict[str, Any],
+    trigger_func: Callable[[dict[str, Any]], Coroutine[Any, Any, None]],
+) -> Callable[[], None] | None:
+    """Trigger every interval."""
+    try:
+        data: dict[str, Any] = INTERVAL_SCHEMA(config.get(CONF_DATA, {}))
+    except vol.Invalid as exc:
+        _LOGGER.error("Invalid interval trigger data: %s", exc)
+        return None
+    trigger_id: str = config[CONF_ID]
+    counter = count(1)
+
+    def fire() -> None:
+        """Trigger with the number of the trigger."""
+        center.create_task(
+            trigger_func(
+                {
+                    CONF_TRIGGER: {
+                        CONF_TYPE: CONF_INTERVAL,
+                        CONF_ID: trigger_id,
+                        ATTR_COUNT: next(counter),
+                    }
+                }
+            )
+        )
+
+    call = center.scheduler.call_every(data[CONF_SECONDS], fire)
+    return call.cancel
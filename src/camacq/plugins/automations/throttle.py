@@ -0,0 +1,79 @@
+"""Handle throttle trigger in automations.
+
+A throttle trigger triggers on the first matching event and then at
+most once per window, with the events that matched during the window.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Coroutine, Hashable
+import logging
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from camacq.const import CONF_DATA, CONF_TRIGGER
+
+from . import event as event_trigger
+from .debounce import (
+    CONF_GROUP_BY,
+    CONF_SECONDS,
+    WINDOW_SCHEMA,
+    attach_event_trigger,
+    group_key,
+    make_variables,
+)
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+    from camacq.event import Event
+    from camacq.scheduler import ScheduledCall
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_THROTTLE = "throttle"
+
+
+def handle_trigger(
+    center: Center,
+    config: dict[str, Any],
+    trigger_func: Callable[[dict[str, Any]], Coroutine[Any, Any, None]],
+) -> Callable[[], None] | None:
+    """Listen for events and trigger at most once per window."""
+    try:
+        data: dict[str, Any] = WINDOW_SCHEMA(config.get(CONF_DATA, {}))
+    except vol.Invalid as exc:
+        _LOGGER.error("Invalid throttle trigger data: %s", exc)
+        return None
+    seconds: float = data[CONF_SECONDS]
+    group_by: list[str] = data[CONF_GROUP_BY]
+    pending: dict[Hashable, list[Event]] = {}
+    timers: dict[Hashable, ScheduledCall] = {}
+
+    def end_window(key: Hashable) -> None:
+        """Trigger with the events of the window and start a new window."""
+        events = pending.pop(key, None)
+        if not events:
+            timers.pop(key, None)
+            return
+        timers[key] = center.scheduler.call_later(seconds, end_window, key)
+        center.create_task(trigger_func(make_variables(CONF_THROTTLE, events)))
+
+    async def handle_event(variables: dict[str, Any]) -> None:
+        """Trigger on a matched event or collect it until the window ends."""
+        event: Event = variables[CONF_TRIGGER][event_trigger.ATTR_EVENT]
+        key = group_key(event, group_by)
+        if key in timers:
+            pending.setdefault(key, []).append(event)
+            return
+        timers[key] = center.scheduler.call_later(seconds, end_window, key)
+        await trigger_func(make_variables(CONF_THROTTLE, [event]))
+
+    def cancel_timers() -> None:
+        """Cancel the pending triggers."""
+        for timer in timers.values():
+            timer.cancel()
+        timers.clear()
+        pending.clear()
+
+    return attach_event_trigger(center, config, data, handle_event, cancel_timers)
@@ -0,0 +1,332 @@
+"""Trace automation runs.
+
+A trace records the timing and outcome of the condition and the actions
+of an automation run. The recent traces and aggregated statistics of the
+runs are stored per automation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import time
+from typing import Any
+
+DEFAULT_STORED_TRACES = 20
+OUTCOME_CANCELLED = "cancelled"
+OUTCOME_CONDITION_FAILED = "condition_failed"
+OUTCOME_DELAYED = "delayed"
+OUTCOME_DONE = "done"
+OUTCOME_DROPPED = "dropped"
+OUTCOME_ERROR = "error"
+OUTCOME_TEMPLATE_ERROR = "template_error"
+OUTCOME_TIMEOUT = "timeout"
+
+
+def get_outcome(exc: BaseException) -> str:
+    """Return the outcome of an error."""
+    if isinstance(exc, TimeoutError):
+        return OUTCOME_TIMEOUT
+    if isinstance(exc, asyncio.CancelledError):
+        return OUTCOME_CANCELLED
+    return OUTCOME_ERROR
+
+
+class ActionTrace:
+    """Represent the trace of an action call.
+
+    Attributes
+    ----------
+    action_type : str
+        Return the type of the action.
+    action_id : str
+        Return the id of the action.
+    render_time : float or None
+        Return the time in seconds to render the action data.
+    call_time : float or None
+        Return the time in seconds to call the action.
+    outcome : str or None
+        Return the outcome of the call.
+    error : str or None
+        Return the error of the call.
+
+    """
+
+    __slots__ = (
+        "_start",
+        "action_id",
+        "action_type",
+        "call_time",
+        "error",
+        "outcome",
+        "render_time",
+    )
+
+    def __init__(self, action_type: str, action_id: str) -> None:
+        """Set up instance."""
+        self.action_type = action_type
+        self.action_id = action_id
+        self.render_time: float | None = None
+        self.call_time: float | None = None
+        self.outcome: str | None = None
+        self.error: str | None = None
+        self._start = time.perf_counter()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return (
+            f"ActionTrace(action_type={self.action_type}, "
+            f"action_id={self.action_id}, outcome={self.outcome})"
+        )
+
+    def rendered(self) -> None:
+        """Record that the action data is rendered."""
+        now = time.perf_counter()
+        self.render_time = now - self._start
+        self._start = now
+
+    def finish(self, outcome: str = OUTCOME_DONE, error: Any = None) -> None:
+        """Record the outcome of the call."""
+        if self.outcome is not None:
+            return
+        elapsed = time.perf_counter() - self._start
+        if self.render_time is None:
+            self.render_time = elapsed
+        else:
+            self.call_time = elapsed
+        self.outcome = outcome
+        self.error = None if error is None else str(error)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the trace as a dict."""
+        return {
+            "action_type": self.action_type,
+            "action_id": self.action_id,
+            "render_time": self.render_time,
+            "call_time": self.call_time,
+            "outcome": self.outcome,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Represent the trace of an automation run.
+
+    Attributes
+    ----------
+    timestamp : float
+        Return the time in seconds since the epoch when the run was
+        triggered.
+    condition_time : float or None
+        Return the time in seconds to render the condition.
+    wait_time : float or None
+        Return the time in seconds from the trigger until the actions
+        start, including the time waiting for previous runs.
+    run_time : float or None
+        Return the time in seconds from the trigger until the run
+        finished.
+    actions : list
+        Return the traces of the called actions.
+    outcome : str or None
+        Return the outcome of the run.
+    error : str or None
+        Return the error of the run.
+
+    """
+
+    __slots__ = (
+        "_start",
+        "actions",
+        "condition_time",
+        "error",
+        "outcome",
+        "run_time",
+        "timestamp",
+        "wait_time",
+    )
+
+    def __init__(self) -> None:
+        """Set up instance."""
+        self.timestamp = time.time()
+        self.condition_time: float | None = None
+        self.wait_time: float | None = None
+        self.run_time: float | None = None
+        self.actions: list[ActionTrace] = []
+        self.outcome: str | None = None
+        self.error: str | None = None
+        self._start = time.perf_counter()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"Trace(timestamp={self.timestamp}, outcome={self.outcome})"
+
+    def condition_rendered(self) -> None:
+        """Record that the condition is rendered."""
+        self.condition_time = time.perf_counter() - self._start
+
+    def actions_started(self) -> None:
+        """Record that the actions start."""
+        self.wait_time = time.perf_counter() - self._start
+
+    def add_action(self, action_type: str, action_id: str) -> ActionTrace:
+        """Add and return the trace of an action call."""
+        action_trace = ActionTrace(action_type, action_id)
+        self.actions.append(action_trace)
+        return action_trace
+
+    def finish(self, outcome: str = OUTCOME_DONE, error: Any = None) -> None:
+        """Record the outcome of the run.
+
+        A run that is done has the outcome of the first action that
+        wasn't done.
+        """
+        self.run_time = time.perf_counter() - self._start
+        if outcome == OUTCOME_DONE:
+            for action in self.actions:
+                if action.outcome is not None and action.outcome not in (
+                    OUTCOME_DONE,
+                    OUTCOME_DELAYED,
+                ):
+                    outcome = action.outcome
+                    break
+        self.outcome = outcome
+        self.error = None if error is None else str(error)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the trace as a dict."""
+        return {
+            "timestamp": self.timestamp,
+            "condition_time": self.condition_time,
+            "wait_time": self.wait_time,
+            "run_time": self.run_time,
+            "outcome": self.outcome,
+            "error": self.error,
+            "actions": [action.as_dict() for action in self.actions],
+        }
+
+
+@contextmanager
+def trace_action(
+    trace: Trace | None, action_type: str, action_id: str
+) -> Iterator[ActionTrace | None]:
+    """Trace an action call of a traced run.
+
+    Yield None if the run isn't traced.
+    """
+    if trace is None:
+        yield None
+        return
+    action_trace = trace.add_action(action_type, action_id)
+    try:
+        yield action_trace
+    except BaseException as exc:
+        action_trace.finish(get_outcome(exc), exc)
+        raise
+    action_trace.finish()
+
+
+class TimeStats:
+    """Aggregate durations.
+
+    Attributes
+    ----------
+    count : int
+        Return the number of durations.
+    total : float
+        Return the sum of the durations in seconds.
+    max : float
+        Return the longest duration in seconds.
+
+    """
+
+    __slots__ = ("count", "max", "total")
+
+    def __init__(self) -> None:
+        """Set up instance."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float | None) -> None:
+        """Add a duration."""
+        if duration is None:
+            return
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dict."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+        }
+
+
+class TraceStore:
+    """Store the recent traces and the statistics of the runs of an automation.
+
+    Parameters
+    ----------
+    stored_traces : int
+        The number of recent traces to store.
+
+    Attributes
+    ----------
+    traces : collections.deque
+        Return the recent traces, oldest first. Runs with a failed
+        condition are only counted.
+    outcomes : collections.Counter
+        Return the number of runs per outcome.
+
+    """
+
+    def __init__(self, stored_traces: int = DEFAULT_STORED_TRACES) -> None:
+        """Set up instance."""
+        self.traces: deque[Trace] = deque(maxlen=stored_traces)
+        self.outcomes: Counter[str] = Counter()
+        self._condition = TimeStats()
+        self._wait = TimeStats()
+        self._run = TimeStats()
+        self._render: dict[str, TimeStats] = {}
+        self._call: dict[str, TimeStats] = {}
+
+    def add(self, trace: Trace) -> None:
+        """Add the trace of a finished run."""
+        if trace.outcome != OUTCOME_CONDITION_FAILED:
+            self.traces.append(trace)
+        self.outcomes[trace.outcome or OUTCOME_DONE] += 1
+        self._condition.add(trace.condition_time)
+        self._wait.add(trace.wait_time)
+        self._run.add(trace.run_time)
+        for action in trace.actions:
+            key = f"{action.action_type}.{action.action_id}"
+            self._render.setdefault(key, TimeStats()).add(action.render_time)
+            self._call.setdefault(key, TimeStats()).add(action.call_time)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the aggregated statistics of the runs."""
+        return {
+            "outcomes": dict(self.outcomes),
+            "condition": self._condition.as_dict(),
+            "wait": self._wait.as_dict(),
+            "run": self._run.as_dict(),
+            "actions": {
+                key: {
+                    "render": render.as_dict(),
+                    "call": self._call[key].as_dict(),
+                }
+                for key, render in self._render.items()
+            },
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics and the recent traces as a dict."""
+        return {
+            "stats": self.stats(),
+            "traces": [trace.as_dict() for trace in self.traces],
+        }
@@ -0,0 +1,195 @@
+"""Calculate detector gains from the images of a gain job."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import logging
+import multiprocessing
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from camacq.const import CAMACQ_STOP_EVENT
+from camacq.event import Event
+from camacq.helper import BASE_ACTION_SCHEMA
+from camacq.image import calc_gains
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+
+_LOGGER = logging.getLogger(__name__)
+ACTION_CALC_GAIN = "calc_gain"
+CONF_CHANNEL_ID = "channel_id"
+CONF_CHANNEL_NAME = "channel_name"
+CONF_CHANNELS = "channels"
+CONF_GAIN = "gain"
+CONF_GAINS = "gains"
+CONF_MAX_GAIN = "max_gain"
+CONF_MAX_SATURATION = "max_saturation"
+CONF_MIN_BIN = "min_bin"
+CONF_MIN_GAIN = "min_gain"
+CONF_QUANTILE = "quantile"
+CONF_SAMPLE_NAME = "sample_name"
+CONF_TARGET = "target"
+CONF_WORKERS = "workers"
+
+CHANNEL_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_CHANNEL_ID): vol.Coerce(int),
+        vol.Required(CONF_CHANNEL_NAME): vol.Coerce(str),
+        # Map the image channel ids of the gain job to detector gains.
+        vol.Required(CONF_GAINS): vol.All(
+            {
+                vol.Coerce(int): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, min_included=False)
+                )
+            },
+            vol.Length(min=1),
+        ),
+        vol.Optional(CONF_MIN_GAIN): vol.Coerce(float),
+        vol.Optional(CONF_MAX_GAIN): vol.Coerce(float),
+    }
+)
+
+FIT_SCHEMA: dict[vol.Marker, Any] = {
+    vol.Optional(CONF_TARGET, default=0.8): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=1, min_included=False)
+    ),
+    vol.Optional(CONF_QUANTILE, default=0.999): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=1)
+    ),
+    vol.Optional(CONF_MAX_SATURATION, default=0.001): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=1)
+    ),
+    vol.Optional(CONF_MIN_BIN, default=8): vol.All(
+        vol.Coerce(int), vol.Range(min=0, max=255)
+    ),
+}
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_WORKERS, default=2): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Required(CONF_CHANNELS): vol.All([CHANNEL_SCHEMA], vol.Length(min=1)),
+    }
+)
+
+
+async def setup_module(center: Center, config: dict[str, Any]) -> None:
+    """Set up gain plugin.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    config : dict
+        The config dict.
+
+    """
+    conf = config["gain"]
+    channels: list[dict[str, Any]] = conf[CONF_CHANNELS]
+    pool: ProcessPoolExecutor | None = None
+
+    async def handle_action(**kwargs: Any) -> None:
+        """Handle the action call to calculate gains of a well.
+
+        Parameters
+        ----------
+        **kwargs
+            Arbitrary keyword arguments. These will be passed to the
+            action function when an action is called.
+
+        """
+        nonlocal pool
+        kwargs.pop("action_id", None)
+        kwargs.pop("silent", None)
+        sample_name: str = kwargs.pop(CONF_SAMPLE_NAME)
+        sample = center.samples[sample_name]
+        fit_kwargs = {str(key): kwargs.pop(str(key)) for key in FIT_SCHEMA}
+        well_args = {
+            "plate_name": kwargs.pop("plate_name"),
+            "well_x": kwargs.pop("well_x"),
+            "well_y": kwargs.pop("well_y"),
+        }
+        # The remaining keyword arguments select the images by attribute.
+        attrs = {**well_args, **kwargs}
+        images = [
+            image
+            for image in sample.images.values()
+            if all(
+                str(getattr(image, attr, None)) == str(value)
+                for attr, value in attrs.items()
+            )
+        ]
+        gain_images: dict[int, dict[str, float]] = {}
+        for channel in channels:
+            gains: dict[int, float] = channel[CONF_GAINS]
+            gain_images[channel[CONF_CHANNEL_ID]] = {
+                image.path: gains[image.channel_id]
+                for image in images
+                if getattr(image, "channel_id", None) in gains
+            }
+        if not any(gain_images.values()):
+            _LOGGER.warning("No gain job images found with %s", attrs)
+            return
+        min_gains = {
+            channel[CONF_CHANNEL_ID]: channel[CONF_MIN_GAIN]
+            for channel in channels
+            if CONF_MIN_GAIN in channel
+        }
+        max_gains = {
+            channel[CONF_CHANNEL_ID]: channel[CONF_MAX_GAIN]
+            for channel in channels
+            if CONF_MAX_GAIN in channel
+        }
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=conf[CONF_WORKERS],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        results = await center.loop.run_in_executor(
+            pool,
+            partial(calc_gains, gain_images, min_gains, max_gains, **fit_kwargs),
+        )
+        for channel in channels:
+            channel_id = channel[CONF_CHANNEL_ID]
+            if channel_id not in results:
+                continue
+            await center.actions.call(
+                "sample",
+                "set_sample",
+                sample_name=sample_name,
+                name="channel",
+                **well_args,
+                channel_id=channel_id,
+                values={
+                    CONF_CHANNEL_NAME: channel[CONF_CHANNEL_NAME],
+                    CONF_GAIN: results[channel_id],
+                },
+            )
+
+    calc_gain_action_schema = BASE_ACTION_SCHEMA.extend(
+        {
+            vol.Required(CONF_SAMPLE_NAME): vol.All(
+                vol.Coerce(str), vol.In(center.samples)
+            ),
+            vol.Required("plate_name"): vol.Coerce(str),
+            vol.Required("well_x"): vol.Coerce(int),
+            vol.Required("well_y"): vol.Coerce(int),
+            **FIT_SCHEMA,
+        },
+        extra=vol.ALLOW_EXTRA,
+    )
+
+    center.actions.register(
+        "gain", ACTION_CALC_GAIN, handle_action, calc_gain_action_schema
+    )
+
+    async def stop_pool(center: Center, event: Event) -> None:
+        """Shut down the process pool."""
+        if pool is not None:
+            await center.add_executor_job(pool.shutdown)
+
+    center.bus.register(CAMACQ_STOP_EVENT, stop_pool)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncio
 from functools import partial
 import logging
+from pathlib import Path
 import tempfile
 from typing import TYPE_CHECKING, Any, ClassVar
 
@@ -14,8 +15,10 @@ from leicaimage import attribute, attribute_as_str
 import voluptuous as vol
 
 from camacq.const import CAMACQ_STOP_EVENT
-from camacq.helper import ensure_dict
+from camacq.helper import BASE_ACTION_SCHEMA, ensure_dict, ensure_list
 from camacq.plugins.api import (
+    API_NAME,
+    DATA_API,
     Api,
     CommandEvent,
     ImageEvent,
@@ -23,8 +26,10 @@ from camacq.plugins.api import (
     StopCommandEvent,
     register_api,
 )
+from camacq.util import LRUSet
 
-from .command import start, stop
+from .command import camlist_com, start, stop
+from .connection import CamConnection
 from .helper import find_image_path, get_field, get_imgs
 from .sample import setup_module as sample_setup_module
 
@@ -34,10 +39,17 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
+ACTION_SEND_CAMLIST = "send_camlist"
+CONF_COMMAND_QUEUE_SIZE = "command_queue_size"
+CONF_DUPLICATE_WINDOW = "duplicate_window"
 CONF_HOST = "host"
+CONF_IMAGE_CONCURRENCY = "image_concurrency"
 CONF_IMAGING_DIR = "imaging_dir"
 CONF_LEICA = "leica"
+CONF_MAX_RECONNECT_DELAY = "max_reconnect_delay"
+CONF_NAME = "name"
 CONF_PORT = "port"
+CONF_RECONNECT_DELAY = "reconnect_delay"
 JOB_ID = "--E{:02d}"
 LEICA_COMMAND_EVENT = "leica_command_event"
 LEICA_START_COMMAND_EVENT = "leica_start_command_event"
@@ -48,18 +60,71 @@ SCAN_FINISHED = "scanfinished"
 SCAN_STARTED = "scanstart"
 START_STOP_DELAY = 2.0
 
-CONFIG_SCHEMA = vol.Schema(
+
+def valid_reconnect_delays(value: dict[str, Any]) -> dict[str, Any]:
+    """Validate that the max reconnect delay is at least the initial delay."""
+    if value[CONF_MAX_RECONNECT_DELAY] < value[CONF_RECONNECT_DELAY]:
+        raise vol.Invalid(
+            f"{CONF_MAX_RECONNECT_DELAY} must be at least {CONF_RECONNECT_DELAY}"
+        )
+    return value
+
+
+LEICA_SCHEMA = vol.Schema(
     vol.All(
         ensure_dict,
         {
+            vol.Optional(CONF_NAME, default=__name__): vol.Coerce(str),
             vol.Optional(CONF_HOST, default="localhost"): vol.Coerce(str),
             vol.Optional(CONF_PORT, default=8895): vol.Coerce(int),
             vol.Optional(CONF_IMAGING_DIR, default=tempfile.gettempdir()): vol.IsDir(),
+            vol.Optional(CONF_DUPLICATE_WINDOW, default=100): vol.All(
+                vol.Coerce(int), vol.Range(min=1)
+            ),
+            vol.Optional(CONF_IMAGE_CONCURRENCY, default=1): vol.All(
+                vol.Coerce(int), vol.Range(min=1)
+            ),
+            vol.Optional(CONF_COMMAND_QUEUE_SIZE, default=100): vol.All(
+                vol.Coerce(int), vol.Range(min=1)
+            ),
+            # A zero delay would retry a dead server in a tight loop.
+            vol.Optional(CONF_RECONNECT_DELAY, default=1.0): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False)
+            ),
+            vol.Optional(CONF_MAX_RECONNECT_DELAY, default=60.0): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False)
+            ),
         },
+        valid_reconnect_delays,
     )
 )
 
 
+COORDINATES = vol.ExactSequence([vol.Coerce(int), vol.Coerce(int)])
+OFFSETS = vol.ExactSequence([vol.Coerce(float), vol.Coerce(float)])
+
+SEND_CAMLIST_ACTION_SCHEMA = BASE_ACTION_SCHEMA.extend(
+    {
+        vol.Required("exp"): vol.Coerce(str),
+        vol.Required("wells"): [COORDINATES],
+        vol.Required("fields"): [COORDINATES],
+        vol.Optional("offsets"): [OFFSETS],
+        API_NAME: vol.Coerce(str),
+    }
+)
+
+
+def unique_names(value: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Validate that all Leica instances have unique names."""
+    names = [conf[CONF_NAME] for conf in value]
+    if len(names) != len(set(names)):
+        raise vol.Invalid(f"Leica instances must have unique names: {names}")
+    return value
+
+
+CONFIG_SCHEMA = vol.Schema(vol.All(ensure_list, [LEICA_SCHEMA], unique_names))
+
+
 async def setup_module(center: Center, config: dict[str, Any]) -> None:
     """Set up Leica api package.
 
@@ -72,16 +137,67 @@ async def setup_module(center: Center, config: dict[str, Any]) -> None:
 
     """
     await sample_setup_module(center, config)
-    conf: dict[str, Any] = config[CONF_LEICA]
+
+    async def handle_action(**kwargs: Any) -> None:
+        """Handle action call to add fields of wells to the cam list.
+
+        Parameters
+        ----------
+        **kwargs
+            Arbitrary keyword arguments. These will be used to make the
+            commands when an action is called.
+
+        """
+        api_name: str | None = kwargs.get(API_NAME)
+        commands = camlist_com(
+            kwargs["exp"], kwargs["wells"], kwargs["fields"], kwargs.get("offsets")
+        )
+        api_store: dict[str, Api] = center.data.get(DATA_API, {})
+        apis = [
+            api
+            for api in api_store.values()
+            if isinstance(api, LeicaApi) and api_name in (None, api.name)
+        ]
+        if apis:
+            await asyncio.gather(*(api.send_many(commands) for api in apis))
+
+    center.actions.register(
+        "leica", ACTION_SEND_CAMLIST, handle_action, SEND_CAMLIST_ACTION_SCHEMA
+    )
+
+    confs: list[dict[str, Any]] = config[CONF_LEICA]
+    tasks = [center.create_task(setup_api(center, conf)) for conf in confs]
+    if tasks:
+        await asyncio.wait(tasks)
+
+
+async def setup_api(center: Center, conf: dict[str, Any]) -> None:
+    """Set up one Leica api with its own connection.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    conf : dict
+        The config dict of the Leica instance.
+
+    """
     host: str = conf[CONF_HOST]
     port: int = conf[CONF_PORT]
     cam = AsyncCAM(host, port)
+    connection = CamConnection(
+        center,
+        cam,
+        queue_size=conf[CONF_COMMAND_QUEUE_SIZE],
+        reconnect_delay=conf[CONF_RECONNECT_DELAY],
+        max_reconnect_delay=conf[CONF_MAX_RECONNECT_DELAY],
+    )
     try:
-        await cam.connect()
+        await connection.connect()
     except OSError as exc:
         _LOGGER.error("Connecting to server %s failed: %s", host, exc)
         return
-    api = LeicaApi(center, conf, cam)
+    api = LeicaApi(center, conf, connection)
     register_api(center, api)
     # Start task that calls receive on the socket to the microscope
     task = center.create_task(api.start_listen())
@@ -99,18 +215,27 @@ class LeicaApi(Api):
     """Represent the Leica API."""
 
     def __init__(
-        self, center: Center, config: dict[str, Any], client: AsyncCAM
+        self,
+        center: Center,
+        config: dict[str, Any],
+        client: CamConnection | AsyncCAM,
     ) -> None:
         """Set up the Leica API."""
         self.center = center
         self.client = client
         self.config = config
-        self._last_image_path: str | None = None
+        self._recent_image_paths = LRUSet(config.get(CONF_DUPLICATE_WINDOW, 100))
+        self.duplicate_image_replies = 0
+        self._field_batches: dict[str, asyncio.Future[None]] = {}
+        concurrency: int = config.get(CONF_IMAGE_CONCURRENCY, 1)
+        self._image_semaphore = (
+            asyncio.Semaphore(concurrency) if concurrency > 1 else None
+        )
 
     @property
     def name(self) -> str:
         """Return the name of the API."""
-        return __name__
+        return self.config.get(CONF_NAME, __name__)
 
     async def start_listen(self) -> None:
         """Receive from the microscope socket."""
@@ -142,41 +267,89 @@ class LeicaApi(Api):
             if REL_IMAGE_PATH in reply:
                 imaging_dir: str = self.config[CONF_IMAGING_DIR]
                 rel_path: str = reply[REL_IMAGE_PATH]
-                if rel_path == self._last_image_path:
+                if self._recent_image_paths.add(rel_path):
                     # guard against duplicate image events from the microscope
+                    self.duplicate_image_replies += 1
                     _LOGGER.debug("Duplicate image reply received: %s", rel_path)
                     continue
-                self._last_image_path = rel_path
                 image_path = find_image_path(rel_path, imaging_dir)
+                if self._image_semaphore is not None:
+                    await self._notify_field_images(image_path, self._image_semaphore)
+                    continue
                 field_path = await self.center.add_executor_job(get_field, image_path)
-                image_paths = await self.center.add_executor_job(
-                    partial(
-                        get_imgs,
-                        field_path,
-                        search=JOB_ID.format(attribute(image_path, "E")),
-                    )
-                )
+                image_paths = await self._get_field_images(field_path, image_path)
                 for path in image_paths:
                     # await in sequential order
-                    await self.center.bus.notify(LeicaImageEvent({"path": path}))
+                    await self._notify_image(path)
             elif SCAN_STARTED in list(reply.values()):
-                await self.center.bus.notify(LeicaStartCommandEvent(reply))
+                await self.center.bus.notify(
+                    LeicaStartCommandEvent({**reply, API_NAME: self.name})
+                )
             elif SCAN_FINISHED in list(reply.values()):
-                await self.center.bus.notify(LeicaStopCommandEvent(reply))
+                await self.center.bus.notify(
+                    LeicaStopCommandEvent({**reply, API_NAME: self.name})
+                )
             else:
-                await self.center.bus.notify(LeicaCommandEvent(reply))
+                await self.center.bus.notify(
+                    LeicaCommandEvent({**reply, API_NAME: self.name})
+                )
+
+    async def _notify_image(self, path: Path | str) -> None:
+        """Fire an image event for an image path."""
+        await self.center.bus.notify(
+            LeicaImageEvent({"path": path, API_NAME: self.name})
+        )
+
+    async def _get_field_images(self, field_path: str, image_path: str) -> list[Path]:
+        """Return the images of a field from the same job as an image."""
+        return await self.center.add_executor_job(
+            partial(
+                get_imgs,
+                field_path,
+                search=JOB_ID.format(attribute(image_path, "E")),
+            )
+        )
+
+    async def _notify_field_images(
+        self, image_path: str, semaphore: asyncio.Semaphore
+    ) -> None:
+        """Fire image events for the images of a field concurrently.
+
+        Images of different replies for the same field are notified in the
+        order that the replies were received.
+        """
+        # Register the batch before the first await to keep the reply order.
+        field_path = get_field(image_path)
+        previous = self._field_batches.get(field_path)
+        batch: asyncio.Future[None] = self.center.loop.create_future()
+        self._field_batches[field_path] = batch
+
+        async def notify_image(path: Path) -> None:
+            """Fire an image event limited by the semaphore."""
+            async with semaphore:
+                await self._notify_image(path)
+
+        try:
+            image_paths = await self._get_field_images(field_path, image_path)
+            if previous is not None:
+                await previous
+            await asyncio.gather(*(notify_image(path) for path in image_paths))
+        finally:
+            batch.set_result(None)
+            if self._field_batches.get(field_path) is batch:
+                del self._field_batches[field_path]
 
     async def send(
         self,
-        command: list[tuple[str, str]] | str,
+        command: list[tuple[str, str]] | str | bytes,
         **kwargs: Any,
     ) -> asyncio.Future[bool] | bool:
         """Send a command to the Leica API.
 
         Parameters
         ----------
-        command : list of tuples or string
-            The command to send.
+        command : list of tuples, string or bytes string
+            The command to send. A bytes string is sent as is.
 
         """
         block: bool = kwargs.get("block", True)
@@ -184,11 +357,18 @@ class LeicaApi(Api):
         if isinstance(command, str):
             command_dict = bytes_as_dict(command.encode())
             command = list(command_dict.items())
-        cmd, value = command[0]  # use the first cmd and value to wait for
+        if isinstance(command, bytes):
+            # Only parse the first part of an encoded command.
+            first_part = command.split(b" ", 1)[0]
+            cmd, value = next(iter(bytes_as_dict(first_part).items()))
+        else:
+            cmd, value = command[0]  # use the first cmd and value to wait for
         cmd_sent: asyncio.Future[bool] = self.center.loop.create_future()
 
         async def receive_reply(center: Center, event: LeicaCommandEvent) -> None:
             """Indicate that reply has been received."""
+            if event.api_name not in (None, self.name):
+                return
             if check_messages([event.data], cmd, value=value):  # type: ignore[list-item]
                 if not cmd_sent.done():
                     cmd_sent.set_result(True)
@@ -199,7 +379,9 @@ class LeicaApi(Api):
         )
         cmd_sent.add_done_callback(lambda x: remove())
 
-        await self.client.send(command)
+        if await self.client.send(command) is False:
+            # The command was dropped by the connection.
+            cmd_sent.set_result(False)
 
         if not block:
             return cmd_sent
@@ -224,12 +406,17 @@ class LeicaApi(Api):
         """Send a command to the microscope to start or stop the imaging."""
         cmd_sent: asyncio.Future[bool] = self.center.loop.create_future()
 
-        async def receive_reply(center: Center, event: Event) -> None:
+        async def receive_reply(center: Center, event: LeicaCommandEvent) -> None:
             """Indicate that reply has been received."""
+            if event.api_name not in (None, self.name):
+                return
             if not cmd_sent.done():
                 cmd_sent.set_result(True)
 
-        remove = self.center.bus.register(event, receive_reply)
+        remove = self.center.bus.register(
+            event,
+            receive_reply,  # type: ignore[arg-type]
+        )
         cmd_sent.add_done_callback(lambda x: remove())
 
         trigger_cmd_sent = await self.send(cmd, block=False)
@@ -253,7 +440,9 @@ class LeicaCommandEvent(CommandEvent):
     @property
     def command(self) -> str:
         """Return the command string."""
-        return tuples_as_bytes(list(self.data.items())).decode()
+        return tuples_as_bytes(
+            [(key, val) for key, val in self.data.items() if key != API_NAME]
+        ).decode()
 
 
 class LeicaStartCommandEvent(StartCommandEvent, LeicaCommandEvent):
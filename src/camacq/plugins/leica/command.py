@@ -1,5 +1,16 @@
 """Handle commands."""
 
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+from numpy import typing as npt
+
+# Bound the cached command parts since per well offsets vary.
+CAMLIST_CACHE_SIZE = 4096
+
 
 def start() -> list[tuple[str, str]]:
     """Start the scan.
@@ -134,3 +145,117 @@ def cam_com(
         ("dxpos", str(dxcoord)),
         ("dypos", str(dycoord)),
     ]
+
+
+@lru_cache(maxsize=CAMLIST_CACHE_SIZE)
+def _camlist_well_prefix(exp: str, wellu: int, wellv: int) -> bytes:
+    """Return the encoded start of a cam list command for a well."""
+    return (
+        f"/cmd:add /tar:camlist /exp:{exp} /ext:af /slide:0 "
+        f"/wellx:{wellu + 1} /welly:{wellv + 1} "
+    ).encode()
+
+
+@lru_cache(maxsize=CAMLIST_CACHE_SIZE)
+def _camlist_field_suffix(
+    fieldx: int, fieldy: int, dxcoord: float, dycoord: float
+) -> bytes:
+    """Return the encoded end of a cam list command for a field."""
+    return (
+        f"/fieldx:{fieldx + 1} /fieldy:{fieldy + 1} /dxpos:{dxcoord} /dypos:{dycoord}"
+    ).encode()
+
+
+def _as_pairs(value: npt.ArrayLike, dtype: type[Any] = int) -> list[Any]:
+    """Return an array like of coordinate pairs as a list of tuples."""
+    array = np.asarray(value, dtype=dtype).reshape(-1, 2)
+    return list(zip(*array.T.tolist(), strict=True))
+
+
+def field_grid(fields_x: int, fields_y: int) -> npt.NDArray[np.int_]:
+    """Return the coordinates of all fields in a grid.
+
+    Parameters
+    ----------
+    fields_x : int
+        The number of fields in x.
+    fields_y : int
+        The number of fields in y.
+
+    Returns
+    -------
+    numpy array
+        Return an array of shape (fields_x * fields_y, 2) with the x and y
+        coordinates of the fields, starting from 0, in x major order.
+
+    """
+    grid_x, grid_y = np.meshgrid(
+        np.arange(fields_x), np.arange(fields_y), indexing="ij"
+    )
+    return np.column_stack((grid_x.ravel(), grid_y.ravel()))
+
+
+def camlist_com(
+    exp: str,
+    wells: npt.ArrayLike,
+    fields: npt.ArrayLike,
+    offsets: npt.ArrayLike | None = None,
+) -> list[bytes]:
+    """Add all fields of all wells to the cam list.
+
+    Parameters
+    ----------
+    exp : str
+        The name of the job to use for the fields.
+    wells : array_like
+        The x and y coordinates of the wells, starting from 0, with
+        shape (n, 2).
+    fields : array_like
+        The x and y coordinates of the fields, starting from 0, with
+        shape (m, 2).
+    offsets : array_like, optional
+        The dx and dy offsets of the fields. Either one pair for all
+        fields, shape (m, 2) for an offset per field or shape (n, m, 2)
+        for an offset per field and well. Default is no offset.
+
+    Returns
+    -------
+    list
+        Return a list with one encoded cam command per field and well.
+        The commands are ordered by well and then by field.
+
+    """
+    well_pairs = _as_pairs(wells)
+    field_pairs = _as_pairs(fields)
+    if not well_pairs or not field_pairs:
+        return []
+    shape = (len(well_pairs), len(field_pairs), 2)
+    offset_array = np.broadcast_to(
+        np.asarray(0 if offsets is None else offsets, dtype=float), shape
+    )
+    if (offset_array == offset_array[0]).all():
+        # The same fields for all wells, reuse the encoded field parts.
+        suffixes = [
+            _camlist_field_suffix(fieldx, fieldy, _number(dx), _number(dy))
+            for (fieldx, fieldy), (dx, dy) in zip(
+                field_pairs, offset_array[0].tolist(), strict=True
+            )
+        ]
+        return [
+            _camlist_well_prefix(exp, wellu, wellv) + suffix
+            for wellu, wellv in well_pairs
+            for suffix in suffixes
+        ]
+    return [
+        _camlist_well_prefix(exp, wellu, wellv)
+        + _camlist_field_suffix(fieldx, fieldy, _number(dx), _number(dy))
+        for (wellu, wellv), well_offsets in zip(
+            well_pairs, offset_array.tolist(), strict=True
+        )
+        for (fieldx, fieldy), (dx, dy) in zip(field_pairs, well_offsets, strict=True)
+    ]
+
+
+def _number(value: float) -> float:
+    """Return a float as an int if it has no decimals."""
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,251 @@
+"""Handle the connection to the Leica CAM server."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+import logging
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from leicacam.async_cam import AsyncCAM
+
+from camacq.event import Event
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+
+_LOGGER = logging.getLogger(__name__)
+
+LEICA_CONNECTION_EVENT = "leica_connection_event"
+
+Command = list[tuple[str, str]] | bytes
+
+
+class CamConnection:
+    """Represent a connection to the CAM server that reconnects on failure.
+
+    Commands sent while the connection is down are kept in a bounded queue
+    and sent in order when the connection is restored.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    cam : AsyncCAM instance
+        The client for the CAM server.
+    queue_size : int
+        The maximum number of commands to queue while disconnected.
+    reconnect_delay : float
+        The initial delay in seconds before trying to reconnect.
+    max_reconnect_delay : float
+        The maximum delay in seconds between reconnect attempts.
+
+    """
+
+    def __init__(
+        self,
+        center: Center,
+        cam: AsyncCAM,
+        queue_size: int = 100,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+    ) -> None:
+        """Set up instance."""
+        self.center = center
+        self.cam = cam
+        self._queue: deque[Command] = deque()
+        self._queue_size = queue_size
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._connected = asyncio.Event()
+        self._reconnect_task: asyncio.Task[None] | None = None
+        self._closing = False
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"CamConnection(host={self.host}, port={self.port})"
+
+    @property
+    def host(self) -> str:
+        """:str: Return the host of the CAM server."""
+        return self.cam.host
+
+    @property
+    def port(self) -> int:
+        """:int: Return the port of the CAM server."""
+        return self.cam.port
+
+    @property
+    def connected(self) -> bool:
+        """:bool: Return True if connected to the CAM server."""
+        return self._connected.is_set()
+
+    @property
+    def queued(self) -> int:
+        """:int: Return the number of commands waiting to be sent."""
+        return len(self._queue)
+
+    async def connect(self) -> None:
+        """Connect to the CAM server.
+
+        Raise OSError if the connection fails.
+        """
+        await self.cam.connect()
+        await self._on_connected()
+
+    async def send(self, command: Command) -> bool:
+        """Send a command or queue it if the connection is down.
+
+        Parameters
+        ----------
+        command : list of tuples or bytes string
+            The command to send.
+
+        Returns
+        -------
+        bool
+            Return True if the command was sent or queued, False if the
+            command was dropped because the queue is full.
+
+        """
+        if not self.connected or self._queue:
+            return self._enqueue(command)
+        try:
+            await self.cam.send(command)
+        except (OSError, RuntimeError) as exc:
+            _LOGGER.warning("Failed to send command %s: %s", command, exc)
+            queued = self._enqueue(command)
+            await self._connection_lost()
+            return queued
+        return True
+
+    async def receive(self) -> list[OrderedDict[str, str]]:
+        """Receive a message from the CAM server.
+
+        Wait until the connection is restored if the connection is down.
+        """
+        while True:
+            await self._connected.wait()
+            try:
+                reply = await self.cam.receive()
+            except RuntimeError:
+                reply = []
+            if reply or not self._is_lost():
+                return reply
+            await self._connection_lost()
+
+    def close(self) -> None:
+        """Close the connection and stop reconnecting."""
+        self._closing = True
+        self._connected.clear()
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self.cam.close()
+
+    def _enqueue(self, command: Command) -> bool:
+        """Queue a command to send when connected."""
+        if len(self._queue) >= self._queue_size:
+            _LOGGER.error(
+                "Command queue is full (%s), dropping command %s",
+                self._queue_size,
+                command,
+            )
+            return False
+        _LOGGER.debug("Queueing command %s", command)
+        self._queue.append(command)
+        return True
+
+    def _is_lost(self) -> bool:
+        """Return True if the stream to the CAM server has ended."""
+        reader = self.cam.reader
+        return reader is None or reader.at_eof() or reader.exception() is not None
+
+    async def _on_connected(self) -> None:
+        """Handle a new connection and send queued commands."""
+        _LOGGER.info("Connected to CAM server %s:%s", self.host, self.port)
+        self._connected.set()
+        await self.center.bus.notify(self._state_event())
+        while self._queue and self.connected:
+            command = self._queue[0]
+            try:
+                await self.cam.send(command)
+            except (OSError, RuntimeError) as exc:
+                _LOGGER.warning("Failed to send queued command %s: %s", command, exc)
+                await self._connection_lost()
+                return
+            self._queue.popleft()
+
+    async def _connection_lost(self) -> None:
+        """Handle a lost connection and start reconnecting."""
+        if self._closing or not self.connected:
+            return
+        _LOGGER.warning("Lost connection to CAM server %s:%s", self.host, self.port)
+        self._connected.clear()
+        self.cam.close()
+        await self.center.bus.notify(self._state_event())
+        self._reconnect_task = self.center.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """Reconnect with exponential backoff."""
+        delay = self._reconnect_delay
+        while True:
+            _LOGGER.info("Reconnecting to CAM server in %s seconds", delay)
+            await asyncio.sleep(delay)
+            try:
+                await self.cam.connect()
+            except OSError as exc:
+                _LOGGER.warning("Reconnecting to CAM server failed: %s", exc)
+                delay = min(delay * 2, self._max_reconnect_delay)
+                continue
+            break
+        self._reconnect_task = None
+        await self._on_connected()
+
+    def _state_event(self) -> LeicaConnectionEvent:
+        """Return an event with the current connection state."""
+        return LeicaConnectionEvent(
+            {
+                "host": self.host,
+                "port": self.port,
+                "connected": self.connected,
+                "queued": self.queued,
+            }
+        )
+
+
+class LeicaConnectionEvent(Event):
+    """An event fired when the connection to the CAM server changes."""
+
+    __slots__ = ()
+
+    event_type: ClassVar[str] = LEICA_CONNECTION_EVENT
+
+    @property
+    def host(self) -> str | None:
+        """:str: Return the host of the CAM server."""
+        return self.data.get("host")
+
+    @property
+    def port(self) -> int | None:
+        """:int: Return the port of the CAM server."""
+        return self.data.get("port")
+
+    @property
+    def connected(self) -> bool:
+        """:bool: Return True if the connection is up."""
+        return self.data.get("connected", False)
+
+    @property
+    def queued(self) -> int:
+        """:int: Return the number of queued commands."""
+        return self.data.get("queued", 0)
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        data: dict[str, Any] = {
+            "host": self.host,
+            "port": self.port,
+            "connected": self.connected,
+        }
+        return f"{type(self).__name__}(data={data})"
@@ -15,6 +15,7 @@ from camacq.plugins.sample import (
     ImageContainer,
     Sample,
     SampleEvent,
+    SampleImageSetEvent,
     register_sample,
 )
 
@@ -153,6 +154,13 @@ class LeicaSample(Sample):
         """:dict: Return a dict with the values set for the container."""
         return self._values
 
+    def change_events(self, name: str) -> list[type[SampleEvent]] | None:
+        """Return the event classes that setting a container can fire.
+
+        Setting a container also sets its parent containers.
+        """
+        return CONTAINER_EVENTS.get(name)
+
     async def on_image(  # type: ignore[override]
         self, center: Center, event: ImageEvent
     ) -> None:
@@ -696,3 +704,20 @@ def next_well_xy(
 
     x_well, y_well = next(not_done, (None, None))
     return x_well, y_well
+
+
+CONTAINER_EVENTS: dict[str, list[type[SampleEvent]]] = {
+    "plate": [PlateEvent],
+    "well": [WellEvent, PlateEvent],
+    "field": [FieldEvent, WellEvent, PlateEvent],
+    "channel": [ChannelEvent, WellEvent, PlateEvent],
+    "z_slice": [ZSliceEvent, WellEvent, PlateEvent],
+    "image": [
+        SampleImageSetEvent,
+        FieldEvent,
+        ZSliceEvent,
+        ChannelEvent,
+        WellEvent,
+        PlateEvent,
+    ],
+}
@@ -0,0 +1,204 @@
+"""Handle projections of the images of a sample."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import voluptuous as vol
+
+from camacq.const import CAMACQ_STOP_EVENT
+from camacq.event import Event
+from camacq.helper import BASE_ACTION_SCHEMA
+from camacq.image import (
+    PROJECTION_MAX,
+    PROJECTION_MODES,
+    ImageData,
+    ImageWriter,
+    make_projections,
+)
+from camacq.image_store import ArrayStore, FieldKey
+
+if TYPE_CHECKING:
+    from camacq.control import Center
+    from camacq.plugins.sample import Image
+
+_LOGGER = logging.getLogger(__name__)
+ACTION_MAKE_PROJECTION = "make_projection"
+CONF_DTYPES = "dtypes"
+CONF_MODES = "modes"
+CONF_OUTPUT_DIR = "output_dir"
+CONF_SAMPLE_NAME = "sample_name"
+CONF_STORE_DIR = "store_dir"
+PROJECTION_NAME = "{mode}--{name}"
+
+
+def valid_dtype(value: Any) -> str:
+    """Validate that value is the name of a numpy dtype."""
+    try:
+        return np.dtype(value).name
+    except TypeError as exc:
+        raise vol.Invalid(f"Invalid dtype: {value}") from exc
+
+
+async def setup_module(center: Center, config: dict[str, Any]) -> None:
+    """Set up projection plugin.
+
+    Parameters
+    ----------
+    center : Center instance
+        The Center instance.
+    config : dict
+        The config dict.
+
+    """
+    writer = ImageWriter(center)
+    stores: dict[str, ArrayStore] = {}
+
+    async def handle_action(**kwargs: Any) -> None:
+        """Handle the action call to make projections of sample images.
+
+        Parameters
+        ----------
+        **kwargs
+            Arbitrary keyword arguments. These will be passed to the
+            action function when an action is called.
+
+        """
+        kwargs.pop("action_id", None)
+        kwargs.pop("silent", None)
+        sample = center.samples[kwargs.pop(CONF_SAMPLE_NAME)]
+        modes: list[str] = kwargs.pop(CONF_MODES)
+        dtypes: dict[str, str] = kwargs.pop(CONF_DTYPES)
+        output_dir: str | None = kwargs.pop(CONF_OUTPUT_DIR, None)
+        store_dir: str | None = kwargs.pop(CONF_STORE_DIR, None)
+        # The remaining keyword arguments select the images by attribute.
+        images = sorted(
+            (
+                image
+                for image in sample.images.values()
+                if all(
+                    str(getattr(image, attr, None)) == str(value)
+                    for attr, value in kwargs.items()
+                )
+            ),
+            key=_plane_order,
+        )
+        if not images:
+            _LOGGER.warning("No images found for projection with %s", kwargs)
+            return
+        channels = {image.path: getattr(image, "channel_id", 0) for image in images}
+        projs = await center.add_executor_job(make_projections, channels, modes, dtypes)
+        if store_dir:
+            store = stores.setdefault(store_dir, ArrayStore(store_dir))
+            field_images = {image.path: image for image in images}
+            await center.add_executor_job(store_projections, store, projs, field_images)
+            return
+        futures = []
+        for channel_projs in projs.values():
+            for mode, proj in channel_projs.items():
+                assert proj.path is not None  # noqa: S101
+                path = projection_path(proj.path, mode, output_dir)
+                _LOGGER.debug("Saving %s projection to %s", mode, path)
+                futures.append(
+                    await writer.async_submit(path, proj.data, proj.description)
+                )
+        # The writer logs failed writes.
+        await asyncio.gather(*futures, return_exceptions=True)
+
+    make_projection_action_schema = BASE_ACTION_SCHEMA.extend(
+        {
+            vol.Required(CONF_SAMPLE_NAME): vol.All(
+                vol.Coerce(str), vol.In(center.samples)
+            ),
+            vol.Optional(CONF_MODES, default=[PROJECTION_MAX]): vol.All(
+                vol.Length(min=1), [vol.In(PROJECTION_MODES)]
+            ),
+            vol.Optional(CONF_DTYPES, default={}): {
+                vol.In(PROJECTION_MODES): valid_dtype
+            },
+            vol.Exclusive(CONF_OUTPUT_DIR, "output"): vol.Coerce(str),
+            vol.Exclusive(CONF_STORE_DIR, "output"): vol.Coerce(str),
+        },
+        extra=vol.ALLOW_EXTRA,
+    )
+
+    center.actions.register(
+        "projection",
+        ACTION_MAKE_PROJECTION,
+        handle_action,
+        make_projection_action_schema,
+    )
+
+    async def stop_writer(center: Center, event: Event) -> None:
+        """Write the queued projections and stop the writer."""
+        await center.add_executor_job(writer.stop)
+
+    center.bus.register(CAMACQ_STOP_EVENT, stop_writer)
+
+
+def _plane_order(image: Image) -> int:
+    """Return the z slice of an image to order the planes."""
+    return int(getattr(image, "z_slice_id", 0))
+
+
+def projection_path(path: str, mode: str, output_dir: str | None = None) -> str:
+    """Return the path of a projection named after the mode and an image.
+
+    Parameters
+    ----------
+    path : str
+        The path to the last image of the projection.
+    mode : str
+        The projection mode.
+    output_dir : str
+        Optional directory to save the projection in. The default is the
+        directory of the image.
+
+    """
+    image_path = Path(path)
+    save_dir = Path(output_dir) if output_dir else image_path.parent
+    return (
+        save_dir / PROJECTION_NAME.format(mode=mode, name=image_path.name)
+    ).as_posix()
+
+
+def store_projections(
+    store: ArrayStore,
+    projs: dict[int, dict[str, ImageData]],
+    images: dict[str, Image],
+) -> None:
+    """Append projections to the arrays of their field in an array store.
+
+    Each projection mode is an array of the field with one plane per
+    channel.
+
+    Parameters
+    ----------
+    store : ArrayStore instance
+        The array store.
+    projs : dict
+        Dict of channels that map dicts of modes and ImageData objects.
+    images : dict
+        Dict of paths and sample images of the projections.
+
+    """
+    for channel_id, channel_projs in projs.items():
+        for mode, proj in channel_projs.items():
+            image = images[proj.path]  # type: ignore[index]
+            try:
+                field = FieldKey(
+                    image.plate_name,  # type: ignore[attr-defined]
+                    image.well_x,  # type: ignore[attr-defined]
+                    image.well_y,  # type: ignore[attr-defined]
+                    image.field_x,  # type: ignore[attr-defined]
+                    image.field_y,  # type: ignore[attr-defined]
+                )
+            except AttributeError as exc:
+                _LOGGER.error("Missing field coordinates of %s: %s", image, exc)
+                continue
+            _LOGGER.debug("Storing %s projection in %s", mode, store)
+            store.append(field, proj.data, channel_id=channel_id, array=mode)
@@ -9,6 +9,7 @@ from typing import TYPE_CHECKING, Any
 import voluptuous as vol
 
 from camacq.helper import BASE_ACTION_SCHEMA, has_at_least_one_key
+from camacq.image import IMAGE_CACHE
 
 if TYPE_CHECKING:
     from camacq.control import Center
@@ -112,4 +113,6 @@ def rename_image(old_path: Path, new_path: Path) -> bool:
         _LOGGER.error("Failed to rename image: %s", exc)
     else:
         renamed = True
+        IMAGE_CACHE.invalidate(old_path)
+        IMAGE_CACHE.invalidate(new_path)
     return renamed
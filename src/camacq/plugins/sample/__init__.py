@@ -12,7 +12,8 @@ import voluptuous as vol
 
 from camacq.event import Event
 from camacq.exceptions import SampleError
-from camacq.helper import BASE_ACTION_SCHEMA
+from camacq.helper import BASE_ACTION_SCHEMA, ensure_dict
+from camacq.image import DEFAULT_CACHE_BYTES, IMAGE_CACHE
 from camacq.util import dotdict
 
 if TYPE_CHECKING:
@@ -23,6 +24,19 @@ SAMPLE_EVENT = "sample_event"
 SAMPLE_IMAGE_SET_EVENT = "sample_image_set_event"
 
 ACTION_SET_SAMPLE = "set_sample"
+CONF_IMAGE_CACHE_BYTES = "image_cache_bytes"
+CONF_SAMPLE = "sample"
+
+CONFIG_SCHEMA = vol.Schema(
+    vol.All(
+        ensure_dict,
+        {
+            vol.Optional(CONF_IMAGE_CACHE_BYTES, default=DEFAULT_CACHE_BYTES): vol.All(
+                vol.Coerce(int), vol.Range(min=0)
+            ),
+        },
+    )
+)
 SET_SAMPLE_ACTION_SCHEMA = BASE_ACTION_SCHEMA.extend(
     {"sample_name": vol.Coerce(str)}, extra=vol.ALLOW_EXTRA
 )
@@ -46,6 +60,8 @@ async def setup_module(center: Center, config: dict[str, Any]) -> None:
         The config dict.
 
     """
+    conf = ensure_dict(config.get(CONF_SAMPLE))
+    IMAGE_CACHE.resize(conf.get(CONF_IMAGE_CACHE_BYTES, DEFAULT_CACHE_BYTES))
 
     async def handle_action(**kwargs: Any) -> None:
         """Handle action call to add a state to the sample.
@@ -136,10 +152,19 @@ class ImageContainer(ABC):
 
 
 class Sample(ImageContainer, ABC):
-    """Representation of the state of the sample."""
+    """Representation of the state of the sample.
+
+    Attributes
+    ----------
+    version : int
+        Return a number that is increased when the sample state is set.
+
+    """
 
     center: Center | None = None
     data: dict[str, ImageContainer] | None = None
+    version: int = 0
+    _locks: dict[str, asyncio.Lock] | None = None
 
     @property
     @abstractmethod
@@ -160,6 +185,22 @@ class Sample(ImageContainer, ABC):
     async def on_image(self, center: Center, event: Event) -> None:
         """Handle image event for this sample."""
 
+    def change_events(self, name: str) -> list[type[SampleEvent]] | None:
+        """Return the event classes that setting a container can fire.
+
+        Parameters
+        ----------
+        name : str
+            The name of the container type.
+
+        Returns
+        -------
+        list
+            Return a list of event classes or None if they're unknown.
+
+        """
+        return None
+
     def get_sample(self, name: str, **kwargs: Any) -> ImageContainer | None:
         """Get an image container of the sample.
 
@@ -207,19 +248,28 @@ class Sample(ImageContainer, ABC):
         event = None
 
         if container is None:
-            container = await self._set_sample(name, values, **kwargs)
-            if container is None:
-                raise SampleError(f"Unknown sample container name: {name}")
-            event_class = container.change_event
-            event = event_class({"container": container})
+            # Make sure that concurrent calls only create the container once.
+            if self._locks is None:
+                self._locks = {}
+            lock = self._locks.setdefault(id_string, asyncio.Lock())
+            async with lock:
+                container = self.data.get(id_string) if self.data else None
+                if container is None:
+                    container = await self._set_sample(name, values, **kwargs)
+                    if container is None:
+                        raise SampleError(f"Unknown sample container name: {name}")
+                    event_class = container.change_event
+                    event = event_class({"container": container})
+                    if self.data is not None:
+                        self.data[id_string] = container
+            self._locks.pop(id_string, None)
 
         container.values.update(values)
-        if self.data is not None:
-            self.data[id_string] = container
 
         if name == "image":
             image: Image = container  # type: ignore[assignment]
             self.images[image.path] = image
+        self.version += 1
 
         if not event and values:
             event_class = container.change_event
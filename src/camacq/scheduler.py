@@ -0,0 +1,264 @@
+"""Schedule delayed and periodic calls on a timer wheel."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import contextvars
+import logging
+import math
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SLOTS = 512
+DEFAULT_TICK = 0.05
+
+
+class ScheduledCall:
+    """Represent a scheduled call that can be cancelled.
+
+    The callback runs in a copy of the context where the call is
+    scheduled.
+
+    Attributes
+    ----------
+    interval : float or None
+        Return the interval in seconds of a periodic call.
+
+    """
+
+    __slots__ = (
+        "_args",
+        "_callback",
+        "_cancelled",
+        "_context",
+        "_rounds",
+        "_scheduler",
+        "_slot",
+        "interval",
+    )
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        callback: Callable[..., Any],
+        args: tuple[Any, ...],
+        interval: float | None = None,
+    ) -> None:
+        """Set up instance."""
+        self._scheduler = scheduler
+        self._callback = callback
+        self._args = args
+        self._cancelled = False
+        self._context = contextvars.copy_context()
+        self._rounds = 0
+        self._slot: dict[ScheduledCall, None] | None = None
+        self.interval = interval
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return (
+            f"ScheduledCall(callback={self._callback}, interval={self.interval}, "
+            f"cancelled={self._cancelled})"
+        )
+
+    @property
+    def cancelled(self) -> bool:
+        """:bool: Return True if the call is cancelled."""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Cancel the call."""
+        if self._cancelled:
+            return
+        self._cancelled = True
+        self._scheduler.remove(self)
+
+    def run(self) -> None:
+        """Run the callback unless the call is cancelled."""
+        if self._cancelled:
+            return
+        try:
+            self._context.run(self._callback, *self._args)
+        except Exception:
+            _LOGGER.exception("Error in scheduled call %s", self)
+
+
+class Scheduler:
+    """Schedule delayed and periodic calls on a hashed timer wheel.
+
+    The wheel has a number of slots that each hold the calls that are due
+    at a tick. A call that is due after more ticks than there are slots
+    waits a number of rounds of the wheel. Scheduling and cancelling a
+    call take constant time. The wheel only ticks while calls are
+    scheduled. Calls are run up to one tick late.
+
+    Parameters
+    ----------
+    loop : asyncio.EventLoop
+        The event loop.
+    tick : float
+        The time in seconds between ticks of the wheel.
+    slots : int
+        The number of slots of the wheel.
+
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        tick: float = DEFAULT_TICK,
+        slots: int = DEFAULT_SLOTS,
+    ) -> None:
+        """Set up instance."""
+        self._loop = loop
+        self._tick = tick
+        self._wheel: list[dict[ScheduledCall, None]] = [{} for _ in range(slots)]
+        self._position = 0
+        self._time = 0.0
+        self._count = 0
+        self._running = False
+        self._tick_handle: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        """Return the number of scheduled calls."""
+        return self._count
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"Scheduler(tick={self._tick}, slots={len(self._wheel)})"
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> ScheduledCall:
+        """Schedule a call of callback after a delay.
+
+        Parameters
+        ----------
+        delay : float
+            The delay in seconds. A delay of zero or less calls the
+            callback soon.
+        callback : callable
+            The function to call.
+        *args
+            Positional arguments for the callback.
+
+        Returns
+        -------
+        ScheduledCall instance
+            Return the scheduled call.
+
+        """
+        call = ScheduledCall(self, callback, args)
+        if delay <= 0:
+            self._loop.call_soon(call.run)
+        else:
+            self._insert(call, delay)
+        return call
+
+    def call_every(
+        self, interval: float, callback: Callable[..., Any], *args: Any
+    ) -> ScheduledCall:
+        """Schedule a call of callback every interval until cancelled.
+
+        Parameters
+        ----------
+        interval : float
+            The interval in seconds. The interval is at least one tick.
+        callback : callable
+            The function to call.
+        *args
+            Positional arguments for the callback.
+
+        Returns
+        -------
+        ScheduledCall instance
+            Return the scheduled call.
+
+        """
+        call = ScheduledCall(self, callback, args, interval=interval)
+        self._insert(call, interval)
+        return call
+
+    def remove(self, call: ScheduledCall) -> None:
+        """Remove a call from the wheel."""
+        if call._slot is None:
+            return
+        del call._slot[call]
+        call._slot = None
+        self._count -= 1
+        if not self._count and not self._running and self._tick_handle is not None:
+            self._tick_handle.cancel()
+            self._tick_handle = None
+
+    def stop(self) -> None:
+        """Cancel all scheduled calls."""
+        for slot in self._wheel:
+            for call in list(slot):
+                call.cancel()
+
+    def _insert(
+        self, call: ScheduledCall, delay: float, now: float | None = None
+    ) -> None:
+        """Insert a call in the slot of the tick when it's due."""
+        if now is None:
+            now = self._loop.time()
+        if self._tick_handle is None and not self._running:
+            # Start the wheel from now.
+            self._time = now
+            self._schedule_tick()
+        # Count the ticks from the last tick so the call is never early.
+        ticks = max(1, math.ceil((now + delay - self._time) / self._tick - 1e-9))
+        slots = len(self._wheel)
+        call._rounds = (ticks - 1) // slots
+        call._slot = self._wheel[(self._position + ticks) % slots]
+        call._slot[call] = None
+        self._count += 1
+
+    def _schedule_tick(self) -> None:
+        """Schedule the next tick of the wheel.
+
+        The tick runs in an empty context so it doesn't keep the context
+        of the call that started the wheel.
+        """
+        self._tick_handle = self._loop.call_at(
+            self._time + self._tick, self._run, context=contextvars.Context()
+        )
+
+    def _run(self) -> None:
+        """Advance the wheel to now and run the due calls."""
+        now = self._loop.time()
+        self._running = True
+        try:
+            # The handle runs at the next tick. Catch up if the loop is late.
+            while self._count:
+                self._time += self._tick
+                self._position = (self._position + 1) % len(self._wheel)
+                self._run_slot(self._wheel[self._position])
+                if self._time + self._tick > now:
+                    break
+        finally:
+            self._running = False
+        if self._count:
+            self._schedule_tick()
+        else:
+            self._tick_handle = None
+
+    def _run_slot(self, slot: dict[ScheduledCall, None]) -> None:
+        """Run the calls of a slot that are due in this round."""
+        due = []
+        for call in slot:
+            if call._rounds:
+                call._rounds -= 1
+            else:
+                due.append(call)
+        for call in due:
+            del slot[call]
+            call._slot = None
+            self._count -= 1
+        for call in due:
+            if call.interval is not None and not call.cancelled:
+                # Keep the period of a periodic call from drifting.
+                self._insert(call, call.interval, self._time)
+            call.run()
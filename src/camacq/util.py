@@ -1,5 +1,7 @@
 """Host utils that are not aware of the implementation of camacq."""
 
+from collections import OrderedDict
+from collections.abc import Hashable
 from typing import Any
 
 
@@ -9,3 +11,41 @@ class dotdict(dict[str, Any]):
     __getattr__ = dict.get
     __setattr__ = dict.__setitem__
     __delattr__ = dict.__delitem__
+
+
+class LRUSet:
+    """Remember the most recently seen items up to a max size.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of items to remember.
+
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Set up instance."""
+        self.maxsize = maxsize
+        self._items: OrderedDict[Hashable, None] = OrderedDict()
+
+    def __contains__(self, item: object) -> bool:
+        """Return True if item is remembered."""
+        return item in self._items
+
+    def __len__(self) -> int:
+        """Return the number of remembered items."""
+        return len(self._items)
+
+    def add(self, item: Hashable) -> bool:
+        """Add an item and return True if it was already remembered.
+
+        The item is marked as the most recently seen item. The least
+        recently seen item is forgotten if the set is full.
+        """
+        if item in self._items:
+            self._items.move_to_end(item)
+            return True
+        self._items[item] = None
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return False
@@ -1,9 +1,23 @@
 """Test the template helper."""
 
+from functools import partial
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+import pytest
 from ruamel.yaml import YAML
 
 from camacq.control import Center
-from camacq.helper.template import make_template, render_template
+from camacq.event import Event
+from camacq.helper.template import (
+    get_env,
+    make_condition,
+    make_template,
+    render_cache,
+    render_template,
+)
+from camacq.plugins.leica.sample import next_well_xy
 from camacq.plugins.sample import Sample
 
 
@@ -55,3 +69,181 @@ async def test_next_well_no_plate(center: Center, sample: Sample) -> None:
     render = render_template(tmpl, variables)
     assert render["data"]["next_well_x"] == "None"
     assert render["data"]["next_well_y"] == "None"
+
+
+class CountEvent(Event):
+    """Represent an event that counts the lookups of its value."""
+
+    __slots__ = ()
+
+    event_type = "count_event"
+    lookups = 0
+
+    @property
+    def value(self) -> int:
+        """:int: Return the value of the event."""
+        type(self).lookups += 1
+        return int(self.data["value"])
+
+
+async def test_render_cache(center: Center, sample: Sample) -> None:
+    """Test that the render cache reuses results until the sample changes."""
+    tmpl = make_template(
+        center,
+        "{{ next_well_y(samples.test, 'test_plate') }} {{ trigger.event.value }}",
+    )
+    event = CountEvent({"value": 3})
+    variables = {"samples": center.samples, "trigger": {"event": event}}
+    await center.samples.test.set_sample("plate", plate_name="test_plate")
+
+    async def first_handler(center: Center, event: Event) -> None:
+        """Render the template with the cache and change the sample."""
+        with render_cache(event):
+            assert render_template(tmpl, variables) == "0 3"
+            assert render_template(tmpl, variables) == "0 3"
+            assert next_well_mock.call_count == 1
+            assert CountEvent.lookups == 1
+
+            await center.samples.test.set_sample(
+                "well",
+                plate_name="test_plate",
+                well_x=0,
+                well_y=0,
+                values={"well_img_ok": True},
+            )
+            assert render_template(tmpl, variables) == "1 3"
+            assert next_well_mock.call_count == 2
+            assert CountEvent.lookups == 2
+
+    async def second_handler(center: Center, event: Event) -> None:
+        """Render the template with the cache shared by the dispatch."""
+        with render_cache(event):
+            assert render_template(tmpl, variables) == "1 3"
+            assert next_well_mock.call_count == 2
+
+    center.bus.register(CountEvent.event_type, first_handler)
+    center.bus.register(CountEvent.event_type, second_handler)
+
+    with patch(
+        "camacq.helper.template.next_well_xy", wraps=next_well_xy
+    ) as next_well_mock:
+        await center.bus.notify(event)
+
+        assert render_template(tmpl, variables) == "1 3"
+        assert next_well_mock.call_count == 3
+        assert CountEvent.lookups == 3
+
+        # The cache is dropped when the dispatch ends.
+        with render_cache(event):
+            assert render_template(tmpl, variables) == "1 3"
+        with render_cache(event):
+            assert render_template(tmpl, variables) == "1 3"
+        assert next_well_mock.call_count == 5
+
+
+async def test_constant_data(center: Center) -> None:
+    """Test that data without template syntax is kept as constants."""
+    data = """
+        data:
+          plate_name: "00"
+          well_x: 1
+          enabled: true
+          command: >
+            /cmd:deletelist
+          dynamic: "{{ value }}"
+          items:
+            - 2
+            - "{{ value + 1 }}"
+    """
+
+    data = YAML(typ="safe").load(data)
+    tmpl = make_template(center, data)
+    render = render_template(tmpl, {"value": 1})
+
+    assert render["data"] == {
+        "plate_name": "00",
+        "well_x": 1,
+        "enabled": True,
+        # The constant string renders like a template.
+        "command": get_env(center).from_string("/cmd:deletelist\n").render(),
+        "dynamic": "1",
+        "items": [2, "2"],
+    }
+
+
+async def test_native_expression(center: Center) -> None:
+    """Test that a single call of a list global renders the list."""
+    data = """
+        data:
+          fields: "{{ field_grid(2, 2) }}"
+          commands: >
+            {{ camlist("p10xexp", [[well_x, 0]], field_grid(1, 2)) }}
+          missing: "{{ missing }}"
+          text: "well {{ well_x }}"
+          trimmed: "{{- well_x -}}"
+          value: "{{ well_y }}"
+          none: "{{ none }}"
+    """
+
+    data = YAML(typ="safe").load(data)
+    tmpl = make_template(center, data)
+    render = render_template(tmpl, {"well_x": 1, "well_y": 0, "none": None})
+
+    assert render["data"] == {
+        "fields": [[0, 0], [0, 1], [1, 0], [1, 1]],
+        "commands": [
+            b"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:2 "
+            b"/welly:1 /fieldx:1 /fieldy:1 /dxpos:0 /dypos:0",
+            b"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:2 "
+            b"/welly:1 /fieldx:1 /fieldy:2 /dxpos:0 /dypos:0",
+        ],
+        "missing": "",
+        "text": "well 1",
+        "trimmed": "1",
+        # Other single expressions render strings.
+        "value": "0",
+        "none": "None",
+    }
+
+
+@pytest.mark.parametrize(
+    ("condition", "compiled"),
+    [
+        (
+            "{% if trigger.event.job_id in [2, 3, 4]\n"
+            "and trigger.event.channel_id != 31 %}true{% endif %}\n",
+            True,
+        ),
+        ("{{ not trigger.event.images }}", True),
+        ("{{ trigger.event.job_id == 2 or trigger.event.channel_id > 1 }}", True),
+        ("{{ 1 < trigger.event.channel_id <= 31 }}", True),
+        ("{{ trigger['event'].well.values['gain'] not in (800, 900) }}", True),
+        (
+            "{% if trigger.event.job_id == 2 %}true{% elif trigger.event.job_id == 3"
+            " %}false{% else %}{{ trigger.event.channel_id }}{% endif %}",
+            True,
+        ),
+        # Undefined attributes fall back to rendering.
+        ("{{ trigger.event.missing is not defined }}", False),
+        ("{{ trigger.event.missing == 1 }}", True),
+        ("{{ trigger.event.images | length == 0 }}", False),
+        ("{{ dict(a=trigger.event.job_id).a == 2 }}", False),
+        ("{{ trigger.event.channel_id + 1 == 2 }}", False),
+    ],
+)
+async def test_condition(center: Center, condition: str, compiled: bool) -> None:
+    """Test that a condition renders the same compiled as with Jinja."""
+    func = make_condition(center, condition)
+    tmpl = make_template(center, condition)
+    assert isinstance(func, partial) is not compiled
+
+    for job_id in (2, 3, 4, 5):
+        for channel_id in (0, 1, 31):
+            event = SimpleNamespace(
+                job_id=job_id,
+                channel_id=channel_id,
+                images={},
+                well=SimpleNamespace(values={"gain": 800 + channel_id * 100}),
+            )
+            variables: dict[str, Any] = {"trigger": {"event": event}, "samples": {}}
+            assert func(variables) == render_template(tmpl, variables)
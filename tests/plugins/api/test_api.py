@@ -0,0 +1,33 @@
+"""Test the api plugin."""
+
+from typing import Any
+
+import pytest
+
+from camacq.control import Center
+from tests.conftest import MockApi
+
+
+@pytest.mark.parametrize(
+    ("commands", "sent"),
+    [
+        (
+            '["/cmd:deletelist", "/cmd:startscan"]',
+            ["/cmd:deletelist", "/cmd:startscan"],
+        ),
+        ('[[["cmd", "deletelist"]]]', [[("cmd", "deletelist")]]),
+        (
+            [[["cmd", "deletelist"], ["dev", "stage"]]],
+            [[("cmd", "deletelist"), ("dev", "stage")]],
+        ),
+        ([b"/cmd:deletelist"], [b"/cmd:deletelist"]),
+    ],
+)
+async def test_send_many(
+    center: Center, api: MockApi, commands: Any, sent: list[Any]
+) -> None:
+    """Test the send_many action with JSON and native commands."""
+    await center.actions.call("command", "send_many", commands=commands)
+    await center.wait_for()
+
+    assert api.calls == [("send", command) for command in sent]
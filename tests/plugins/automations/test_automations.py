@@ -1,14 +1,24 @@
 """Test automations."""
 
+import asyncio
+import json
 import logging
-from unittest.mock import call
+from pathlib import Path
+from typing import Any
+from unittest.mock import call, patch
 
 import pytest
 from ruamel.yaml import YAML
+import voluptuous as vol
 
 from camacq import plugins
-from camacq.control import CamAcqStartEvent, Center
+from camacq.control import CamAcqStartEvent, CamAcqStopEvent, Center
+from camacq.exceptions import CamAcqError
+from camacq.helper import BASE_ACTION_SCHEMA
 from camacq.plugins import api as api_mod
+from camacq.plugins import automations as automations_mod
+from camacq.plugins import sample as sample_mod
+from camacq.plugins.leica import sample as leica_sample_mod
 from tests.conftest import MockApi, MockSample
 
 
@@ -42,8 +52,9 @@ async def test_setup_automation(center: Center, sample: MockSample) -> None:
     await center.bus.notify(event)
     await center.wait_for()
     assert sample.mock_set_sample.call_count == 1
+    # Data without template syntax keeps its type.
     assert sample.mock_set_sample.call_args == call(
-        "well", plate_name="test", well_x="1", well_y="1"
+        "well", plate_name="test", well_x=1, well_y=1
     )
 
     await center.actions.call("automations", "toggle", name="test_automation")
@@ -297,3 +308,618 @@ async def test_delay_action(
     assert api.calls[-2] == ("start_imaging",)
     assert api.calls[-1] == ("stop_imaging",)
     assert "Action delay for 0.0 seconds" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("mode", "max_runs", "started", "finished", "dropped", "queued"),
+    [
+        ("parallel", None, [0, 1, 2, 3], [0, 1, 2, 3], 0, 0),
+        ("parallel", 2, [0, 1], [0, 1], 2, 0),
+        ("single", None, [0], [0], 3, 0),
+        ("queued", 2, [0, 1, 2], [0, 1, 2], 1, 2),
+        ("restart", None, [0, 1, 2, 3], [3], 0, 0),
+    ],
+)
+async def test_run_mode(
+    center: Center,
+    mode: str,
+    max_runs: int | None,
+    started: list[int],
+    finished: list[int],
+    dropped: int,
+    queued: int,
+) -> None:
+    """Test run modes of an automation triggered while running."""
+    config = f"""
+        automations:
+          - name: test_mode
+            mode: {mode}
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: test
+                id: block
+                data:
+                  value: "{{{{ trigger.event.data.value }}}}"
+    """
+    gate = asyncio.Event()
+    calls: dict[str, list[int]] = {"started": [], "finished": []}
+
+    async def block(**kwargs: Any) -> None:
+        """Block until the gate opens."""
+        calls["started"].append(kwargs["value"])
+        await gate.wait()
+        calls["finished"].append(kwargs["value"])
+
+    center.actions.register(
+        "test",
+        "block",
+        block,
+        BASE_ACTION_SCHEMA.extend({vol.Required("value"): vol.Coerce(int)}),
+    )
+    conf = YAML(typ="safe").load(config)
+    if max_runs is not None:
+        conf["automations"][0]["max"] = max_runs
+    await plugins.setup_module(center, conf)
+    automation = center.data["automations"]["test_mode"]
+
+    for value in range(4):
+        center.create_task(
+            center.bus.notify(api_mod.CommandEvent(data={"value": value}))
+        )
+        await asyncio.sleep(0.01)
+    gate.set()
+    await center.wait_for()
+
+    assert calls == {"started": started, "finished": finished}
+    assert automation.dropped == dropped
+    assert automation.queued == queued
+    assert automation.running == 0
+
+
+@pytest.mark.parametrize(
+    ("trigger_type", "commands"),
+    [
+        ("debounce", ["1 [0]", "0 [0, 1, 2]"]),
+        ("throttle", ["0 [0]", "1 [0]", "0 [1, 2]"]),
+    ],
+)
+async def test_window_trigger(
+    center: Center, api: MockApi, trigger_type: str, commands: list[str]
+) -> None:
+    """Test debounce and throttle triggers for bursts of events."""
+    config = f"""
+        automations:
+          - name: test_window
+            trigger:
+              - type: {trigger_type}
+                id: image_event
+                data:
+                  seconds: 0.05
+                  group_by:
+                    - well_x
+                  event_data:
+                    field_x: 1
+            action:
+              - type: command
+                id: send
+                data:
+                  command: >
+                    {{{{ trigger.event.well_x }}}}
+                    {{{{ trigger.events | map(attribute='channel_id') | list }}}}
+    """
+    await plugins.setup_module(center, YAML(typ="safe").load(config))
+    automation = center.data["automations"]["test_window"]
+
+    for well_x, field_x, channel_id in (
+        (0, 1, 0),
+        (1, 1, 0),
+        (0, 1, 1),
+        (0, 0, 3),
+        (0, 1, 2),
+    ):
+        event = api_mod.ImageEvent(
+            {
+                "path": f"test_path_{well_x}_{field_x}_{channel_id}",
+                "plate_name": "00",
+                "well_x": well_x,
+                "well_y": 0,
+                "field_x": field_x,
+                "field_y": 1,
+                "z_slice_id": 0,
+                "channel_id": channel_id,
+            }
+        )
+        await center.bus.notify(event)
+    await asyncio.sleep(0.2)
+    await center.wait_for()
+
+    assert [command for _, command in api.calls] == commands
+
+    automation.disable()
+    await center.bus.notify(event)
+    await asyncio.sleep(0.1)
+    await center.wait_for()
+
+    assert len(api.calls) == len(commands)
+
+
+async def test_delay_stop_handlers(center: Center, api: MockApi) -> None:
+    """Test that delays don't register handlers and are cancelled at stop."""
+    config = """
+        automations:
+          - name: test_delay
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: automations
+                id: delay
+                data:
+                  seconds: 10
+              - type: command
+                id: stop_imaging
+    """
+    await plugins.setup_module(center, YAML(typ="safe").load(config))
+    handlers = len(center.bus._registry.get("camacq_stop_event", []))
+
+    for _ in range(10):
+        await center.bus.notify(api_mod.CommandEvent(data={}))
+    await center.wait_for()
+
+    assert len(center.scheduler) == 10
+    assert len(center.bus._registry.get("camacq_stop_event", [])) == handlers
+
+    center.scheduler.stop()
+
+    assert not center.scheduler
+    assert not api.calls
+
+
+async def test_interval_trigger(center: Center, api: MockApi) -> None:
+    """Test interval trigger."""
+    config = """
+        automations:
+          - name: test_interval
+            trigger:
+              - type: interval
+                id: poll
+                data:
+                  seconds: 0.05
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ trigger.id }} {{ trigger.count }}"
+    """
+    await plugins.setup_module(center, YAML(typ="safe").load(config))
+    automation = center.data["automations"]["test_interval"]
+
+    async with asyncio.timeout(1):
+        while len(api.calls) < 3:
+            await asyncio.sleep(0.01)
+    automation.disable()
+    await center.wait_for()
+
+    assert [command for _, command in api.calls[:3]] == ["poll 1", "poll 2", "poll 3"]
+    assert not center.scheduler
+
+
+@pytest.mark.parametrize(("max_runs", "max_running"), [(None, 3), (1, 1)])
+async def test_parallel_action(
+    center: Center,
+    api: MockApi,
+    caplog: pytest.LogCaptureFixture,
+    max_runs: int | None,
+    max_running: int,
+) -> None:
+    """Test parallel action."""
+    config = """
+        automations:
+          - name: test_parallel
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: automations
+                id: parallel
+                data:
+                  timeout: 0.1
+                  actions:
+                    - type: test
+                      id: run
+                      data:
+                        value: 1
+                    - type: test
+                      id: run
+                      data:
+                        value: "{{ trigger.event.data.value }}"
+                    - type: test
+                      id: run
+                      data:
+                        value: 3
+              - type: command
+                id: send
+                data:
+                  command: done
+    """
+    running: list[int] = []
+    calls: list[tuple[int, int]] = []
+
+    async def run(**kwargs: Any) -> None:
+        """Run an action that fails or times out for some values."""
+        running.append(kwargs["value"])
+        calls.append((kwargs["value"], len(running)))
+        try:
+            await asyncio.sleep(0.01)
+            if kwargs["value"] == 2:
+                raise CamAcqError("Failed")
+            if kwargs["value"] == 3:
+                await asyncio.sleep(1)
+        finally:
+            running.remove(kwargs["value"])
+
+    center.actions.register(
+        "test",
+        "run",
+        run,
+        BASE_ACTION_SCHEMA.extend({vol.Required("value"): vol.Coerce(int)}),
+    )
+    conf = YAML(typ="safe").load(config)
+    if max_runs is not None:
+        conf["automations"][0]["action"][0]["data"]["max"] = max_runs
+    await plugins.setup_module(center, conf)
+
+    await center.bus.notify(api_mod.CommandEvent(data={"value": 2}))
+    await center.wait_for()
+
+    assert sorted(value for value, _ in calls) == [1, 2, 3]
+    assert max(count for _, count in calls) == max_running
+    assert "Parallel action test.run failed: Failed" in caplog.text
+    assert "Parallel action test.run timed out after 0.1 seconds" in caplog.text
+    assert api.calls == [("send", "done")]
+
+
+async def test_trace(
+    center: Center,
+    api: MockApi,
+    caplog: pytest.LogCaptureFixture,
+    tmp_path: Path,
+) -> None:
+    """Test tracing automation runs."""
+    config = """
+        automations:
+          - name: test_trace
+            trace: true
+            trigger:
+              - type: event
+                id: command_event
+            condition:
+              type: and
+              conditions:
+                - condition: "{{ trigger.event.data.value > 0 }}"
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ trigger.event.data.value }}"
+              - type: command
+                id: send
+                data:
+                  command: "{{ trigger.event.data.missing.value }}"
+    """
+    conf = YAML(typ="safe").load(config)
+    await plugins.setup_module(center, conf)
+    automation = center.data["automations"]["test_trace"]
+
+    for value in (1, 0, 2):
+        await center.bus.notify(api_mod.CommandEvent(data={"value": value}))
+    await center.wait_for()
+
+    assert api.calls == [("send", "1"), ("send", "2")]
+    traces = automation.traces
+    assert traces.outcomes == {"condition_failed": 1, "template_error": 2}
+    assert len(traces.traces) == 2
+    trace = traces.traces[-1].as_dict()
+    assert trace["outcome"] == "template_error"
+    assert trace["condition_time"] <= trace["wait_time"] <= trace["run_time"]
+    assert [action["outcome"] for action in trace["actions"]] == [
+        "done",
+        "template_error",
+    ]
+    assert trace["actions"][0]["call_time"] is not None
+    assert trace["actions"][1]["call_time"] is None
+    stats = traces.stats()
+    assert stats["condition"]["count"] == 3
+    assert stats["run"]["count"] == 3
+    assert stats["actions"]["command.send"]["render"]["count"] == 4
+    assert stats["actions"]["command.send"]["call"]["count"] == 2
+
+    path = tmp_path / "traces.json"
+    await center.actions.call("automations", "traces", path=path.as_posix())
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["test_trace"]["stats"]["outcomes"] == traces.outcomes
+    assert len(data["test_trace"]["traces"]) == 2
+
+    with caplog.at_level(logging.INFO):
+        await center.bus.notify(CamAcqStopEvent({"exit_code": 0}))
+    assert "Automation test_trace traces: {'stats':" in caplog.text
+    assert "'traces': [{" in caplog.text
+
+
+async def test_dump_traces_path(
+    center: Center, api: MockApi, caplog: pytest.LogCaptureFixture, tmp_path: Path
+) -> None:
+    """Test that traces are written to the trace path when camacq stops."""
+    path = tmp_path / "traces.json"
+    config = f"""
+        automations:
+          - name: first
+            trace: true
+            trace_path: {path.as_posix()}
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: first
+          - name: second
+            trace: true
+            trace_path: {path.as_posix()}
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: second
+    """
+    await plugins.setup_module(center, YAML(typ="safe").load(config))
+    await center.bus.notify(api_mod.CommandEvent())
+    await center.wait_for()
+
+    with caplog.at_level(logging.INFO):
+        await center.bus.notify(CamAcqStopEvent({"exit_code": 0}))
+    await center.wait_for()
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data.keys() == {"first", "second"}
+    assert data["first"]["stats"]["outcomes"] == {"done": 1}
+    assert len(data["second"]["traces"]) == 1
+    assert "traces:" not in caplog.text
+
+
+@pytest.mark.parametrize(("cache", "lookups"), [(False, 4), (True, 1)])
+async def test_render_cache(
+    center: Center, api: MockApi, sample: MockSample, cache: bool, lookups: int
+) -> None:
+    """Test that automations triggered by the same event share a cache."""
+    config = """
+        automations:
+          - name: first
+            trigger:
+              - type: event
+                id: command_event
+            condition:
+              condition: "{{ matched_samples(samples.test, 'plate') }}"
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+          - name: second
+            trigger:
+              - type: event
+                id: command_event
+            condition:
+              condition: "{{ matched_samples(samples.test, 'plate') }}"
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+    """
+    conf = YAML(typ="safe").load(config)
+    for automation in conf["automations"]:
+        automation["cache"] = cache
+    await sample.set_sample("plate", plate_name="00")
+
+    with patch(
+        "camacq.helper.template.get_matched_samples",
+        wraps=sample_mod.get_matched_samples,
+    ) as matched_mock:
+        await plugins.setup_module(center, conf)
+        await center.bus.notify(api_mod.CommandEvent())
+        await center.wait_for()
+
+    assert api.calls == [("send", "1"), ("send", "1")]
+    assert matched_mock.call_count == lookups
+
+
+async def test_automation_graph(
+    center: Center, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test the graph of how automations trigger each other."""
+    config = """
+        automations:
+          - name: set_well
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: sample
+                id: set_sample
+                data:
+                  name: well
+                  plate_name: "00"
+                  well_x: 0
+                  well_y: 0
+          - name: set_field
+            trigger:
+              - type: event
+                id: well_event
+            action:
+              - type: sample
+                id: set_sample
+                data:
+                  name: field
+                  plate_name: "{{ trigger.event.plate_name }}"
+                  well_x: "{{ trigger.event.well_x }}"
+                  well_y: "{{ trigger.event.well_y }}"
+                  field_x: 0
+                  field_y: 0
+          - name: send_field
+            trigger:
+              - type: event
+                id: field_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ trigger.event.field_x }}"
+          - name: typo
+            trigger:
+              - type: event
+                id: wel_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: typo
+    """
+    await leica_sample_mod.setup_module(center, {})
+    await plugins.setup_module(center, YAML(typ="safe").load(config))
+
+    with caplog.at_level(logging.INFO):
+        await center.bus.notify(CamAcqStartEvent())
+    graph = center.data["automation_graph"]
+
+    assert graph.edges == {
+        "set_well": {"set_field"},
+        "set_field": {"set_field", "send_field"},
+        "send_field": set(),
+        "typo": set(),
+    }
+    assert graph.cycles == [["set_field"]]
+    assert graph.unreachable == {"typo"}
+    assert graph.reach("command_event") == {"set_well", "set_field", "send_field"}
+    assert graph.reach("field_event") == {"send_field"}
+    assert graph.reach("image_event") == frozenset()
+    assert "cycle: ['set_field']" in caplog.text
+    assert "Automation typo is only triggered by event types" in caplog.text
+
+
+async def test_render_cache_delay(
+    center: Center, api: MockApi, sample: MockSample
+) -> None:
+    """Test that the actions after a delay don't use the render cache."""
+    config = """
+        automations:
+          - name: test_delay
+            cache: true
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+              - type: automations
+                id: delay
+                data:
+                  seconds: 0.01
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+    """
+    await sample.set_sample("plate", plate_name="00")
+
+    with patch(
+        "camacq.helper.template.get_matched_samples",
+        wraps=sample_mod.get_matched_samples,
+    ) as matched_mock:
+        await plugins.setup_module(center, YAML(typ="safe").load(config))
+        await center.bus.notify(api_mod.CommandEvent())
+        await asyncio.sleep(0.1)
+        await center.wait_for()
+
+    assert api.calls == [("send", "1"), ("send", "1")]
+    assert matched_mock.call_count == 2
+
+
+async def test_render_cache_nested(
+    center: Center, api: MockApi, sample: MockSample
+) -> None:
+    """Test that automations without cache don't use a cache of another."""
+    config = """
+        automations:
+          - name: cached
+            cache: true
+            trigger:
+              - type: event
+                id: command_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+              - type: sample
+                id: set_sample
+                data:
+                  name: plate
+                  plate_name: "01"
+          - name: not_cached
+            trigger:
+              - type: event
+                id: test_sample_event
+            action:
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+              - type: command
+                id: send
+                data:
+                  command: "{{ matched_samples(samples.test, 'plate') | length }}"
+    """
+    await sample.set_sample("plate", plate_name="00")
+
+    with patch(
+        "camacq.helper.template.get_matched_samples",
+        wraps=sample_mod.get_matched_samples,
+    ) as matched_mock:
+        await plugins.setup_module(center, YAML(typ="safe").load(config))
+        await center.bus.notify(api_mod.CommandEvent())
+        await center.wait_for()
+
+    assert api.calls == [("send", "1"), ("send", "2"), ("send", "2")]
+    assert matched_mock.call_count == 3
+
+
+def test_parallel_delay_invalid() -> None:
+    """Test that a delay action can't run in a parallel action."""
+    config = """
+        - name: test_parallel
+          trigger:
+            - type: event
+              id: command_event
+          action:
+            - type: automations
+              id: parallel
+              data:
+                actions:
+                  - type: automations
+                    id: delay
+                    data:
+                      seconds: 1
+                  - type: command
+                    id: stop_imaging
+    """
+    with pytest.raises(vol.Invalid, match="delay action can't run"):
+        automations_mod.CONFIG_SCHEMA(YAML(typ="safe").load(config))
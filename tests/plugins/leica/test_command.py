@@ -1,5 +1,7 @@
 """Tests for command."""
 
+from leicacam.cam import tuples_as_bytes
+
 from camacq.plugins.leica import command
 
 
@@ -93,3 +95,42 @@ def test_cam_com() -> None:
         ("dxpos", "45"),
         ("dypos", "68"),
     ]
+
+
+def test_field_grid() -> None:
+    """Test field grid coordinates."""
+    grid = command.field_grid(2, 3)
+    assert grid.tolist() == [[0, 0], [0, 1], [0, 2], [1, 0], [1, 1], [1, 2]]
+
+
+def test_camlist_com() -> None:
+    """Test add fields of wells to the cam list."""
+    cmds = command.camlist_com("job12", [[0, 2], [1, 2]], [[1, 3]], [45, 68])
+    assert cmds == [
+        b"/cmd:add /tar:camlist /exp:job12 /ext:af /slide:0 /wellx:1 /welly:3 "
+        b"/fieldx:2 /fieldy:4 /dxpos:45 /dypos:68",
+        b"/cmd:add /tar:camlist /exp:job12 /ext:af /slide:0 /wellx:2 /welly:3 "
+        b"/fieldx:2 /fieldy:4 /dxpos:45 /dypos:68",
+    ]
+    # The encoded command is the same as for the single field command.
+    single = command.cam_com("job12", 0, 2, 1, 3, 45, 68)
+    assert cmds[0] == tuples_as_bytes(single)
+
+
+def test_camlist_com_well_offsets() -> None:
+    """Test add fields to the cam list with offsets per well."""
+    cmds = command.camlist_com(
+        "job12", [[0, 0], [0, 1]], [[0, 0]], [[[1.5, 0]], [[0, -2.5]]]
+    )
+    assert cmds == [
+        b"/cmd:add /tar:camlist /exp:job12 /ext:af /slide:0 /wellx:1 /welly:1 "
+        b"/fieldx:1 /fieldy:1 /dxpos:1.5 /dypos:0",
+        b"/cmd:add /tar:camlist /exp:job12 /ext:af /slide:0 /wellx:1 /welly:2 "
+        b"/fieldx:1 /fieldy:1 /dxpos:0 /dypos:-2.5",
+    ]
+
+
+def test_camlist_com_empty() -> None:
+    """Test that no wells or no fields give no commands."""
+    assert command.camlist_com("job12", [], [[0, 0]]) == []
+    assert command.camlist_com("job12", [[0, 0]], [], [1, 2]) == []
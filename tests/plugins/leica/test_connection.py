@@ -0,0 +1,88 @@
+"""Test the connection to the CAM server."""
+
+import asyncio
+from collections import OrderedDict
+from unittest.mock import AsyncMock, Mock
+
+from leicacam.async_cam import AsyncCAM
+import pytest
+
+from camacq.control import Center
+from camacq.plugins.leica.connection import (
+    LEICA_CONNECTION_EVENT,
+    CamConnection,
+    LeicaConnectionEvent,
+)
+
+
+@pytest.fixture(name="cam")
+def cam_fixture() -> Mock:
+    """Return a mock CAM client."""
+    cam = Mock(AsyncCAM("localhost", 8895))
+    cam.host = "localhost"
+    cam.port = 8895
+    return cam
+
+
+async def test_queue_and_flush(center: Center, cam: Mock) -> None:
+    """Test that commands are queued while disconnected and sent in order."""
+    connection = CamConnection(center, cam, queue_size=2, reconnect_delay=0.001)
+    mock_handler = AsyncMock()
+    center.bus.register(LEICA_CONNECTION_EVENT, mock_handler)
+
+    assert await connection.send([("cmd", "first")])
+    assert await connection.send([("cmd", "second")])
+    # The queue is full.
+    assert not await connection.send([("cmd", "third")])
+    assert connection.queued == 2
+    assert cam.send.call_count == 0
+
+    await connection.connect()
+
+    assert connection.connected
+    assert connection.queued == 0
+    assert [args[0] for _, args, _ in cam.send.mock_calls] == [
+        [("cmd", "first")],
+        [("cmd", "second")],
+    ]
+    assert mock_handler.call_count == 1
+    event = mock_handler.mock_calls[0][1][1]
+    assert isinstance(event, LeicaConnectionEvent)
+    assert event.connected
+
+
+async def test_reconnect(center: Center, cam: Mock) -> None:
+    """Test reconnect with backoff after the connection is lost."""
+    connection = CamConnection(
+        center, cam, reconnect_delay=0.001, max_reconnect_delay=0.002
+    )
+    states: list[bool] = []
+
+    async def handle_state(center: Center, event: LeicaConnectionEvent) -> None:
+        """Record connection state."""
+        states.append(event.connected)
+
+    center.bus.register(LEICA_CONNECTION_EVENT, handle_state)  # type: ignore[arg-type]
+    await connection.connect()
+
+    # Lose the connection and fail the first reconnect attempt.
+    cam.connect.side_effect = [OSError("refused"), None]
+    cam.receive.return_value = [OrderedDict([("cmd", "deletelist")])]
+    cam.send.side_effect = OSError("reset")
+
+    assert await connection.send([("cmd", "queued")])
+    assert states == [True, False]
+    assert connection.queued == 1
+
+    cam.send.side_effect = None
+    async with asyncio.timeout(1):
+        reply = await connection.receive()
+
+    assert reply == [OrderedDict([("cmd", "deletelist")])]
+    assert connection.connected
+    assert connection.queued == 0
+    assert cam.connect.call_count == 3
+    assert states == [True, False, True]
+
+    connection.close()
+    assert not connection.connected
@@ -4,17 +4,20 @@ import asyncio
 from collections import OrderedDict
 from collections.abc import AsyncGenerator, Generator
 from pathlib import Path
+import time
 from typing import Any
 from unittest.mock import AsyncMock, Mock, patch
 
 from leicacam.async_cam import AsyncCAM
 import pytest
+import voluptuous as vol
 
 from camacq import plugins
 from camacq.control import Center
 from camacq.plugins import api as base_api
 from camacq.plugins.leica import (
     LEICA_COMMAND_EVENT,
+    LEICA_SCHEMA,
     LEICA_START_COMMAND_EVENT,
     LEICA_STOP_COMMAND_EVENT,
     LeicaApi,
@@ -23,6 +26,7 @@ from camacq.plugins.leica import (
     LeicaStartCommandEvent,
     LeicaStopCommandEvent,
 )
+from camacq.plugins.leica import setup_module as leica_setup_module
 
 
 class MockLeicaApi(LeicaApi):
@@ -208,6 +212,8 @@ async def test_start_listen(center: Center, caplog: pytest.LogCaptureFixture) ->
 
     with patch("camacq.plugins.leica.AsyncCAM", autospec=True) as mock_cam_class:
         mock_cam = mock_cam_class.return_value
+        mock_cam.host = "localhost"
+        mock_cam.port = 8895
         mock_cam.receive.side_effect = mock_receive
         await plugins.setup_module(center, config)
         await center.wait_for()
@@ -215,3 +221,198 @@ async def test_start_listen(center: Center, caplog: pytest.LogCaptureFixture) ->
 
     mock_cam.receive.assert_awaited()
     assert mock_handler.call_count == 1
+
+
+async def test_setup_multiple(center: Center) -> None:
+    """Test setup of multiple leica apis and routing by api name."""
+    config: dict[str, Any] = {
+        "leica": [
+            {"name": "scope_1", "port": 8895},
+            {"name": "scope_2", "port": 8896},
+        ]
+    }
+    with patch("camacq.plugins.leica.AsyncCAM", autospec=True) as mock_cam_class:
+        mock_cams = [Mock(AsyncCAM()), Mock(AsyncCAM())]
+        for mock_cam, port in zip(mock_cams, (8895, 8896), strict=True):
+            mock_cam.host = "localhost"
+            mock_cam.port = port
+            mock_cam.receive.side_effect = asyncio.CancelledError
+        mock_cam_class.side_effect = mock_cams
+        await plugins.setup_module(center, config)
+
+    apis = center.data["api"]
+    assert set(apis) == {"scope_1", "scope_2"}
+    assert apis["scope_1"].client.port == 8895
+    assert apis["scope_2"].client.port == 8896
+
+    for mock_cam, api in zip(mock_cams, apis.values(), strict=True):
+
+        async def mock_send(commands: Any, api: LeicaApi = api) -> None:
+            """Mock client send."""
+            await api.receive([OrderedDict(commands)])
+
+        mock_cam.send.side_effect = mock_send
+
+    await center.actions.command.send(api_name="scope_2", command="/cmd:deletelist")
+
+    assert mock_cams[0].send.call_count == 0
+    assert mock_cams[1].send.call_count == 1
+
+
+async def test_setup_duplicate_names(
+    center: Center, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test setup of multiple leica apis with the same name."""
+    config: dict[str, Any] = {"leica": [{"port": 8895}, {"port": 8896}]}
+    with patch("camacq.plugins.leica.AsyncCAM", autospec=True) as mock_cam_class:
+        await plugins.setup_module(center, config)
+
+    assert mock_cam_class.call_count == 0
+    assert "Leica instances must have unique names" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "conf",
+    [
+        {"reconnect_delay": 0},
+        {"reconnect_delay": 10, "max_reconnect_delay": 5},
+    ],
+)
+async def test_invalid_reconnect_delay(conf: dict[str, Any]) -> None:
+    """Test that reconnect delays must be positive and in order."""
+    with pytest.raises(vol.Invalid):
+        LEICA_SCHEMA(conf)
+
+
+async def test_reply_from_other_api(api: MockLeicaApi) -> None:
+    """Test that a reply from another api does not complete a send."""
+    cmd_tuples = [("cmd", "deletelist")]
+
+    cmd_sent = await api.send(cmd_tuples, block=False)
+    assert isinstance(cmd_sent, asyncio.Future)
+
+    api.center.bus.register(LEICA_COMMAND_EVENT, AsyncMock())
+    await api.center.bus.notify(
+        LeicaCommandEvent({**OrderedDict(cmd_tuples), "api_name": "other"})
+    )
+    assert not cmd_sent.done()
+
+    await api.receive([OrderedDict(cmd_tuples)])
+    assert cmd_sent.done()
+    assert cmd_sent.result()
+
+
+async def test_receive_concurrent(api: MockLeicaApi, get_imgs: Mock) -> None:
+    """Test receive with concurrent image events for a field."""
+    rel_path = (
+        "slide--S00/chamber--U00--V00/field--X01--Y01/"
+        "image--L0000--S00--U00--V00--J15--E04--O01--X01--Y01--T0000--Z00--C00.ome.tif"
+    )
+    api.config = {"imaging_dir": "/root", "image_concurrency": 3}
+    api._image_semaphore = asyncio.Semaphore(3)
+    image_paths = [f"/root/image_{idx}.ome.tif" for idx in range(6)]
+    get_imgs.return_value = image_paths
+    running = 0
+    max_running = 0
+    paths: list[str] = []
+
+    async def handle_image(center: Center, event: LeicaImageEvent) -> None:
+        """Handle image event."""
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        paths.append(event.path)
+        running -= 1
+
+    api.center.bus.register("image_event", handle_image)  # type: ignore[arg-type]
+
+    await api.receive([OrderedDict([("relpath", rel_path)])])
+
+    assert sorted(paths) == image_paths
+    assert max_running == 3
+    assert not api._field_batches
+
+
+async def test_receive_concurrent_order(
+    center: Center, api: MockLeicaApi, get_imgs: Mock
+) -> None:
+    """Test that concurrent replies for a field keep the reply order."""
+    rel_path = (
+        "slide--S00/chamber--U00--V00/field--X01--Y01/"
+        "image--L0000--S00--U00--V00--J15--E{:02d}--O01--X01--Y01--T0000--Z00--C00"
+        ".ome.tif"
+    )
+    api.config = {"imaging_dir": "/root", "image_concurrency": 3}
+    api._image_semaphore = asyncio.Semaphore(3)
+
+    def slow_first_job(path: str, search: str) -> list[str]:
+        """Return the images of a job, slower for the first job."""
+        if search == "--E04":
+            time.sleep(0.05)
+        return [f"/root/image{search}.ome.tif"]
+
+    get_imgs.side_effect = slow_first_job
+    paths: list[str] = []
+
+    async def handle_image(center: Center, event: LeicaImageEvent) -> None:
+        """Handle image event."""
+        paths.append(event.path)
+
+    api.center.bus.register("image_event", handle_image)  # type: ignore[arg-type]
+
+    for job_id in (4, 5):
+        center.create_task(
+            api.receive([OrderedDict([("relpath", rel_path.format(job_id))])])
+        )
+    await center.wait_for()
+
+    assert paths == ["/root/image--E04.ome.tif", "/root/image--E05.ome.tif"]
+    assert not api._field_batches
+
+
+async def test_receive_duplicates(api: MockLeicaApi, get_imgs: Mock) -> None:
+    """Test that interleaved duplicate image replies are suppressed."""
+    rel_path = (
+        "slide--S00/chamber--U00--V00/field--X01--Y01/"
+        "image--L0000--S00--U00--V00--J15--E04--O01--X01--Y01--T0000--Z00--C{:02d}"
+        ".ome.tif"
+    )
+    api.config = {"imaging_dir": "/root"}
+    get_imgs.return_value = ["/root/image.ome.tif"]
+    mock_handler = AsyncMock()
+    api.center.bus.register("image_event", mock_handler)
+    replies: list[dict[str, Any]] = [
+        OrderedDict([("relpath", rel_path.format(channel_id))])
+        for channel_id in (0, 1, 0, 1, 2)
+    ]
+
+    await api.receive(replies)
+
+    assert get_imgs.call_count == 3
+    assert mock_handler.call_count == 3
+    assert api.duplicate_image_replies == 2
+
+
+async def test_send_camlist(api: MockLeicaApi) -> None:
+    """Test the send camlist action."""
+
+    async def mock_send(command: bytes) -> None:
+        """Mock client send."""
+        await api.receive([OrderedDict([("cmd", "add")])])
+
+    api.client.send.side_effect = mock_send
+    base_api.register_api(api.center, api)
+    await leica_setup_module(api.center, {"leica": []})
+
+    await api.center.actions.leica.send_camlist(
+        exp="p10xexp", wells=[["0", "1"]], fields=[[0, 0], [1, 0]]
+    )
+
+    assert api.client.send.call_count == 2
+    assert [args[0] for _, args, _ in api.client.send.mock_calls] == [
+        b"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:1 /welly:2 "
+        b"/fieldx:1 /fieldy:1 /dxpos:0 /dypos:0",
+        b"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:1 /welly:2 "
+        b"/fieldx:2 /fieldy:1 /dxpos:0 /dypos:0",
+    ]
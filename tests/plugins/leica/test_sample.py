@@ -0,0 +1,43 @@
+"""Test the leica sample."""
+
+import asyncio
+
+from camacq.control import Center
+from camacq.plugins.api import ImageEvent
+from camacq.plugins.leica import sample as leica_sample_mod
+from camacq.plugins.leica.sample import FIELD_EVENT
+
+
+async def test_concurrent_image_events(center: Center) -> None:
+    """Test that concurrent images of a field create the field only once."""
+    await leica_sample_mod.setup_module(center, {})
+    sample = center.samples.leica
+    field_events: list[str] = []
+
+    async def handle_field(center: Center, event: leica_sample_mod.FieldEvent) -> None:
+        """Handle field event."""
+        field_events.append(event.container_name)
+
+    center.bus.register(FIELD_EVENT, handle_field)  # type: ignore[arg-type]
+    events = [
+        ImageEvent(
+            {
+                "path": f"test_path_{channel_id}",
+                "plate_name": "00",
+                "well_x": 0,
+                "well_y": 0,
+                "field_x": 1,
+                "field_y": 1,
+                "z_slice_id": 0,
+                "channel_id": channel_id,
+            }
+        )
+        for channel_id in range(4)
+    ]
+
+    await asyncio.gather(*(center.bus.notify(event) for event in events))
+    await center.wait_for()
+
+    assert len(sample.images) == 4
+    assert field_events == ["field"]
+    assert not sample._locks
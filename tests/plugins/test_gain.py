@@ -0,0 +1,99 @@
+"""Test the gain plugin."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+import voluptuous as vol
+
+from camacq import image
+from camacq.control import CamAcqStopEvent, Center
+from camacq.plugins import gain as gain_mod
+from camacq.plugins import sample as sample_mod
+from camacq.plugins.api import ImageEvent
+from camacq.plugins.leica import sample as leica_sample_mod
+
+GAINS = {0: 500, 1: 700, 2: 900, 3: 1100, 4: 1300}
+
+
+async def test_calc_gain(center: Center, tmp_path: Path) -> None:
+    """Test calculate gain action."""
+    config = gain_mod.CONFIG_SCHEMA(
+        {
+            "workers": 1,
+            "channels": [
+                {"channel_id": 1, "channel_name": "green", "gains": GAINS},
+                {
+                    "channel_id": 3,
+                    "channel_name": "red",
+                    "gains": GAINS,
+                    "max_gain": 900,
+                },
+            ],
+        }
+    )
+    await sample_mod.setup_module(center, {})
+    await leica_sample_mod.setup_module(center, {})
+    await gain_mod.setup_module(center, {"gain": config})
+    rng = np.random.default_rng(0)
+    base = rng.random((64, 64))
+    for channel_id, gain in GAINS.items():
+        path = tmp_path / f"image--U00--V00--E01--X00--Y00--Z00--C{channel_id:02}.tif"
+        data = np.clip(base * 0.05 * gain**2, 0, 65535).astype(np.uint16)
+        image.save_image(path.as_posix(), data)
+        event = ImageEvent(
+            {
+                "path": path.as_posix(),
+                "plate_name": "00",
+                "well_x": 0,
+                "well_y": 0,
+                "field_x": 0,
+                "field_y": 0,
+                "job_id": 1,
+                "z_slice_id": 0,
+                "channel_id": channel_id,
+            }
+        )
+        await center.bus.notify(event)
+    await center.wait_for()
+
+    await center.actions.call(
+        "gain", "calc_gain", sample_name="leica", plate_name="00", well_x=0, well_y=0
+    )
+
+    green = center.samples.leica.get_sample(
+        "channel", plate_name="00", well_x=0, well_y=0, channel_id=1
+    )
+    red = center.samples.leica.get_sample(
+        "channel", plate_name="00", well_x=0, well_y=0, channel_id=3
+    )
+    assert green is not None
+    assert red is not None
+    assert green.values["channel_name"] == "green"
+    assert green.values["gain"] == pytest.approx(np.sqrt(0.8 * 65536 / 0.05), rel=0.02)
+    assert red.values["channel_name"] == "red"
+    assert red.values["gain"] == 900
+
+    # Shut down the process pool.
+    await center.bus.notify(CamAcqStopEvent({"exit_code": 0}))
+    await center.wait_for()
+
+
+def test_gains_must_be_positive() -> None:
+    """Test that the config only accepts positive gains."""
+    channel = {"channel_id": 1, "channel_name": "green", "gains": {0: 0, 1: 700}}
+    with pytest.raises(vol.Invalid):
+        gain_mod.CONFIG_SCHEMA({"channels": [channel]})
+
+
+def test_fit_gain_dim_and_saturated() -> None:
+    """Test the fallback gain when steps are either too dim or saturated."""
+    dim = np.zeros(256, dtype=np.int64)
+    dim[2] = 1000
+    saturated = np.zeros(256, dtype=np.int64)
+    saturated[255] = 1000
+
+    assert image.fit_gain([500, 800], [dim, saturated]) == 500.0
+    assert image.fit_gain([500, 650, 800], [dim, dim, saturated]) == 650.0
+    assert image.fit_gain([500, 800], [saturated, saturated]) == 500.0
+    assert image.fit_gain([500, 800], [dim, dim]) == 800.0
@@ -0,0 +1,96 @@
+"""Test the projection plugin."""
+
+from pathlib import Path
+import shutil
+
+import numpy as np
+
+from camacq import image
+from camacq.control import Center
+from camacq.image_store import ArrayStore, FieldKey
+from camacq.plugins import projection as projection_mod
+from camacq.plugins.api import ImageEvent
+from camacq.plugins.leica import sample as leica_sample_mod
+from camacq.plugins.sample import Image
+from tests.common import FIELD_PATH
+
+
+async def test_make_projection(center: Center, tmp_path: Path) -> None:
+    """Test make projection action."""
+    await leica_sample_mod.setup_module(center, {})
+    await projection_mod.setup_module(center, {})
+    paths = []
+    for z_slice_id in (2, 0, 1):
+        name = f"image--U01--V00--E02--X00--Y00--Z{z_slice_id:02}--C00.ome.tif"
+        path = tmp_path / name
+        shutil.copy(FIELD_PATH / name, path)
+        paths.append(path)
+        event = ImageEvent(
+            {
+                "path": path.as_posix(),
+                "plate_name": "00",
+                "well_x": 1,
+                "well_y": 0,
+                "field_x": 0,
+                "field_y": 0,
+                "z_slice_id": z_slice_id,
+                "channel_id": 0,
+            }
+        )
+        await center.bus.notify(event)
+    await center.wait_for()
+
+    await center.actions.call(
+        "projection",
+        "make_projection",
+        sample_name="leica",
+        modes=["max", "argmax"],
+        well_x="1",
+        field_x=0,
+    )
+
+    stack = np.array([image.read_image(path.as_posix()) for path in sorted(paths)])
+    max_proj = image.read_image((tmp_path / f"max--{paths[0].name}").as_posix())
+    argmax_proj = image.read_image((tmp_path / f"argmax--{paths[0].name}").as_posix())
+    assert max_proj is not None
+    assert argmax_proj is not None
+    assert np.array_equal(max_proj, stack.max(axis=0))
+    assert np.array_equal(argmax_proj, stack.argmax(axis=0))
+
+    store_dir = tmp_path / "store"
+    await center.actions.call(
+        "projection",
+        "make_projection",
+        sample_name="leica",
+        modes=["max", "mean"],
+        dtypes={"mean": "float32"},
+        store_dir=store_dir.as_posix(),
+    )
+
+    store = ArrayStore(store_dir)
+    field = FieldKey("00", 1, 0, 0, 0)
+    assert store.fields() == {field: ["max", "mean"]}
+    assert np.array_equal(store.planes(field, "max")[0, 0], stack.max(axis=0))
+    assert store.read_stack(field, "mean").dtype == np.float32
+
+
+def test_store_projections_missing_field(tmp_path: Path) -> None:
+    """Test that images without field coordinates don't stop storing."""
+    store = ArrayStore(tmp_path)
+    data = np.zeros((4, 4), dtype=np.uint16)
+    field_image = Image(
+        "field.tif", plate_name="00", well_x=1, well_y=0, field_x=0, field_y=0
+    )
+    projs = {
+        0: {"max": image.ImageData(path="missing.tif", data=data)},
+        1: {"max": image.ImageData(path="field.tif", data=data + 1)},
+    }
+    images = {"missing.tif": Image("missing.tif"), "field.tif": field_image}
+
+    projection_mod.store_projections(store, projs, images)
+
+    field = FieldKey("00", 1, 0, 0, 0)
+    assert store.fields() == {field: ["max"]}
+    planes = store.planes(field, "max")
+    assert list(planes) == [(1, 0)]
+    assert np.array_equal(planes[1, 0], data + 1)
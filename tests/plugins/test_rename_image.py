@@ -0,0 +1,23 @@
+"""Test the rename image plugin."""
+
+from pathlib import Path
+import shutil
+
+from camacq import image
+from camacq.plugins.rename_image import rename_image
+from tests.common import IMAGE_PATH
+
+
+def test_rename_image_invalidates_cache(tmp_path: Path) -> None:
+    """Test that renaming an image removes it from the image cache."""
+    old_path = tmp_path / "old.ome.tif"
+    new_path = tmp_path / "new.ome.tif"
+    shutil.copy(IMAGE_PATH, old_path)
+    shutil.copy(IMAGE_PATH, new_path)
+    image.read_image(old_path.as_posix())
+    image.read_image(new_path.as_posix())
+    cached = len(image.IMAGE_CACHE)
+
+    assert rename_image(old_path, new_path)
+    assert len(image.IMAGE_CACHE) == cached - 2
+    assert not rename_image(old_path, new_path)
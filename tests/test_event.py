@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import logging
+
+import pytest
+
 from camacq import event as event_mod
 from camacq.control import Center
 
@@ -34,3 +38,31 @@ async def test_event_bus(center: Center) -> None:
     await center.wait_for()
 
     assert center.data.get("test") == 2
+
+
+async def test_skip_event_without_handlers(
+    center: Center, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test that events that no handler listens to are skipped."""
+
+    class TestEvent(event_mod.Event):
+        """Represent a test event."""
+
+        event_type = "test_event"
+
+    event = TestEvent({"test": 2})
+    assert event_mod.get_event_types(TestEvent) == ("test_event", event_mod.BASE_EVENT)
+
+    with caplog.at_level(logging.DEBUG, logger="camacq.event"):
+        await center.bus.notify(event)
+    assert "Notifying event" not in caplog.text
+
+    async def handler(center: Center, event: event_mod.Event) -> None:
+        """Handle event."""
+        center.data["test"] = event.data["test"]
+
+    center.bus.register(event_mod.BASE_EVENT, handler)
+    with caplog.at_level(logging.DEBUG, logger="camacq.event"):
+        await center.bus.notify(event)
+    assert "Notifying event" in caplog.text
+    assert center.data["test"] == 2
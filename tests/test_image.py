@@ -1,14 +1,28 @@
 """Provide tests for the image module."""
 
+import asyncio
 from collections.abc import Generator
 from pathlib import Path
 import tempfile
 
 import numpy as np
 import pytest
+import tifffile
+import voluptuous as vol
 
 from camacq import image
-from tests.common import IMAGE_PATH
+from camacq.control import Center
+from camacq.plugins import sample as sample_mod
+from tests.common import FIELD_PATH, IMAGE_PATH
+
+
+@pytest.fixture(autouse=True)
+def clear_cache_fixture() -> Generator[None, None, None]:
+    """Clear the image cache before and after each test."""
+    image.IMAGE_CACHE.clear()
+    yield
+    image.IMAGE_CACHE.clear()
+    image.IMAGE_CACHE.resize(image.DEFAULT_CACHE_BYTES)
 
 
 @pytest.fixture(name="save_path")
@@ -47,3 +61,334 @@ def test_image_data(save_path: str) -> None:
 
     assert np.array_equal(orig_data, img.data)
     assert orig_metadata == img.metadata
+
+
+def test_make_proj() -> None:
+    """Test make max projections."""
+    images = {
+        (
+            FIELD_PATH / f"image--U01--V00--E02--X00--Y00--Z{z:02}--C{c:02}.ome.tif"
+        ).as_posix(): c
+        for c in (0, 1)
+        for z in range(3)
+    }
+    projs = image.make_proj(images)
+
+    assert list(projs) == [0, 1]
+    for channel, proj in projs.items():
+        paths = [path for path, chan in images.items() if chan == channel]
+        stack = [image.ImageData(path).data for path in paths]
+        last_image = image.ImageData(paths[-1])
+        assert np.array_equal(proj.data, np.max(stack, axis=0))
+        assert proj.data.dtype == last_image.data.dtype
+        assert proj.path == paths[-1]
+        assert proj.metadata == last_image.metadata
+
+
+def test_make_projections() -> None:
+    """Test make projections of several modes in one pass."""
+    paths = [
+        (
+            FIELD_PATH / f"image--U01--V00--E02--X00--Y00--Z{z:02}--C00.ome.tif"
+        ).as_posix()
+        for z in range(3)
+    ]
+    stack = np.array([image.ImageData(path).data for path in paths])
+    projs = image.make_projections(
+        dict.fromkeys(paths, 0),
+        image.PROJECTION_MODES,
+        {"mean": np.float32, "sum": np.uint32},
+    )[0]
+
+    assert list(projs) == list(image.PROJECTION_MODES)
+    assert np.array_equal(projs["max"].data, stack.max(axis=0))
+    assert np.array_equal(projs["min"].data, stack.min(axis=0))
+    assert np.array_equal(projs["argmax"].data, stack.argmax(axis=0))
+    assert projs["sum"].data.dtype == np.uint32
+    assert np.array_equal(projs["sum"].data, stack.sum(axis=0))
+    assert projs["mean"].data.dtype == np.float32
+    assert np.allclose(projs["mean"].data, stack.mean(axis=0))
+    assert projs["mean"].path == paths[-1]
+
+
+def test_projection_invalid_mode() -> None:
+    """Test projection with an invalid mode."""
+    with pytest.raises(ValueError, match="Invalid projection mode"):
+        image.Projection("median")
+
+
+def test_read_image_memmap(save_path: str) -> None:
+    """Test read image with memory map."""
+    mapped = image.read_image(IMAGE_PATH.as_posix(), memmap=True)
+    data = image.read_image(IMAGE_PATH.as_posix())
+
+    assert data is not None
+    assert not isinstance(data, np.memmap)
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(data, mapped)
+    assert not image.ImageData(IMAGE_PATH.as_posix(), memmap=True).data.flags.writeable
+    image.IMAGE_CACHE.clear()
+
+    # Compressed image data can't be memory mapped.
+    tifffile.imwrite(save_path, data, compression="zlib")
+    img = image.ImageData(save_path, memmap=True)
+
+    assert not isinstance(img.data, np.memmap)
+    assert np.array_equal(data, img.data)
+
+
+def test_image_cache(save_path: str) -> None:
+    """Test the image cache."""
+    cache = image.IMAGE_CACHE
+    data = image.read_image(IMAGE_PATH.as_posix())
+    img = image.ImageData(IMAGE_PATH.as_posix())
+
+    assert data is not None
+    assert img.data is not data
+    assert np.array_equal(img.data, data)
+    assert data.flags.writeable
+    assert img.metadata
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.nbytes == data.nbytes
+
+    # A changed file is read again.
+    image.save_image(save_path, data)
+    assert image.ImageData(save_path).data is not data
+    image.save_image(save_path, data[:16])
+    saved_data = image.read_image(save_path)
+    assert saved_data is not None
+    assert saved_data.shape == (16, 512)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert len(cache) == 2
+
+    # Evict the least recently used image.
+    cache.resize(data.nbytes)
+    assert len(cache) == 1
+    assert image.read_image(IMAGE_PATH.as_posix()) is not data
+    assert cache.misses == 4
+
+    cache.invalidate(IMAGE_PATH)
+    assert not len(cache)
+    assert cache.nbytes == 0
+
+    # Readers get writable copies and don't change the cached data.
+    data = image.read_image(IMAGE_PATH.as_posix())
+    assert data is not None
+    data[0, 0] += 1
+    assert not np.array_equal(image.ImageData(IMAGE_PATH.as_posix()).data, data)
+    # Readers that accept read only data share the cached data.
+    shared = image.read_image(IMAGE_PATH.as_posix(), memmap=True)
+    assert shared is not None
+    assert not shared.flags.writeable
+    assert image.read_image(IMAGE_PATH.as_posix(), memmap=True) is shared
+
+    # The data of a miss is returned as is and isn't shared with the cache.
+    cache.invalidate(IMAGE_PATH)
+    data = image.read_image(IMAGE_PATH.as_posix())
+    assert data is not None
+    assert data.flags.writeable
+    cached = image.read_image(IMAGE_PATH.as_posix(), memmap=True)
+    assert cached is not None
+    assert cached is not data
+    assert not cached.flags.writeable
+    # Images over the cache budget aren't cached.
+    cache.clear()
+    cache.resize(data.nbytes - 1)
+    data = image.read_image(IMAGE_PATH.as_posix())
+    assert data is not None
+    assert data.flags.writeable
+    assert not len(cache)
+
+
+async def test_image_cache_config(center: Center) -> None:
+    """Test the byte budget of the image cache from the sample config."""
+    config = {"sample": sample_mod.CONFIG_SCHEMA({"image_cache_bytes": 1024})}
+    await sample_mod.setup_module(center, config)
+
+    assert image.IMAGE_CACHE.max_bytes == 1024
+    with pytest.raises(vol.Invalid):
+        sample_mod.CONFIG_SCHEMA({"image_cache_bytes": -1})
+
+
+def test_image_metadata() -> None:
+    """Test that metadata is read without the image data and cached."""
+    img = image.ImageData(IMAGE_PATH.as_posix())
+    metadata = img.metadata
+
+    assert metadata
+    assert img._data is None
+    assert not len(image.IMAGE_CACHE)
+    assert img.metadata is metadata
+
+    img.metadata = {"test": {"value": "1"}}
+    assert img.metadata == {"test": {"value": "1"}}
+    # Loading the image data keeps the set metadata.
+    assert img.data is not None
+    assert img.metadata == {"test": {"value": "1"}}
+
+
+@pytest.mark.parametrize(("dtype", "max_int"), [(np.uint8, 255), (np.uint16, 65535)])
+def test_histogram(dtype: type[np.unsignedinteger], max_int: int) -> None:
+    """Test that the histogram is the same as the numpy histogram."""
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, max_int, (300, 300), endpoint=True, dtype=dtype)
+    data[0, :3] = (0, max_int - 1, max_int)
+    hist, bin_edges = image.histogram(data)
+    np_hist, np_bin_edges = np.histogram(data, bins=256, range=(0, max_int))
+
+    assert np.array_equal(hist, np_hist)
+    assert hist.dtype == np_hist.dtype
+    assert np.array_equal(bin_edges, np_bin_edges)
+
+
+def test_histograms() -> None:
+    """Test histograms of a batch of images and the cached histogram."""
+    img = image.ImageData(IMAGE_PATH.as_posix())
+    hist = img.histogram
+
+    assert img.histogram is hist
+
+    stack = np.stack([img.data, img.data // 2])
+    hists, bin_edges = image.histograms(stack)
+
+    assert hists.shape == (2, 256)
+    assert np.array_equal(hists[0], hist[0])
+    assert np.array_equal(hists[1], np.histogram(stack[1], 256, (0, 65535))[0])
+    assert np.array_equal(bin_edges, hist[1])
+
+    img.data = stack[1]
+    assert np.array_equal(img.histogram[0], hists[1])
+    with pytest.raises(ValueError, match="No images"):
+        image.histograms([])
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_load_images(ordered: bool) -> None:
+    """Test load images in a thread pool."""
+    paths = sorted(path.as_posix() for path in FIELD_PATH.glob("*.ome.tif"))[:20]
+    paths.insert(3, "bad_path.tif")
+    images = list(image.load_images(paths, workers=3, ordered=ordered, prefetch=4))
+    good_paths = [path for path in paths if path != "bad_path.tif"]
+
+    if ordered:
+        assert [img.path for img in images] == good_paths
+    else:
+        assert sorted(img.path for img in images) == good_paths  # type: ignore[type-var]
+    for img in images:
+        assert img.path is not None
+        assert np.array_equal(img.data, tifffile.imread(img.path, key=0))
+        assert img.metadata
+
+
+async def test_async_load_images(center: Center) -> None:
+    """Test load images in the executor of the center."""
+    paths = sorted(path.as_posix() for path in FIELD_PATH.glob("*.ome.tif"))[:10]
+    images = [img async for img in image.async_load_images(center, paths, prefetch=3)]
+    unordered = [
+        img.path
+        async for img in image.async_load_images(
+            center, paths, ordered=False, prefetch=3
+        )
+    ]
+
+    assert [img.path for img in images] == paths
+    assert sorted(unordered) == paths  # type: ignore[type-var]
+
+
+async def test_image_writer(center: Center, tmp_path: Path) -> None:
+    """Test write images in the background."""
+    data = image.ImageData(IMAGE_PATH.as_posix()).data
+    events: list[image.ImageSavedEvent] = []
+
+    async def handle_saved(center: Center, event: image.ImageSavedEvent) -> None:
+        """Handle image saved event."""
+        events.append(event)
+
+    center.bus.register(image.IMAGE_SAVED_EVENT, handle_saved)  # type: ignore[arg-type]
+    writer = image.ImageWriter(center, workers=2, max_queue=1)
+    futures = [
+        await writer.async_submit((tmp_path / f"{idx}.tif").as_posix(), data)
+        for idx in range(4)
+    ]
+    bad_future = writer.submit((tmp_path / "missing" / "bad.tif").as_posix(), data)
+    paths = await asyncio.gather(*futures)
+    with pytest.raises(FileNotFoundError):
+        bad_future.result(timeout=1)
+    await asyncio.get_running_loop().run_in_executor(None, writer.stop)
+    await center.wait_for()
+
+    assert paths == [(tmp_path / f"{idx}.tif").as_posix() for idx in range(4)]
+    # No temporary files are left.
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{idx}.tif" for idx in range(4)
+    ]
+    for path in paths:
+        assert np.array_equal(tifffile.imread(path), data)
+    assert writer.images_written == 4
+    assert writer.errors == 1
+    assert writer.bytes_written == 4 * data.nbytes
+    assert writer.bytes_per_second == 4 * data.nbytes / image.WRITER_RATE_WINDOW
+    assert writer.queue_depth == 0
+    assert sorted(event.path for event in events if not event.error) == paths
+    assert [event.nbytes for event in events if event.error] == [0]
+
+
+def test_image_data_save_writer(save_path: str) -> None:
+    """Test save image data with an image writer."""
+    img = image.ImageData(IMAGE_PATH.as_posix())
+    writer = image.ImageWriter()
+    future = img.save(save_path, writer=writer)
+
+    assert future is not None
+    assert future.result(timeout=1) == save_path
+    writer.stop()
+    assert image.ImageData(save_path).metadata == img.metadata
+
+
+def make_gain_images(gains: list[float], size: int = 128) -> list[np.ndarray]:
+    """Return images with a power law intensity response to the gain."""
+    rng = np.random.default_rng(0)
+    base = rng.random((size, size))
+    return [
+        np.clip(base * 0.05 * gain**2, 0, 65535).astype(np.uint16) for gain in gains
+    ]
+
+
+def test_fit_gain() -> None:
+    """Test fit the gain from histograms of gain steps."""
+    gains = [500.0, 700.0, 900.0, 1100.0, 1300.0]
+    hists = image.histograms(make_gain_images(gains))[0]
+    # The brightest pixels reach 80 % of the range at this gain.
+    expected = np.sqrt(0.8 * 65536 / 0.05)
+
+    gain = image.fit_gain(gains, hists)
+    assert gain == pytest.approx(expected, rel=0.02)
+    # Steps are sorted by gain.
+    assert image.fit_gain(gains[::-1], hists[::-1]) == pytest.approx(gain)
+    # Only one usable step, the highest step saturates.
+    assert image.fit_gain(gains[-2:], hists[-2:]) == 1100.0
+    # All steps saturate.
+    assert image.fit_gain(gains[-1:] * 2, hists[-1:].repeat(2, axis=0)) == 1300.0
+    # All steps are too dim.
+    assert image.fit_gain(gains[:2], hists[:2], min_bin=255) == 700.0
+    # Steps without a positive gain are not used in the fit.
+    zero_hists = np.concatenate((hists[1:2], hists))
+    assert image.fit_gain([0.0, *gains], zero_hists) == pytest.approx(gain)
+
+
+def test_calc_gains(tmp_path: Path) -> None:
+    """Test calculate gains of channels from gain job images."""
+    gains = [500.0, 700.0, 900.0, 1100.0, 1300.0]
+    channels: dict[int, dict[str, float]] = {0: {}, 1: {}}
+    for idx, (gain, data) in enumerate(
+        zip(gains, make_gain_images(gains), strict=True)
+    ):
+        for channel_id, factor in ((0, 1), (1, 2)):
+            path = (tmp_path / f"C{channel_id}{idx}.tif").as_posix()
+            image.save_image(path, data // factor)
+            channels[channel_id][path] = gain
+
+    results = image.calc_gains(channels, max_gains={1: 1100})
+
+    assert results[0] == pytest.approx(np.sqrt(0.8 * 65536 / 0.05), rel=0.02)
+    assert results[1] == 1100
@@ -0,0 +1,88 @@
+"""Provide tests for the image store module."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from camacq.image_store import DATA_FILE, INDEX_FILE, ArrayStore, FieldKey
+
+FIELD = FieldKey("00", 1, 0, 2, 3)
+
+
+def test_append_and_read(tmp_path: Path) -> None:
+    """Test append planes and read them back."""
+    store = ArrayStore(tmp_path)
+    rng = np.random.default_rng(0)
+    planes = {
+        (channel_id, z_slice_id): rng.integers(0, 4096, (8, 6), dtype=np.uint16)
+        for channel_id in (3, 0)
+        for z_slice_id in range(2)
+    }
+    for (channel_id, z_slice_id), data in planes.items():
+        store.append(FIELD, data, channel_id, z_slice_id)
+    store.append(FIELD, planes[0, 0][:, ::-1], 0, 0, array="max")
+
+    # Read with a new store instance, as a downstream reader would.
+    store = ArrayStore(tmp_path)
+    read_planes = store.planes(FIELD)
+    stack = store.read_stack(FIELD)
+
+    assert (tmp_path / "00" / "1.0" / "2.3" / "image" / DATA_FILE).is_file()
+    assert read_planes.keys() == planes.keys()
+    for key, data in planes.items():
+        assert np.array_equal(read_planes[key], data)
+    assert stack.shape == (2, 2, 8, 6)
+    assert np.array_equal(stack[1, 0], planes[3, 0])
+    assert np.array_equal(store.read_stack(FIELD, "max")[0, 0], planes[0, 0][:, ::-1])
+    assert store.fields() == {FIELD: ["image", "max"]}
+    assert store.planes(FieldKey("00", 0, 0, 0, 0)) == {}
+
+
+def test_replace_and_recover(tmp_path: Path) -> None:
+    """Test replace a plane and recover from a partly written plane."""
+    store = ArrayStore(tmp_path)
+    data = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    store.append(FIELD, data)
+    data_path = store.array_dir(FIELD, "image") / DATA_FILE
+    store.append(FIELD, data + 1)
+
+    # The replaced plane is overwritten in place.
+    assert data_path.stat().st_size == data.nbytes
+    assert np.array_equal(store.planes(FIELD)[0, 0], data + 1)
+
+    with open(data_path, "ab") as data_file:
+        data_file.write(b"partial")
+    store.append(FIELD, data + 2, channel_id=1)
+
+    assert data_path.stat().st_size == 2 * data.nbytes
+    assert np.array_equal(store.planes(FIELD)[1, 0], data + 2)
+
+    with pytest.raises(ValueError, match="does not match"):
+        store.append(FIELD, data.astype(np.uint16))
+    with pytest.raises(KeyError):
+        store.read_stack(FIELD, "missing")
+
+
+def test_failed_index_save(tmp_path: Path) -> None:
+    """Test that a failed index save keeps the previous index."""
+    store = ArrayStore(tmp_path)
+    data = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    store.append(FIELD, data)
+    array_dir = store.array_dir(FIELD, "image")
+
+    with (
+        patch("camacq.image_store.json.dump", side_effect=OSError("disk full")),
+        pytest.raises(OSError, match="disk full"),
+    ):
+        store.append(FIELD, data + 1, channel_id=1)
+
+    assert list(store.planes(FIELD)) == [(0, 0)]
+    assert list(ArrayStore(tmp_path).planes(FIELD)) == [(0, 0)]
+    assert sorted(path.name for path in array_dir.iterdir()) == [
+        DATA_FILE,
+        INDEX_FILE,
+    ]
+    store.append(FIELD, data + 1, channel_id=1)
+    assert np.array_equal(store.planes(FIELD)[1, 0], data + 1)
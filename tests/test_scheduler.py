@@ -0,0 +1,86 @@
+"""Test the scheduler."""
+
+import asyncio
+import contextvars
+
+from camacq.scheduler import Scheduler
+
+
+async def test_call_later() -> None:
+    """Test delayed calls on the wheel."""
+    loop = asyncio.get_running_loop()
+    # Delays longer than the wheel wait rounds of the wheel.
+    scheduler = Scheduler(loop, tick=0.01, slots=4)
+    calls: list[tuple[str, float]] = []
+    start = loop.time()
+
+    def record(name: str) -> None:
+        """Record a call."""
+        calls.append((name, loop.time() - start))
+
+    scheduler.call_later(0.1, record, "slow")
+    scheduler.call_later(0.02, record, "fast")
+    scheduler.call_later(0, record, "now")
+    cancelled = scheduler.call_later(0.05, record, "cancelled")
+    assert len(scheduler) == 3
+
+    cancelled.cancel()
+
+    assert cancelled.cancelled
+    assert len(scheduler) == 2
+    await asyncio.sleep(0.2)
+    assert [name for name, _ in calls] == ["now", "fast", "slow"]
+    assert calls[1][1] >= 0.02
+    assert calls[2][1] >= 0.1
+    assert not scheduler
+
+
+async def test_call_every() -> None:
+    """Test periodic calls and stop."""
+    scheduler = Scheduler(asyncio.get_running_loop(), tick=0.01)
+    calls: list[int] = []
+
+    def record() -> None:
+        """Record a call and cancel after three calls."""
+        calls.append(len(calls))
+        if len(calls) == 3:
+            call.cancel()
+
+    call = scheduler.call_every(0.01, record)
+    await asyncio.sleep(0.1)
+    assert calls == [0, 1, 2]
+    assert not scheduler
+
+    scheduler.call_every(0.01, record)
+    scheduler.call_later(10, record)
+    assert len(scheduler) == 2
+    scheduler.stop()
+    assert not scheduler
+    await asyncio.sleep(0.05)
+    assert calls == [0, 1, 2]
+
+
+async def test_call_context() -> None:
+    """Test that calls run in the context where they are scheduled."""
+    scheduler = Scheduler(asyncio.get_running_loop(), tick=0.01)
+    var: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+        "test_var", default=None
+    )
+    calls: list[tuple[str, str | None]] = []
+
+    def record(name: str) -> None:
+        """Record a call and the context value."""
+        calls.append((name, var.get()))
+
+    # The first call starts the wheel.
+    token = var.set("first")
+    scheduler.call_later(0.01, record, "first")
+    scheduler.call_every(0.02, record, "periodic")
+    var.reset(token)
+    scheduler.call_later(0.03, record, "later")
+    await asyncio.sleep(0.1)
+    scheduler.stop()
+
+    assert ("first", "first") in calls
+    assert ("later", None) in calls
+    assert all(value == "first" for name, value in calls if name == "periodic")
@@ -140,8 +140,8 @@ async def test_workflow(
         field_x = int(idx / 3) + 1
         field_y = idx % 3 + 1
         assert api_call == call(
-            "/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:1 "
-            f"/welly:1 /fieldx:{field_x} /fieldy:{field_y} /dxpos:0 /dypos:0"
+            b"/cmd:add /tar:camlist /exp:p10xexp /ext:af /slide:0 /wellx:1 "
+            b"/welly:1 /fieldx:%d /fieldy:%d /dxpos:0 /dypos:0" % (field_x, field_y)
         )
     assert rename_image_auto.enabled
     assert set_img_ok_auto.enabled